@@ -25,8 +25,19 @@ options:
       - Host running the database.
       - In some cases for local connections the I(login_unix_socket=/path/to/mysqld/socket),
         that is usually C(/var/run/mysqld/mysqld.sock), needs to be used instead of I(login_host=localhost).
+      - Can be a comma separated list of hosts with optional ports, for example C(db1,db2:3307,[2001:db8::1]:3308).
+        A host without a port uses I(login_port). The module connects to all hosts at the same time
+        and uses the first one that accepts the connection, so a host that does not answer
+        does not delay the task until I(connect_timeout).
     type: str
     default: localhost
+  login_host_read_only:
+    description:
+      - If set, only connect to a host whose C(@@read_only) variable has this value.
+      - Use C(false) to find the primary and C(true) to find a replica in the I(login_host) list.
+      - If not set, C(@@read_only) is not checked.
+    type: bool
+    version_added: '4.3.0'
   login_port:
     description:
       - Port of the MySQL server. Requires I(login_host) be defined as other than localhost if login_port is used.
@@ -37,11 +48,49 @@ options:
       - The path to a Unix domain socket for local connections.
       - Use this parameter to avoid the C(Please explicitly state intended protocol) error.
     type: str
+  login_unix_socket_discovery:
+    description:
+      - When I(login_host) is C(localhost), C(127.0.0.1) or C(::1) and I(login_unix_socket) is not set,
+        look for a local server socket and connect through it instead of TCP.
+      - Sockets are taken from the C(socket) option of the C([client]) and C([mysqld]) groups of I(config_file),
+        C(/etc/my.cnf), C(/etc/mysql/my.cnf) and C(~/.my.cnf), then from the default paths of common distributions.
+      - A socket is used only if the connection succeeds and the server reports I(login_port) in C(@@port),
+        otherwise the module connects over TCP.
+      - The server matches socket connections against C(user@localhost) accounts,
+        so the privileges can differ from a TCP connection to C(127.0.0.1).
+      - Ignored when I(login_host_read_only) is set.
+    type: bool
+    default: false
+    version_added: '4.3.0'
   connect_timeout:
     description:
       - The connection timeout when connecting to the MySQL server.
     type: int
     default: 30
+  retries:
+    description:
+      - How many times to retry connecting to the server and idempotent reads that fail with a transient error,
+        for example C(Too many connections) (1040), C(Can't connect to server) (2003) or
+        C(Lost connection during query) (2013).
+      - Errors like wrong credentials or SQL syntax are never retried.
+      - A lost connection is reopened before a read is retried.
+    type: int
+    default: 0
+    version_added: '4.3.0'
+  retry_delay:
+    description:
+      - Upper bound in seconds of the wait before the first retry.
+      - It doubles with every retry of an operation, up to 30 seconds.
+        The wait is a random value below the bound, so clients that failed at the same time retry at different times.
+    type: float
+    default: 1.0
+    version_added: '4.3.0'
+  retry_timeout:
+    description:
+      - Seconds after the first attempt of an operation when no more retries start.
+    type: float
+    default: 60
+    version_added: '4.3.0'
   config_file:
     description:
       - Specify a config file from which user and password are to be read.
@@ -73,6 +122,29 @@ options:
       - Requires pymysql >= 0.7.11.
     type: bool
     version_added: '1.1.0'
+  connector:
+    description:
+      - Python connector used to talk to the server.
+      - C(auto) uses PyMySQL if it is installed and falls back to mysqlclient (MySQLdb).
+      - C(mysqlclient) decodes rows in C and is considerably faster than the pure Python PyMySQL
+        when a module reads large results. Support of mysqlclient is deprecated though.
+      - The chosen connector must be installed on the target host.
+    type: str
+    choices: [ auto, mysqlclient, pymysql ]
+    default: auto
+    version_added: '4.3.0'
+  compress:
+    description:
+      - Use the compressed client/server protocol.
+      - Reduces the amount of data sent over the network for large result sets
+        at the cost of CPU time on the client and the server. Useful on slow links.
+      - Requires the mysqlclient (MySQLdb) connector, PyMySQL does not support protocol compression.
+      - The compression algorithm is negotiated with the server. To prefer C(zstd) on MySQL 8.0.18 and later,
+        add C(compression-algorithms=zstd,zlib) to the C([client]) section of I(config_file).
+      - M(community.mysql.mysql_db) passes C(--compress) to C(mysqldump) and C(mysql) when I(state) is C(dump) or C(import).
+    type: bool
+    default: false
+    version_added: '4.3.0'
 requirements:
    - PyMySQL (Python 2.7 and Python 3.x)
 notes:
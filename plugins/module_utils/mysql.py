@@ -10,32 +10,103 @@
 # Simplified BSD License (see simplified_bsd.txt or https://opensource.org/licenses/BSD-2-Clause)
 
 from __future__ import (absolute_import, division, print_function)
-from functools import reduce
+from functools import partial, reduce
 __metaclass__ = type
 
 import os
+import collections
 import configparser
+import importlib
+import queue
+import random
+import re
+import stat
+import threading
+import time
 
 from ansible.module_utils.common.text.converters import to_native
+from ansible_collections.community.mysql.plugins.module_utils.database import mysql_quote_identifier
 
-try:
-    import pymysql as mysql_driver
-    _mysql_cursor_param = 'cursor'
-except ImportError:
-    try:
-        # mysqlclient is called MySQLdb
-        import MySQLdb as mysql_driver
-        import MySQLdb.cursors
-        _mysql_cursor_param = 'cursorclass'
-    except ImportError:
-        mysql_driver = None
+
+# Connector backends: name -> (driver module, keyword argument of connection.cursor() for the cursor class)
+CONNECTOR_BACKENDS = {
+    'pymysql': ('pymysql', 'cursor'),
+    # mysqlclient is called MySQLdb
+    'mysqlclient': ('MySQLdb', 'cursorclass'),
+}
+
+# Order in which the connector auto tries the backends
+CONNECTOR_AUTO_ORDER = ('pymysql', 'mysqlclient')
+
+
+class _LazyDriver():
+    """Stand-in for the DB driver module that imports the driver on first use.
+
+    Importing PyMySQL takes a noticeable part of a module's startup time,
+    so it's deferred until a module actually needs the driver. Attribute
+    access is forwarded to the driver module. The object is falsy
+    when no driver is installed.
+    """
+
+    def __init__(self):
+        self._module = None
+        self._loaded = False
+        self._cursor_param = None
+        self._backends = CONNECTOR_AUTO_ORDER
+
+    def use(self, connector='auto'):
+        """Choose the connector backend, auto takes the first installed one of CONNECTOR_AUTO_ORDER.
+
+        Returns: True if the backend is installed.
+        """
+        if connector in (None, 'auto'):
+            backends = CONNECTOR_AUTO_ORDER
+        else:
+            backends = (connector,)
+
+        if backends != self._backends:
+            self._backends = backends
+            self._module = None
+            self._loaded = False
+            self._cursor_param = None
+
+        return bool(self)
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            for backend in self._backends:
+                module_name, cursor_param = CONNECTOR_BACKENDS[backend]
+                try:
+                    module = importlib.import_module(module_name)
+                    importlib.import_module(module_name + '.cursors')
+                except ImportError:
+                    continue
+
+                self._module = module
+                self._cursor_param = cursor_param
+                break
+
+        return self._module
+
+    def __bool__(self):
+        return self._load() is not None
+
+    def __getattr__(self, name):
+        module = self._load()
+        if module is None:
+            raise AttributeError(name)
+
+        return getattr(module, name)
+
+
+mysql_driver = _LazyDriver()
 
 mysql_driver_fail_msg = ('A MySQL module is required: for Python 2.7 either PyMySQL, or '
                          'MySQL-python, or for Python 3.X mysqlclient or PyMySQL. '
                          'Consider setting ansible_python_interpreter to use '
-                         'the intended Python version.')
-
-from ansible_collections.community.mysql.plugins.module_utils.database import mysql_quote_identifier
+                         'the intended Python version. If the connector option is set, '
+                         'the chosen connector must be installed.')
 
 
 def get_connector_name(connector):
@@ -44,7 +115,7 @@ def get_connector_name(connector):
     or 'Unknown' if not pymysql or MySQLdb. When adding a
     connector here, also modify get_connector_version.
     """
-    if connector is None or not hasattr(connector, '__name__'):
+    if not connector or not hasattr(connector, '__name__'):
         return 'Unknown'
 
     return connector.__name__
@@ -56,7 +127,7 @@ def get_connector_version(connector):
     Return 'Unknown' if the connector name is unknown.
     """
 
-    if connector is None:
+    if not connector:
         return 'Unknown'
 
     connector_name = get_connector_name(connector)
@@ -75,29 +146,737 @@ def get_connector_version(connector):
         return 'Unknown'
 
 
-def parse_from_mysql_config_file(cnf):
+# The MySQL client stops following !include and !includedir
+# directives deeper than this
+MYSQL_CONFIG_MAX_INCLUDE_DEPTH = 10
+
+
+def _expand_mysql_config_includes(cnf, included_files, depth=0):
+    """Return lines of an option file with !include and !includedir expanded.
+
+    Included files are inlined at the place of the directive like the MySQL
+    client does. As an included file starts without a group, the current
+    group header of the including file is repeated after it.
+
+    Arguments:
+        cnf (str): Path to the option file.
+        included_files (list): Real paths of followed included files are appended to it.
+        depth (int): Current nesting level.
+    """
+    try:
+        with open(cnf) as f:
+            content = f.read().splitlines()
+    except (IOError, OSError):
+        # The client silently skips files it cannot read
+        return []
+
+    lines = []
+    current_group = None
+    for line in content:
+        stripped = line.strip()
+
+        if stripped.startswith('[') and stripped.endswith(']'):
+            current_group = line
+
+        directive = stripped.split(None, 1)
+        if len(directive) != 2 or directive[0] not in ('!include', '!includedir'):
+            lines.append(line)
+            continue
+
+        if depth >= MYSQL_CONFIG_MAX_INCLUDE_DEPTH:
+            continue
+
+        path = os.path.join(os.path.dirname(cnf), os.path.expanduser(directive[1].strip()))
+        if directive[0] == '!include':
+            paths = [path]
+        elif os.path.isdir(path):
+            paths = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                     if name.endswith('.cnf')]
+        else:
+            paths = []
+
+        for path in paths:
+            # Symlinks and relative paths can name a file that is already followed
+            real_path = os.path.realpath(path)
+            if real_path in included_files:
+                continue
+            included_files.append(real_path)
+            lines.extend(_expand_mysql_config_includes(path, included_files, depth + 1))
+
+        if current_group is not None:
+            lines.append(current_group)
+
+    return lines
+
+
+def _read_mysql_config_file(cnf):
+    """Parse an option file following its !include and !includedir directives.
+
+    Returns: Tuple (ConfigParser, list of real paths of the included files).
+    """
+    # The top file is listed to stop include loops
+    included_files = [os.path.realpath(cnf)]
+    lines = _expand_mysql_config_includes(cnf, included_files)
+
+    # Groups can be repeated across files, later options win like in the client.
     # Default values of comment_prefix is '#' and ';'.
-    # '!' added to prevent a parsing error
-    # when a config file contains !includedir parameter.
-    cp = configparser.ConfigParser(comment_prefixes=('#', ';', '!'))
-    cp.read(cnf)
+    # '!' added to ignore other directives starting with it.
+    cp = configparser.ConfigParser(comment_prefixes=('#', ';', '!'), strict=False,
+                                   allow_no_value=True)
+    cp.read_string('\n'.join(lines), source=cnf)
+    return cp, included_files[1:]
+
+
+def parse_from_mysql_config_file(cnf):
+    cp, dummy = _read_mysql_config_file(cnf)
     return cp
 
 
+def _unquote_mysql_config_value(value):
+    """Remove quotes around an option value like the MySQL client does."""
+    if value and len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
+def parse_login_hosts(login_host, login_port):
+    """Parse a comma separated list of hosts with optional ports.
+
+    Arguments:
+        login_host (str): For example, C(db1,db2:3307,[::1]:3308).
+        login_port (int): Port used when a host has no port.
+
+    Returns: List of tuples (host, port).
+    """
+    endpoints = []
+    for item in login_host.split(','):
+        item = item.strip()
+        if not item:
+            continue
+
+        host = item
+        port = login_port
+        if item.startswith('['):
+            # [IPv6 address]:port
+            host, dummy, port_str = item[1:].partition(']')
+            if port_str.startswith(':'):
+                port = int(port_str[1:])
+        elif item.count(':') == 1:
+            host, port_str = item.split(':')
+            port = int(port_str)
+
+        endpoints.append((host, port))
+
+    return endpoints
+
+
+# Hosts for which login_unix_socket_discovery looks for a local server socket
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# Option files the MySQL client reads by default, searched for socket options
+MYSQL_DEFAULT_OPTION_FILES = ('/etc/my.cnf', '/etc/mysql/my.cnf', '~/.my.cnf')
+
+# Default server socket paths of MySQL and MariaDB packages
+MYSQL_UNIX_SOCKET_PATHS = (
+    '/var/run/mysqld/mysqld.sock',  # Debian, Ubuntu
+    '/run/mysqld/mysqld.sock',  # Arch Linux, Alpine
+    '/var/lib/mysql/mysql.sock',  # RHEL, Fedora
+    '/var/run/mysql/mysql.sock',  # openSUSE
+    '/tmp/mysql.sock',  # upstream default, macOS
+)
+
+
+def find_unix_sockets(config_files):
+    """Return paths of local server sockets, the ones named in option files first.
+
+    Arguments:
+        config_files (list): Option files to look for [client] and [mysqld] socket options in.
+
+    Returns: List of paths that exist, are sockets, and are writable by the current user.
+    """
+    candidates = []
+    for cnf in config_files:
+        cnf = os.path.expanduser(cnf)
+        if not os.path.isfile(cnf):
+            continue
+
+        try:
+            cp, dummy = _read_mysql_config_file(cnf)
+        except Exception:
+            continue
+
+        for section in ('client', 'mysqld'):
+            value = cp.get(section, 'socket', raw=True, fallback=None)
+            if value:
+                candidates.append(_unquote_mysql_config_value(value))
+
+    candidates.extend(MYSQL_UNIX_SOCKET_PATHS)
+
+    sockets = []
+    for path in candidates:
+        if path in sockets:
+            continue
+
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            continue
+
+        if stat.S_ISSOCK(mode) and os.access(path, os.R_OK | os.W_OK):
+            sockets.append(path)
+
+    return sockets
+
+
+def _connect_unix_socket(config, autocommit, config_files):
+    """Connect through a discovered socket of the server that listens on the configured port.
+
+    A socket file can be left over by a stopped server or belong to another
+    instance on the same host, so a socket is only used when the connection
+    succeeds and the server reports the expected @@port. Sockets failing
+    the connection or the probe are skipped.
+
+    Returns: Tuple (connection or None, socket path or None).
+    """
+    socket_config = dict(config)
+    del socket_config['host']
+    del socket_config['port']
+
+    for path in find_unix_sockets(config_files):
+        socket_config['unix_socket'] = path
+        try:
+            db_connection = _driver_connect(socket_config, autocommit)
+        except mysql_driver.Error:
+            continue
+
+        try:
+            cursor = db_connection.cursor()
+            cursor.execute('SELECT @@port')
+            port = int(_first_column(cursor.fetchone()))
+            cursor.close()
+        except mysql_driver.Error:
+            # For example a server that is starting or drops the connection
+            port = None
+        if port == config['port']:
+            return db_connection, path
+
+        try:
+            db_connection.close()
+        except mysql_driver.Error:
+            pass
+
+    return None, None
+
+
+def _get_transport(db_connection):
+    """Return socket or tcp depending on how the connection reaches the server.
+
+    mysqlclient connects to localhost through the default socket
+    even when a host is given, so the connection is asked.
+    """
+    if hasattr(db_connection, 'get_host_info'):
+        host_info = db_connection.get_host_info()
+    else:
+        host_info = getattr(db_connection, 'host_info', '')
+
+    if 'UNIX socket' in to_native(host_info):
+        return 'socket'
+    return 'tcp'
+
+
+def _driver_connect(config, autocommit):
+    """Open a connection using the loaded driver."""
+    if get_connector_name(mysql_driver) == 'pymysql':
+        return mysql_driver.connect(autocommit=autocommit, **config)
+
+    db_connection = mysql_driver.connect(**config)
+    if autocommit:
+        db_connection.autocommit(True)
+    return db_connection
+
+
+def _connect_endpoint(config, autocommit, read_only, attempt, results, lock, done):
+    """Connect to one endpoint of a login_host list, runs in its own thread.
+
+    Puts a tuple (attempt, connection or None) to the results queue.
+    A connection opened after another endpoint has won is closed.
+    """
+    db_connection = None
+    start_time = time.perf_counter()
+    try:
+        db_connection = _driver_connect(config, autocommit)
+        attempt['status'] = 'connected'
+
+        if read_only is not None:
+            cursor = db_connection.cursor()
+            cursor.execute("SELECT @@read_only")
+            server_read_only = bool(int(cursor.fetchone()[0]))
+            cursor.close()
+
+            if server_read_only != read_only:
+                attempt['status'] = 'rejected'
+                attempt['msg'] = '@@read_only is %s' % int(server_read_only)
+                db_connection.close()
+                db_connection = None
+
+    except Exception as e:
+        attempt['status'] = 'failed'
+        attempt['msg'] = to_native(e)
+        db_connection = None
+
+    attempt['time_ms'] = round((time.perf_counter() - start_time) * 1000, 4)
+
+    with lock:
+        if done.is_set():
+            if db_connection is not None:
+                db_connection.close()
+                attempt['status'] = 'discarded'
+        else:
+            results.put((attempt, db_connection))
+
+
+def _connect_first_endpoint(config, endpoints, autocommit, read_only, connect_timeout):
+    """Connect to all endpoints concurrently and return the first connection that qualifies.
+
+    Arguments:
+        config (dict): Connection arguments for the driver, host and port are replaced.
+        endpoints (list): List of tuples (host, port).
+        autocommit (bool): Autocommit mode of the connection.
+        read_only (bool): If not None, only accept servers with such @@read_only.
+        connect_timeout (int): Seconds to wait for the endpoints.
+
+    Returns: Tuple (connection or None, winning attempt or None, list of attempts).
+        Each attempt is a dict with host, port, status, time_ms and optionally msg keys.
+    """
+    results = queue.Queue()
+    lock = threading.Lock()
+    done = threading.Event()
+    attempts = []
+
+    for host, port in endpoints:
+        attempt = {'host': host, 'port': port, 'status': 'pending', 'time_ms': None}
+        attempts.append(attempt)
+
+        endpoint_config = dict(config, host=host, port=port)
+        if 'ssl' in config:
+            endpoint_config['ssl'] = dict(config['ssl'])
+
+        # Daemon threads do not keep the module running
+        # when an endpoint does not answer
+        thread = threading.Thread(target=_connect_endpoint,
+                                  args=(endpoint_config, autocommit, read_only, attempt, results, lock, done))
+        thread.daemon = True
+        thread.start()
+
+    deadline = None
+    if connect_timeout:
+        deadline = time.perf_counter() + connect_timeout
+
+    db_connection = None
+    winner = None
+    for dummy in endpoints:
+        timeout = None
+        if deadline is not None:
+            timeout = max(deadline - time.perf_counter(), 0)
+
+        try:
+            attempt, db_connection = results.get(timeout=timeout)
+        except queue.Empty:
+            break
+
+        if db_connection is not None:
+            winner = attempt
+            break
+
+    with lock:
+        done.set()
+        # Close connections that were opened at the same time as the winner
+        while not results.empty():
+            late_attempt, late_connection = results.get()
+            if late_connection is not None:
+                late_connection.close()
+                late_attempt['status'] = 'discarded'
+
+        # Threads that are still connecting keep updating their attempts
+        attempts = [dict(attempt) for attempt in attempts]
+
+    return db_connection, winner, attempts
+
+
+# Driver error codes of failures that can go away when the operation is retried
+TRANSIENT_ERROR_CODES = frozenset((
+    1040,  # ER_CON_COUNT_ERROR: Too many connections
+    1043,  # ER_HANDSHAKE_ERROR: Bad handshake
+    1158,  # ER_NET_READ_ERROR
+    1159,  # ER_NET_READ_INTERRUPTED
+    1160,  # ER_NET_ERROR_ON_WRITE
+    1161,  # ER_NET_WRITE_INTERRUPTED
+    1203,  # ER_TOO_MANY_USER_CONNECTIONS
+    1205,  # ER_LOCK_WAIT_TIMEOUT
+    1213,  # ER_LOCK_DEADLOCK
+    2002,  # CR_CONNECTION_ERROR: Can't connect through socket
+    2003,  # CR_CONN_HOST_ERROR: Can't connect to server
+    2006,  # CR_SERVER_GONE_ERROR: Server has gone away
+    2013,  # CR_SERVER_LOST: Lost connection during query
+))
+
+# Error codes after which the connection has to be reopened before a retry
+CONNECTION_LOST_ERROR_CODES = frozenset((2006, 2013))
+
+# Flag of the server status telling that a transaction is open
+SERVER_STATUS_IN_TRANS = 0x0001
+
+# Defaults of the retry_delay and retry_timeout options,
+# no single wait is longer than RETRY_MAX_DELAY seconds
+RETRY_DELAY = 1.0
+RETRY_TIMEOUT = 60
+RETRY_MAX_DELAY = 30
+
+
+def get_error_code(e):
+    """Return the error code of a driver exception or None for other exceptions."""
+    if mysql_driver and isinstance(e, mysql_driver.Error) and e.args and isinstance(e.args[0], int):
+        return e.args[0]
+    return None
+
+
+class RetryPolicy():
+    """Retry operations that fail with transient errors.
+
+    Waits between attempts grow exponentially with full jitter, so clients
+    that failed at the same time do not come back at the same time.
+
+    Arguments:
+        retries (int): How many times a failed operation is retried.
+        delay (float): Upper bound of the first wait in seconds, it doubles with every retry.
+        timeout (float): Seconds after the first attempt of an operation when no more retries start.
+    """
+    def __init__(self, retries=0, delay=RETRY_DELAY, timeout=RETRY_TIMEOUT):
+        self.retries = retries
+        self.delay = delay
+        self.timeout = timeout
+        # Statistics of all operations run with the policy
+        self.retried = 0
+        self.wait = 0.0
+
+    def run(self, operation, reconnect=None):
+        """Call operation until it succeeds, fails with a permanent error, or the policy gives up.
+
+        Arguments:
+            operation (callable): Function without arguments, its return value is returned.
+            reconnect (callable): Called before a retry when the previous attempt lost the connection.
+        """
+        start = time.perf_counter()
+        retry = 0
+        lost = False
+        while True:
+            try:
+                if lost and reconnect is not None:
+                    reconnect()
+                return operation()
+            except Exception as e:
+                code = get_error_code(e)
+                if retry >= self.retries or code not in TRANSIENT_ERROR_CODES:
+                    raise
+
+                wait = random.uniform(0, min(self.delay * 2 ** retry, RETRY_MAX_DELAY))
+                if time.perf_counter() - start + wait > self.timeout:
+                    raise
+
+                time.sleep(wait)
+                self.wait += wait
+                self.retried += 1
+                retry += 1
+                lost = code in CONNECTION_LOST_ERROR_CODES
+
+
+class SessionLostError(Exception):
+    """The connection was lost within a transaction, which a new connection cannot continue."""
+
+
+def _in_transaction(connection):
+    """Whether a transaction may be open on the connection.
+
+    PyMySQL keeps the status flags the server sent with the last result.
+    Without them, a connection not in autocommit mode may be in a transaction.
+    """
+    status = getattr(connection, 'server_status', None)
+    if isinstance(status, int):
+        return bool(status & SERVER_STATUS_IN_TRANS)
+    try:
+        return not connection.get_autocommit()
+    except Exception:
+        return True
+
+
+def _reconnect(cursor):
+    """Reopen the lost connection of the cursor and restore its session.
+
+    The session variables set by set_session_vars() are set again and the
+    session-dependent probes of the ServerProfile are reset. Other session
+    state, like user variables, temporary tables and prepared statements,
+    is lost.
+
+    Raises: SessionLostError when a transaction was open, its changes are lost.
+    """
+    connection = cursor.connection
+    if _in_transaction(connection):
+        raise SessionLostError("The connection was lost within a transaction, its changes were rolled back")
+
+    connection.ping(True)
+    session_vars = getattr(connection, '_ansible_session_vars', None)
+    if isinstance(session_vars, dict) and session_vars:
+        cursor.execute(*_session_vars_statement(session_vars))
+    profile = _get_cached_server_profile(cursor)
+    if profile is not None:
+        profile.reset_session_state()
+
+
+def execute_read(cursor, query, args=None, fetchone=False):
+    """Execute a read-only statement and fetch its rows using the retry policy of the connection.
+
+    A lost connection is reopened before a retry, which resets the session state.
+    The session variables set by set_session_vars() are set again, other session
+    state is lost, see _reconnect(). When the connection was lost within a
+    transaction, SessionLostError is raised instead of retrying.
+
+    Returns: All rows, or the first row if fetchone is True.
+    """
+    def operation():
+        if args is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, args)
+        if fetchone:
+            return cursor.fetchone()
+        return cursor.fetchall()
+
+    policy = getattr(cursor.connection, '_ansible_retry_policy', None)
+    if not isinstance(policy, RetryPolicy):
+        return operation()
+
+    return policy.run(operation, reconnect=partial(_reconnect, cursor))
+
+
+# Number of prepared statements PreparedStatements keeps per connection
+PREPARED_STATEMENT_CACHE_SIZE = 64
+
+# ER_UNSUPPORTED_PS: This command is not supported in the prepared statement protocol yet
+UNSUPPORTED_PS_ERROR_CODE = 1295
+
+# Placeholders of the driver's pyformat parameter style
+PYFORMAT_PLACEHOLDER = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+def to_prepared_statement(query, args):
+    """Replace the %s and %(name)s placeholders of query by ? placeholders.
+
+    The placeholders are found like the driver finds them when it interpolates args,
+    so the statement behaves like the query run with args.
+
+    Returns: Tuple (statement, list of the parameter values in placeholder order).
+    """
+    params = []
+
+    def replace(match):
+        if match.group(0) == '%%':
+            return '%'
+        if match.group(1) is not None:
+            params.append(args[match.group(1)])
+        elif isinstance(args, dict) or len(params) >= len(args):
+            raise TypeError('not enough arguments for query %s' % query)
+        else:
+            params.append(args[len(params)])
+        return '?'
+
+    statement = PYFORMAT_PLACEHOLDER.sub(replace, query)
+    if isinstance(args, (list, tuple)) and len(params) != len(args):
+        raise TypeError('not all arguments used in query %s' % query)
+    return statement, params
+
+
+class PreparedStatements():
+    """Execute queries as server-side prepared statements, cached per connection.
+
+    Neither PyMySQL nor mysqlclient implement the binary protocol
+    (COM_STMT_PREPARE and COM_STMT_EXECUTE), so the SQL statements PREPARE,
+    EXECUTE and DEALLOCATE PREPARE are used. Parameters are passed in user
+    variables set by one SET statement. The least recently used statement is
+    deallocated when more than size statements are prepared.
+
+    Arguments:
+        cursor (cursor): DB driver cursor object the statements run on.
+        size (int): Maximum number of prepared statements.
+    """
+
+    def __init__(self, cursor, size=PREPARED_STATEMENT_CACHE_SIZE):
+        self.cursor = cursor
+        self.size = size
+        # Statement text -> statement name, the least recently used first
+        self.statements = collections.OrderedDict()
+        self.prepared = 0
+        self.executed = 0
+        # Statements the server cannot prepare, run as plain queries
+        self._unsupported = set()
+
+    def _prepare(self, statement):
+        """Return the name of the prepared statement, preparing it if needed."""
+        name = self.statements.get(statement)
+        if name is not None:
+            self.statements.move_to_end(statement)
+            return name
+
+        # Names are not reused, the counter only grows
+        name = '_ansible_stmt_%d' % self.prepared
+        self.cursor.execute('PREPARE %s FROM %%s' % name, (statement,))
+        self.prepared += 1
+        self.statements[statement] = name
+        if len(self.statements) > self.size:
+            dummy, evicted = self.statements.popitem(last=False)
+            self.cursor.execute('DEALLOCATE PREPARE %s' % evicted)
+        return name
+
+    def execute(self, query, args=None):
+        """Execute query like cursor.execute(query, args) does, with a prepared statement."""
+        if query in self._unsupported:
+            self.cursor.execute(query, args)
+            return
+
+        if args is None:
+            statement, params = query, []
+        else:
+            statement, params = to_prepared_statement(query, args)
+
+        try:
+            name = self._prepare(statement)
+        except mysql_driver.Error as e:
+            if get_error_code(e) != UNSUPPORTED_PS_ERROR_CODE:
+                raise
+            self._unsupported.add(query)
+            self.cursor.execute(query, args)
+            return
+
+        if params:
+            variables = ['@_ansible_p%d' % i for i in range(len(params))]
+            self.cursor.execute('SET %s' % ', '.join('%s = %%s' % v for v in variables), params)
+            self.cursor.execute('EXECUTE %s USING %s' % (name, ', '.join(variables)))
+        else:
+            self.cursor.execute('EXECUTE %s' % name)
+        self.executed += 1
+
+    def executemany(self, query, args):
+        """Execute query for every parameter set of args.
+
+        Returns: Sum of the affected rows.
+        """
+        rowcount = 0
+        for params in args:
+            self.execute(query, params)
+            rowcount += max(self.cursor.rowcount, 0)
+        return rowcount
+
+    def close(self):
+        """Deallocate all prepared statements."""
+        while self.statements:
+            dummy, name = self.statements.popitem()
+            self.cursor.execute('DEALLOCATE PREPARE %s' % name)
+
+
+# Cursor classes mysql_connect accepts in cursor_class, the SS ones are unbuffered:
+# rows stay on the server until they are fetched
+CURSOR_CLASSES = ('DictCursor', 'SSCursor', 'SSDictCursor')
+
+# Default number of rows fetch_row_batches reads at a time
+FETCH_BATCH_SIZE = 1000
+
+
+def get_connection_info(db_connection):
+    """Return information about how a connection returned by mysql_connect was established.
+
+    Returns: Dictionary with the host and port (or unix_socket) the connection uses,
+        and the transport, socket or tcp, it goes through.
+        When login_host contains several hosts, the attempts key lists all connection attempts.
+        The retries and retry_wait_ms keys count retries of the connection and reads made with execute_read.
+    """
+    info = dict(getattr(db_connection, '_ansible_connection_info', {}))
+    policy = getattr(db_connection, '_ansible_retry_policy', None)
+    if isinstance(policy, RetryPolicy):
+        info['retries'] = policy.retried
+        info['retry_wait_ms'] = round(policy.wait * 1000, 4)
+    return info
+
+
+def _open_connection(module, config, config_file, autocommit, read_only, endpoints, connect_timeout,
+                     discover_socket=True):
+    """Connect the way the module parameters ask for, one attempt of mysql_connect.
+
+    Unix sockets are only discovered when discover_socket is True.
+
+    Returns: Tuple (connection, connection info dictionary).
+    """
+    db_connection = None
+    if (discover_socket and module.params.get('login_unix_socket_discovery') and read_only is None
+            and len(endpoints) == 1 and endpoints[0][0] in LOCAL_HOSTS):
+        config['host'], config['port'] = endpoints[0]
+        option_files = list(MYSQL_DEFAULT_OPTION_FILES)
+        if config_file:
+            option_files.insert(0, config_file)
+
+        db_connection, unix_socket = _connect_unix_socket(config, autocommit, option_files)
+        if db_connection is not None:
+            connection_info = {'unix_socket': unix_socket, 'transport': 'socket'}
+            # Tools like mysqldump run by the modules use the login_unix_socket parameter
+            module.params['login_unix_socket'] = unix_socket
+
+    if db_connection is None:
+        if len(endpoints) > 1 or (endpoints and read_only is not None):
+            db_connection, winner, attempts = _connect_first_endpoint(config, endpoints, autocommit,
+                                                                      read_only, connect_timeout)
+            if db_connection is None:
+                errors = ['%s:%s %s' % (a['host'], a['port'], a.get('msg', a['status'])) for a in attempts]
+                raise mysql_driver.OperationalError(2003, 'None of the hosts in login_host accepted the connection: %s'
+                                                    % ', '.join(errors))
+
+            connection_info = {'host': winner['host'], 'port': winner['port'], 'attempts': attempts}
+        else:
+            if endpoints:
+                config['host'], config['port'] = endpoints[0]
+                connection_info = {'host': config['host'], 'port': config['port']}
+            else:
+                connection_info = {'unix_socket': config.get('unix_socket')}
+            db_connection = _driver_connect(config, autocommit)
+
+        connection_info['transport'] = _get_transport(db_connection)
+
+    return db_connection, connection_info
+
+
 def mysql_connect(module, login_user=None, login_password=None, config_file='', ssl_cert=None,
                   ssl_key=None, ssl_ca=None, db=None, cursor_class=None, connect_timeout=30,
-                  autocommit=False, config_overrides_defaults=False, check_hostname=None):
+                  autocommit=False, config_overrides_defaults=False, check_hostname=None, endpoint=None):
+    """Connect to the server the module parameters point to.
+
+    With endpoint, a (host, port) tuple, connect to that server instead of
+    login_host and login_port, for example to a replica of the server.
+    The login_host and login_port parameters are not updated then.
+
+    Returns: Tuple (cursor, connection).
+    """
     config = {}
 
+    cp = None
+    included_files = []
     if config_file and os.path.exists(config_file):
         config['read_default_file'] = config_file
 
-        if config_overrides_defaults:
-            try:
-                cp = parse_from_mysql_config_file(config_file)
-            except Exception as e:
+        try:
+            cp, included_files = _read_mysql_config_file(config_file)
+        except Exception as e:
+            # Without config_overrides_defaults, the driver reads the file itself
+            if config_overrides_defaults:
                 module.fail_json(msg="Failed to parse %s: %s" % (config_file, to_native(e)))
 
+        if config_overrides_defaults:
             # Override some commond defaults with values from config file if needed
             if cp and cp.has_section('client'):
                 try:
@@ -111,7 +890,9 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
     if ssl_ca is not None or ssl_key is not None or ssl_cert is not None or check_hostname is not None:
         config['ssl'] = {}
 
-    if module.params['login_unix_socket']:
+    if endpoint is not None:
+        config['host'], config['port'] = endpoint
+    elif module.params['login_unix_socket']:
         config['unix_socket'] = module.params['login_unix_socket']
     else:
         config['host'] = module.params['login_host']
@@ -133,6 +914,11 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
         config['database'] = db
     if connect_timeout is not None:
         config['connect_timeout'] = connect_timeout
+    if module.params.get('compress'):
+        if get_connector_name(mysql_driver) == 'pymysql':
+            module.fail_json(msg='The compress option requires the mysqlclient (MySQLdb) connector on the target host, '
+                                 'PyMySQL does not support protocol compression')
+        config['compress'] = True
     if check_hostname is not None:
         if get_connector_name(mysql_driver) == 'pymysql':
             version_tuple = (n for n in mysql_driver.__version__.split('.') if n != 'None')
@@ -143,6 +929,14 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
 
     if get_connector_name(mysql_driver) == 'pymysql':
         # In case of PyMySQL driver:
+        if included_files and cp.has_section('client'):
+            # PyMySQL does not follow !include and !includedir when it reads
+            # read_default_file, so pass options from included files explicitly.
+            # Like the driver does, the options only fill in missing values.
+            for option, key in (('user', 'user'), ('password', 'password'), ('socket', 'unix_socket')):
+                value = cp.get('client', option, raw=True, fallback=None)
+                if value and not config.get(key):
+                    config[key] = _unquote_mysql_config_value(value)
         if mysql_driver.version_info[0] < 1:
             # for PyMySQL < 1.0.0, use 'db' instead of 'database' and 'passwd' instead of 'password'
             if 'database' in config:
@@ -151,7 +945,6 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
             if 'password' in config:
                 config['passwd'] = config['password']
                 del config['password']
-        db_connection = mysql_driver.connect(autocommit=autocommit, **config)
     else:
         # In case of MySQLdb driver
 
@@ -169,9 +962,30 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
             if 'password' in config:
                 config['passwd'] = config['password']
                 del config['password']
-        db_connection = mysql_driver.connect(**config)
-        if autocommit:
-            db_connection.autocommit(True)
+
+    read_only = module.params.get('login_host_read_only')
+    if endpoint is not None:
+        read_only = None
+        endpoints = [endpoint]
+    elif 'host' in config:
+        endpoints = parse_login_hosts(config['host'], config['port'])
+    else:
+        endpoints = []
+
+    retry_policy = RetryPolicy(module.params.get('retries') or 0,
+                               module.params.get('retry_delay', RETRY_DELAY),
+                               module.params.get('retry_timeout', RETRY_TIMEOUT))
+    db_connection, connection_info = retry_policy.run(
+        lambda: _open_connection(module, config, config_file, autocommit, read_only, endpoints, connect_timeout,
+                                 discover_socket=endpoint is None))
+
+    if 'host' in connection_info and endpoint is None:
+        # Tools like mysqldump run by the modules use the login_host and login_port parameters
+        module.params['login_host'] = connection_info['host']
+        module.params['login_port'] = connection_info['port']
+
+    db_connection._ansible_connection_info = connection_info
+    db_connection._ansible_retry_policy = retry_policy
 
     # Monkey patch the Connection class to close the connection when garbage collected
     def _conn_patch(conn_self):
@@ -179,53 +993,356 @@ def mysql_connect(module, login_user=None, login_password=None, config_file='',
     db_connection.__class__.__del__ = _conn_patch
     # Patched
 
-    if cursor_class == 'DictCursor':
-        return db_connection.cursor(**{_mysql_cursor_param: mysql_driver.cursors.DictCursor}), db_connection
+    if cursor_class in CURSOR_CLASSES:
+        cursor = getattr(mysql_driver.cursors, cursor_class)
+        return db_connection.cursor(**{mysql_driver._cursor_param: cursor}), db_connection
     else:
         return db_connection.cursor(), db_connection
 
 
+def fetch_row_batches(cursor, batch_size=FETCH_BATCH_SIZE):
+    """Yield the rows of the last executed statement in lists of at most batch_size rows.
+
+    With an unbuffered cursor (cursor_class SSCursor or SSDictCursor in mysql_connect)
+    rows are read from the server as the batches are consumed, so only one batch is
+    held in memory at a time. All rows must be consumed, or the cursor closed,
+    before the connection can execute the next statement.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+
+        yield list(rows)
+
+
+# Column types the connectors return as int, float or None, which exit_json accepts as they are
+NATIVE_JSON_FIELD_TYPES = frozenset((
+    1,  # TINY
+    2,  # SHORT
+    3,  # LONG
+    4,  # FLOAT
+    5,  # DOUBLE
+    6,  # NULL
+    8,  # LONGLONG
+    9,  # INT24
+    13,  # YEAR
+))
+
+# Column types the connectors return as objects that are only serializable as strings
+STR_FIELD_TYPES = frozenset((
+    0,  # DECIMAL
+    7,  # TIMESTAMP
+    10,  # DATE
+    11,  # TIME
+    12,  # DATETIME
+    14,  # NEWDATE
+    246,  # NEWDECIMAL
+))
+
+
+def _to_str(value):
+    if value is None:
+        return None
+    return str(value)
+
+
+def _to_json_value(value):
+    # String and binary types can come as str or bytes, depending on the charset
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    return str(value)
+
+
+def get_row_converter(description, row):
+    """Return a function making the values of dict rows JSON serializable, or None if they already are.
+
+    Values are converted like json.loads(json.dumps(rows, default=str)) does,
+    but the conversion is chosen once per column from its type in cursor.description,
+    and columns returned as int or float are not touched.
+
+    Arguments:
+        description (tuple): cursor.description of the result.
+        row (dict): A row of the result, its keys are the column names the cursor uses.
+    """
+    converters = []
+    for key, column in zip(row, description):
+        type_code = column[1]
+        if type_code in NATIVE_JSON_FIELD_TYPES:
+            continue
+        elif type_code in STR_FIELD_TYPES:
+            converters.append((key, _to_str))
+        else:
+            converters.append((key, _to_json_value))
+
+    if not converters:
+        return None
+
+    def convert(row):
+        for key, converter in converters:
+            row[key] = converter(row[key])
+        return row
+
+    return convert
+
+
+# dictionary_encode() encodes a string column when the number of its distinct
+# values is at most this share of its non-NULL values
+DICTIONARY_ENCODING_MAX_RATIO = 0.5
+
+
+def rows_to_columnar(rows, columns=None):
+    """Return a list of dictionaries in columnar form.
+
+    Arguments:
+        rows (list): List of dictionaries.
+        columns (list): Keys of the rows in output order. If None, all keys
+            of all rows in the order they first appear.
+
+    Returns: Dictionary with columns, the list of column names, and rows,
+        a list with a list of values for every row. Missing keys become None.
+    """
+    if columns is None:
+        columns = []
+        for row in rows:
+            for key in row:
+                if key not in columns:
+                    columns.append(key)
+
+    return {
+        'columns': columns,
+        'rows': [[row.get(column) for column in columns] for row in rows],
+    }
+
+
+def dictionary_encode(result):
+    """Dictionary encode low-cardinality string columns of a result returned by rows_to_columnar.
+
+    Values of an encoded column are replaced in place with indexes into the
+    list of its distinct values, NULL stays NULL. The lists are added to the
+    result under dictionaries, keyed by column name.
+
+    Returns: The result.
+    """
+    dictionaries = {}
+    rows = result['rows']
+    for i, column in enumerate(result['columns']):
+        values = [row[i] for row in rows if row[i] is not None]
+        if not values or not all(isinstance(value, str) for value in values):
+            continue
+
+        # dict keeps the order in which the values first appear
+        distinct = list(dict.fromkeys(values))
+        if len(distinct) > len(values) * DICTIONARY_ENCODING_MAX_RATIO:
+            continue
+
+        index = dict((value, n) for n, value in enumerate(distinct))
+        for row in rows:
+            if row[i] is not None:
+                row[i] = index[row[i]]
+        dictionaries[column] = distinct
+
+    result['dictionaries'] = dictionaries
+    return result
+
+
 def mysql_common_argument_spec():
     return dict(
+        connector=dict(type='str', default='auto', choices=['auto'] + sorted(CONNECTOR_BACKENDS)),
         login_user=dict(type='str', default=None),
         login_password=dict(type='str', no_log=True),
         login_host=dict(type='str', default='localhost'),
+        login_host_read_only=dict(type='bool'),
         login_port=dict(type='int', default=3306),
         login_unix_socket=dict(type='str'),
+        login_unix_socket_discovery=dict(type='bool', default=False),
+        retries=dict(type='int', default=0),
+        retry_delay=dict(type='float', default=RETRY_DELAY),
+        retry_timeout=dict(type='float', default=RETRY_TIMEOUT),
         config_file=dict(type='path', default='~/.my.cnf'),
         connect_timeout=dict(type='int', default=30),
         client_cert=dict(type='path', aliases=['ssl_cert']),
         client_key=dict(type='path', aliases=['ssl_key']),
         ca_cert=dict(type='path', aliases=['ssl_ca']),
         check_hostname=dict(type='bool', default=None),
+        compress=dict(type='bool', default=False),
     )
 
 
+def _first_column(row):
+    """Return the first column of a row fetched by any cursor class."""
+    if isinstance(row, dict):
+        return list(row.values())[0]
+    return row[0]
+
+
+class ServerProfile():
+    """Server properties that do not change during a session.
+
+    The version and the session sql_mode are probed by one query when the
+    object is created, other properties are probed on first use. Every
+    probe runs at most once per connection, use get_server_profile() to get
+    the profile of a cursor's connection.
+
+    The profile keeps no cursor, the lazy probes run on the cursor passed
+    by the caller, so they never use a cursor that was closed or that
+    has unread rows of another query.
+
+    Arguments:
+        cursor (cursor): DB driver cursor object used for the first probe.
+    """
+
+    def __init__(self, cursor):
+        cursor.execute("SELECT VERSION() AS version, @@sql_mode AS sql_mode")
+        row = cursor.fetchone()
+        if isinstance(row, dict):
+            row = (row['version'], row['sql_mode'])
+        self.version = row[0]
+        if 'mariadb' in self.version.lower():
+            self.implementation = 'mariadb'
+        else:
+            self.implementation = 'mysql'
+        self._sql_mode = row[1]
+        self._user_password_columns = None
+        self._supports_user_attributes = None
+
+    def get_sql_mode(self, cursor):
+        """Return the session sql_mode."""
+        if self._sql_mode is None:
+            cursor.execute("SELECT @@sql_mode")
+            self._sql_mode = _first_column(cursor.fetchone())
+        return self._sql_mode
+
+    def get_user_password_columns(self, cursor):
+        """Return a tuple of mysql.user columns holding the password hash.
+
+        Ordered like ('Password', 'authentication_string'). When only one
+        of the columns exists, it's returned twice. When none is visible,
+        for example because the user cannot read mysql.user, it's
+        ('authentication_string', 'authentication_string') and reading
+        the hash fails with the server's error.
+        """
+        if self._user_password_columns is None:
+            cursor.execute("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                           "WHERE TABLE_SCHEMA = 'mysql' AND TABLE_NAME = 'user' "
+                           "AND COLUMN_NAME IN ('Password', 'authentication_string') "
+                           "ORDER BY COLUMN_NAME DESC")
+            columns = [_first_column(row) for row in cursor.fetchall()]
+            if not columns:
+                columns = ['authentication_string']
+            self._user_password_columns = (columns[0], columns[-1])
+        return self._user_password_columns
+
+    def get_supports_user_attributes(self, cursor):
+        """Return whether the server has INFORMATION_SCHEMA.USER_ATTRIBUTES."""
+        if self._supports_user_attributes is None:
+            try:
+                # information_schema.tables does not hold the tables within information_schema itself
+                cursor.execute("SELECT attribute FROM INFORMATION_SCHEMA.USER_ATTRIBUTES LIMIT 0")
+                cursor.fetchone()
+                self._supports_user_attributes = True
+            except mysql_driver.Error:
+                self._supports_user_attributes = False
+        return self._supports_user_attributes
+
+    def reset_session_state(self):
+        """Forget probed values that a SET SESSION statement can change."""
+        self._sql_mode = None
+
+
+def get_server_profile(cursor):
+    """Return the ServerProfile of the connection the cursor belongs to.
+
+    The profile is stored on the connection object, so all cursors
+    of one connection share it. Cursors without a connection
+    (for example, test doubles) get a new profile on every call.
+    """
+    profile = _get_cached_server_profile(cursor)
+    if profile is None:
+        profile = ServerProfile(cursor)
+        connection = getattr(cursor, 'connection', None)
+        if connection is not None:
+            connection._ansible_server_profile = profile
+    return profile
+
+
+def _get_cached_server_profile(cursor):
+    """Return the ServerProfile stored on the cursor's connection or None."""
+    profile = getattr(getattr(cursor, 'connection', None), '_ansible_server_profile', None)
+    if isinstance(profile, ServerProfile):
+        return profile
+    return None
+
+
 def get_server_version(cursor):
     """Returns a string representation of the server version."""
-    cursor.execute("SELECT VERSION() AS version")
-    result = cursor.fetchone()
+    return get_server_profile(cursor).version
 
-    if isinstance(result, dict):
-        version_str = result['version']
-    else:
-        version_str = result[0]
 
-    return version_str
+def get_server_implementation(cursor):
+    return get_server_profile(cursor).implementation
 
 
-def get_server_implementation(cursor):
-    if 'mariadb' in get_server_version(cursor).lower():
-        return "mariadb"
-    else:
-        return "mysql"
+def _session_vars_statement(session_vars):
+    """Return the SET statement setting the session vars and its values."""
+    assignments = ', '.join("%s = %%s" % mysql_quote_identifier(var, 'vars') for var in session_vars)
+    return "SET SESSION %s" % assignments, tuple(session_vars.values())
 
 
 def set_session_vars(module, cursor, session_vars):
-    """Set session vars."""
-    for var, value in session_vars.items():
-        query = "SET SESSION %s = " % mysql_quote_identifier(var, 'vars')
-        try:
-            cursor.execute(query + "%s", (value,))
-        except Exception as e:
-            module.fail_json(msg='Failed to execute %s%s: %s' % (query, value, e))
+    """Set session vars.
+
+    All variables are set by one SET statement to save round trips.
+    They are remembered on the connection, so execute_read() sets them
+    again when it reopens a lost connection.
+    """
+    if not session_vars:
+        return
+
+    query, values = _session_vars_statement(session_vars)
+    try:
+        cursor.execute(query, values)
+    except Exception as e:
+        module.fail_json(msg='Failed to execute %s with values %s: %s' % (query, values, e))
+
+    connection = getattr(cursor, 'connection', None)
+    if connection is not None:
+        previous = getattr(connection, '_ansible_session_vars', None)
+        connection._ansible_session_vars = dict(previous if isinstance(previous, dict) else {}, **session_vars)
+
+    profile = _get_cached_server_profile(cursor)
+    if profile is not None:
+        profile.reset_session_state()
+
+
+def get_replica_lag(cursor, heartbeat_table=None):
+    """Return the replication lag of the server the cursor is connected to.
+
+    Arguments:
+        cursor (cursor): DB driver cursor object returning dict rows.
+        heartbeat_table (str): Table a tool like pt-heartbeat updates on the primary,
+            its ts column holding the time of the update. The lag is then the age of
+            the newest ts value, otherwise Seconds_Behind_Source of SHOW REPLICA STATUS.
+
+    Returns: Lag in seconds, or None when the server does not replicate.
+    """
+    if heartbeat_table:
+        row = execute_read(cursor, "SELECT TIMESTAMPDIFF(MICROSECOND, MAX(ts), NOW(6)) AS lag FROM %s"
+                           % mysql_quote_identifier(heartbeat_table, 'table'), fetchone=True)
+        lag = _first_column(row)
+        # The clocks of the servers may differ a little
+        return None if lag is None else max(float(lag) / 1000000, 0.0)
+
+    if get_server_implementation(cursor) == 'mariadb':
+        from ansible_collections.community.mysql.plugins.module_utils.implementations.mariadb import replication as impl
+    else:
+        from ansible_collections.community.mysql.plugins.module_utils.implementations.mysql import replication as impl
+
+    term = 'REPLICA' if impl.uses_replica_terminology(cursor) else 'SLAVE'
+    status = execute_read(cursor, "SHOW %s STATUS" % term, fetchone=True)
+    if not status:
+        return None
+
+    # MySQL 8.0.22+ returns Seconds_Behind_Source, older versions and MariaDB Seconds_Behind_Master
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
@@ -0,0 +1,703 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# Simplified BSD License (see simplified_bsd.txt or https://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import functools
+import gzip
+import json
+import math
+import os
+import queue
+import re
+import threading
+import time
+
+from urllib.parse import quote
+
+from ansible_collections.community.mysql.plugins.module_utils.mysql import fetch_row_batches
+from ansible_collections.community.mysql.plugins.module_utils.sql_script import open_script, split_statements
+from ansible_collections.community.mysql.plugins.module_utils.version import LooseVersion
+
+
+# Name of the file describing a dump directory
+MANIFEST_FILE = 'manifest.json'
+
+# Version of the dump directory layout, increased on incompatible changes
+DUMP_FORMAT = 1
+
+# Schemas a dump of all databases leaves out, like the server's own tables
+SYSTEM_SCHEMAS = ('information_schema', 'mysql', 'performance_schema', 'sys')
+
+# Column types whose values can be split into ranges arithmetically
+INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+
+# Generated columns get their values from their expressions, not from INSERT statements.
+# MySQL 8 marks columns with expression defaults DEFAULT_GENERATED, which are not generated
+GENERATED_COLUMN = re.compile(r'\b(?:VIRTUAL|STORED|PERSISTENT) GENERATED\b')
+
+# An INSERT statement of a data file holds rows up to about this size in bytes
+DUMP_STATEMENT_SIZE = 1024 * 1024
+
+# gzip level of the dump files, a balance of speed and size
+DUMP_COMPRESSLEVEL = 6
+
+# Delimiter of the statements creating triggers, routines and events, whose bodies hold semicolons
+POST_DATA_DELIMITER = ';;'
+
+# Session settings at the top of every file, the values are written in the UTC time zone
+FILE_HEADER = (
+    "/*!40101 SET NAMES %s */;\n"
+    "/*!40014 SET FOREIGN_KEY_CHECKS=0, UNIQUE_CHECKS=0 */;\n"
+    "/*!40101 SET SQL_MODE='NO_AUTO_VALUE_ON_ZERO' */;\n"
+    "/*!40103 SET TIME_ZONE='+00:00' */;\n"
+)
+
+
+class DumpError(Exception):
+    """A dump or restore task failed.
+
+    Arguments:
+        task (str): Description of the task, like the file it wrote.
+        error (Exception): The exception the task raised.
+    """
+
+    def __init__(self, task, error):
+        super(DumpError, self).__init__('%s: %s' % (task, error))
+        self.task = task
+        self.error = error
+
+
+def quote_name(name):
+    """Quote a database, table or column name read from the server as one identifier.
+
+    Unlike mysql_quote_identifier(), dots are part of the name.
+    """
+    return '`%s`' % name.replace('`', '``')
+
+
+def dump_file_name(db, table=None, suffix='sql.gz'):
+    """Return the name of a file of the dump of the database or table.
+
+    The names are percent-encoded, dots included, so names cannot collide.
+    """
+    parts = [quote(db, safe='').replace('.', '%2E')]
+    if table is not None:
+        parts.append(quote(table, safe='').replace('.', '%2E'))
+    return '%s.%s' % ('.'.join(parts), suffix)
+
+
+def open_dump_file(path):
+    """Open a file of the dump for writing bytes."""
+    return gzip.open(path, 'wb', compresslevel=DUMP_COMPRESSLEVEL)
+
+
+def get_binlog_coordinates(cursor, implementation, version):
+    """Return the binary log position and the GTIDs the server has executed.
+
+    Returns: Dictionary with the file, position and gtid_executed keys, or None when the binary log is disabled.
+    """
+    if implementation == 'mysql' and LooseVersion(version) >= LooseVersion('8.2.0'):
+        cursor.execute("SHOW BINARY LOG STATUS")
+    else:
+        cursor.execute("SHOW MASTER STATUS")
+    status = cursor.fetchone()
+    if not status:
+        return None
+
+    if implementation == 'mariadb':
+        cursor.execute("SELECT @@GLOBAL.gtid_binlog_pos AS gtid")
+    else:
+        cursor.execute("SELECT @@GLOBAL.gtid_executed AS gtid")
+    gtid = cursor.fetchone()['gtid']
+
+    return {'file': status['File'], 'position': int(status['Position']), 'gtid_executed': gtid or None}
+
+
+def start_snapshot(cursor, worker_cursors, implementation, version, lock=True):
+    """Start transactions seeing the same snapshot of the data on all worker connections.
+
+    The snapshots are started while cursor's connection holds a global read lock,
+    which is released as soon as they are started. On MySQL 8.0+ the connection also
+    takes the backup lock, which blocks DDL statements until it is closed.
+
+    Arguments:
+        cursor (cursor): Dict cursor of the connection coordinating the dump.
+        worker_cursors (list): Cursors of the connections that dump the tables.
+        lock (bool): Take the global read lock. Without it, the worker snapshots may differ.
+
+    Returns: Tuple (binlog coordinates of the snapshot, see get_binlog_coordinates(),
+        list of warnings).
+    """
+    warnings = []
+    if implementation == 'mysql' and LooseVersion(version) >= LooseVersion('8.0'):
+        try:
+            cursor.execute("LOCK INSTANCE FOR BACKUP")
+        except Exception as e:
+            warnings.append("Cannot take the backup lock, DDL statements during the dump may break it: %s" % e)
+
+    if lock:
+        cursor.execute("FLUSH TABLES WITH READ LOCK")
+    try:
+        for worker_cursor in worker_cursors:
+            worker_cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            worker_cursor.execute("SET SESSION time_zone = '+00:00'")
+            worker_cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        binlog = get_binlog_coordinates(cursor, implementation, version)
+    finally:
+        if lock:
+            cursor.execute("UNLOCK TABLES")
+
+    return binlog, warnings
+
+
+def list_databases(cursor, databases=None):
+    """Return the databases to dump, all but the SYSTEM_SCHEMAS when databases is None."""
+    if databases is not None:
+        return list(databases)
+
+    cursor.execute("SELECT SCHEMA_NAME AS name FROM information_schema.SCHEMATA ORDER BY SCHEMA_NAME")
+    return [row['name'] for row in cursor.fetchall() if row['name'] not in SYSTEM_SCHEMAS]
+
+
+def list_tables(cursor, databases, ignore_tables=()):
+    """Return the tables and views of the databases.
+
+    Arguments:
+        ignore_tables (list): Tables to leave out, as database_name.table_name.
+
+    Returns: Tuple (tables, views). tables is a list of dictionaries with the db, name,
+        estimated rows and bytes of every table, the largest tables first. views is a list
+        of dictionaries with the db and name of every view.
+    """
+    tables = []
+    views = []
+    if not databases:
+        return tables, views
+
+    cursor.execute("SELECT TABLE_SCHEMA AS db, TABLE_NAME AS name, TABLE_TYPE AS type, "
+                   "TABLE_ROWS AS table_rows, DATA_LENGTH + INDEX_LENGTH AS size "
+                   "FROM information_schema.TABLES WHERE TABLE_SCHEMA IN (%s) "
+                   "ORDER BY TABLE_SCHEMA, TABLE_NAME" % ', '.join(['%s'] * len(databases)), tuple(databases))
+    for row in cursor.fetchall():
+        if '%s.%s' % (row['db'], row['name']) in ignore_tables:
+            continue
+        if row['type'] == 'VIEW':
+            views.append({'db': row['db'], 'name': row['name']})
+        elif row['type'] == 'BASE TABLE':
+            tables.append({'db': row['db'], 'name': row['name'],
+                           'rows': int(row['table_rows'] or 0), 'bytes': int(row['size'] or 0)})
+
+    # The largest tables take longest, start them first
+    tables.sort(key=lambda table: table['bytes'], reverse=True)
+    return tables, views
+
+
+def get_dump_columns(cursor, db, table):
+    """Return the columns of the table that INSERT statements set, in their order."""
+    cursor.execute("SELECT COLUMN_NAME AS name, EXTRA AS extra FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION", (db, table))
+    return [row['name'] for row in cursor.fetchall() if not GENERATED_COLUMN.search(row['extra'] or '')]
+
+
+def plan_chunks(cursor, db, table, rows, chunk_size):
+    """Split the table into ranges of its integer primary key holding about chunk_size rows.
+
+    The ranges are computed from the smallest and largest key, the first and last
+    ranges are open, so rows inserted after the keys were read are dumped too.
+
+    Returns: List of tuples (WHERE condition or None, arguments) covering the whole table.
+        Tables without an integer primary key or with less than 2 chunk_size rows
+        have a single chunk without condition.
+    """
+    if rows < 2 * chunk_size:
+        return [(None, ())]
+
+    cursor.execute("SELECT k.COLUMN_NAME AS name FROM information_schema.KEY_COLUMN_USAGE k "
+                   "JOIN information_schema.COLUMNS c ON c.TABLE_SCHEMA = k.TABLE_SCHEMA "
+                   "AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME "
+                   "WHERE k.TABLE_SCHEMA = %s AND k.TABLE_NAME = %s AND k.CONSTRAINT_NAME = 'PRIMARY' "
+                   "AND k.ORDINAL_POSITION = 1 AND c.DATA_TYPE IN (%s)"
+                   % ('%s', '%s', ', '.join("'%s'" % t for t in INTEGER_TYPES)), (db, table))
+    row = cursor.fetchone()
+    if not row:
+        return [(None, ())]
+
+    column = quote_name(row['name'])
+    cursor.execute("SELECT MIN(%s) AS low, MAX(%s) AS high FROM %s.%s" % (column, column, quote_name(db), quote_name(table)))
+    bounds = cursor.fetchone()
+    if bounds['low'] is None:
+        return [(None, ())]
+
+    low, high = int(bounds['low']), int(bounds['high'])
+    count = min(int(math.ceil(float(rows) / chunk_size)), high - low + 1)
+    if count < 2:
+        return [(None, ())]
+
+    step = int(math.ceil(float(high - low + 1) / count))
+    starts = list(range(low + step, high + 1, step))
+    chunks = [("%s < %%s" % column, (starts[0],))]
+    for start, end in zip(starts, starts[1:]):
+        chunks.append(("%s >= %%s AND %s < %%s" % (column, column), (start, end)))
+    chunks.append(("%s >= %%s" % column, (starts[-1],)))
+    return chunks
+
+
+def get_row_literal(connection):
+    """Return a function converting a row to the bytes of its SQL literal, like (1,'a',NULL)."""
+    if type(connection).__module__.startswith('pymysql'):
+        # PyMySQL escapes a whole tuple at once, to str
+        escape = connection.escape
+        encoding = connection.encoding
+        return lambda row: escape(tuple(row)).encode(encoding, 'surrogateescape')
+
+    # MySQLdb escapes every value to bytes
+    literal = connection.literal
+
+    def convert(row):
+        return b'(' + b','.join(literal(value) for value in row) + b')'
+    return convert
+
+
+def write_schema(path, statements):
+    """Write a schema file of the dump.
+
+    Returns: Size of the file in bytes.
+    """
+    with open_dump_file(path) as f:
+        f.write((FILE_HEADER % 'utf8mb4').encode('ascii'))
+        for statement in statements:
+            f.write(statement.encode('utf-8') + b';\n')
+    return os.path.getsize(path)
+
+
+def get_post_data(cursor, db, tables):
+    """Return the triggers of the tables, the stored routines and the events of the database.
+
+    They are created after the rows are restored, so the triggers do not fire on them.
+
+    Arguments:
+        tables (list): Names of the dumped tables of the database, the triggers of other tables are left out.
+
+    Returns: Tuple (list of dictionaries with the type, name, sql_mode, time_zone, drop and create
+        statements of every object, list of warnings).
+    """
+    objects = []
+    warnings = []
+
+    cursor.execute("SELECT TRIGGER_NAME AS name, EVENT_OBJECT_TABLE AS tbl FROM information_schema.TRIGGERS "
+                   "WHERE TRIGGER_SCHEMA = %s ORDER BY EVENT_OBJECT_TABLE, ACTION_TIMING, "
+                   "EVENT_MANIPULATION, ACTION_ORDER", (db,))
+    names = [('TRIGGER', row['name']) for row in cursor.fetchall() if row['tbl'] in tables]
+    cursor.execute("SELECT ROUTINE_TYPE AS type, ROUTINE_NAME AS name FROM information_schema.ROUTINES "
+                   "WHERE ROUTINE_SCHEMA = %s AND ROUTINE_TYPE IN ('FUNCTION', 'PROCEDURE') "
+                   "ORDER BY ROUTINE_TYPE, ROUTINE_NAME", (db,))
+    names.extend((row['type'], row['name']) for row in cursor.fetchall())
+    cursor.execute("SELECT EVENT_NAME AS name FROM information_schema.EVENTS "
+                   "WHERE EVENT_SCHEMA = %s ORDER BY EVENT_NAME", (db,))
+    names.extend(('EVENT', row['name']) for row in cursor.fetchall())
+
+    for object_type, name in names:
+        cursor.execute("SHOW CREATE %s %s.%s" % (object_type, quote_name(db), quote_name(name)))
+        row = cursor.fetchone()
+        # Triggers keep the statement as it was written
+        create = row['SQL Original Statement'] if object_type == 'TRIGGER' else row['Create %s' % object_type.title()]
+        if create is None:
+            warnings.append("Cannot read the definition of %s %s.%s, it is not dumped" % (object_type.lower(), db, name))
+            continue
+        objects.append({
+            'type': object_type,
+            'name': name,
+            'sql_mode': row['sql_mode'],
+            'time_zone': row.get('time_zone'),
+            'drop': "DROP %s IF EXISTS %s" % (object_type, quote_name(name)),
+            'create': create,
+        })
+
+    return objects, warnings
+
+
+def write_post_data(path, objects):
+    """Write the file creating the objects of get_post_data().
+
+    Their statements are separated by the POST_DATA_DELIMITER, like the mysql client's DELIMITER command does.
+
+    Returns: Size of the file in bytes.
+    """
+    with open_dump_file(path) as f:
+        f.write((FILE_HEADER % 'utf8mb4').encode('ascii'))
+        f.write(b'DELIMITER ' + POST_DATA_DELIMITER.encode('ascii') + b'\n')
+        for item in objects:
+            statements = ["SET SESSION SQL_MODE = '%s'" % item['sql_mode'].replace("'", "''")]
+            if item['time_zone']:
+                statements.append("SET SESSION TIME_ZONE = '%s'" % item['time_zone'].replace("'", "''"))
+            statements.extend((item['drop'], item['create']))
+            for statement in statements:
+                f.write(statement.encode('utf-8') + POST_DATA_DELIMITER.encode('ascii') + b'\n')
+        f.write(b'DELIMITER ;\n')
+    return os.path.getsize(path)
+
+
+def dump_rows(cursor, path, db, table, columns, where=None, args=()):
+    """Write the rows of the table matching where to the file as INSERT statements.
+
+    Arguments:
+        cursor (cursor): Unbuffered tuple cursor, its connection in the snapshot of the dump.
+        columns (list): Names of the columns to dump.
+        where (str): Condition of a chunk of plan_chunks(), with its args.
+
+    Returns: Tuple (number of rows, size of the file in bytes).
+    """
+    connection = cursor.connection
+    literal = get_row_literal(connection)
+    column_list = ', '.join(quote_name(column) for column in columns)
+    query = "SELECT %s FROM %s.%s" % (column_list, quote_name(db), quote_name(table))
+    if where is not None:
+        query += " WHERE %s" % where
+    # Not qualified by the database, so the rows can be restored into another one
+    insert = ("INSERT INTO %s (%s) VALUES\n" % (quote_name(table), column_list)).encode(connection.encoding)
+
+    cursor.execute(query, args or None)
+    rows = 0
+    with open_dump_file(path) as f:
+        f.write((FILE_HEADER % connection.character_set_name()).encode('ascii'))
+        statement = []
+        size = 0
+        for batch in fetch_row_batches(cursor):
+            for row in batch:
+                value = literal(row)
+                statement.append(value)
+                size += len(value) + 2
+                if size >= DUMP_STATEMENT_SIZE:
+                    f.write(insert + b',\n'.join(statement) + b';\n')
+                    statement = []
+                    size = 0
+            rows += len(batch)
+        if statement:
+            f.write(insert + b',\n'.join(statement) + b';\n')
+
+    return rows, os.path.getsize(path)
+
+
+def _dump_chunk(directory, db, table, columns, chunk, where, args, cursor):
+    """Dump a chunk of dump_databases() on the cursor, recording its rows and bytes in chunk."""
+    chunk['rows'], chunk['bytes'] = dump_rows(cursor, os.path.join(directory, chunk['file']),
+                                              db, table, columns, where, args)
+
+
+def run_tasks(cursors, tasks):
+    """Run tasks over a pool of connections, one thread per connection.
+
+    Arguments:
+        cursors (list): Cursors of the connections.
+        tasks (list): Tuples (description, function taking a cursor), started in this order.
+
+    Raises: DumpError of the first failed task, no more tasks are started after a failure.
+    """
+    pending = queue.Queue()
+    for task in tasks:
+        pending.put(task)
+    errors = []
+
+    def work(cursor):
+        while not errors:
+            try:
+                description, function = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                function(cursor)
+            except Exception as e:
+                errors.append(DumpError(description, e))
+
+    threads = [threading.Thread(target=work, args=(cursor,)) for cursor in cursors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def dump_databases(cursor, worker_cursors, directory, implementation, version, databases=None,
+                   ignore_tables=(), chunk_size=1000000, lock=True):
+    """Dump databases into a directory, one file per database, view, table schema and chunk of table rows.
+
+    The worker connections dump the chunks of the tables at the same time, the largest tables first,
+    all in the same snapshot of the data. manifest.json, written last, lists the files and
+    the binlog coordinates of the snapshot.
+
+    Arguments:
+        cursor (cursor): Dict cursor of the connection coordinating the dump.
+        worker_cursors (list): Unbuffered tuple cursors of the connections dumping the rows.
+        directory (str): Existing empty directory to write to.
+        databases (list): Databases to dump, all but the SYSTEM_SCHEMAS when None.
+        ignore_tables (list): Tables to leave out, as database_name.table_name.
+        chunk_size (int): Approximate number of rows of a file, see plan_chunks().
+        lock (bool): See start_snapshot().
+
+    Returns: Tuple (summary dictionary, list of warnings).
+    """
+    start_time = time.time()
+    binlog, warnings = start_snapshot(cursor, worker_cursors, implementation, version, lock)
+    databases = list_databases(cursor, databases)
+    tables, views = list_tables(cursor, databases, ignore_tables)
+
+    manifest = {
+        'format': DUMP_FORMAT,
+        'server': {'implementation': implementation, 'version': version},
+        'started': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start_time)),
+        'consistent': lock,
+        'binlog': binlog,
+        'databases': [],
+    }
+
+    entries = {}
+    for db in databases:
+        # Restores into an existing database too
+        cursor.execute("SHOW CREATE DATABASE IF NOT EXISTS %s" % quote_name(db))
+        name = dump_file_name(db, suffix='schema.sql.gz')
+        write_schema(os.path.join(directory, name), [cursor.fetchone()['Create Database']])
+        entries[db] = {'name': db, 'schema': name, 'tables': [], 'views': [], 'post_data': None}
+        manifest['databases'].append(entries[db])
+
+    tasks = []
+    for table in tables:
+        db = table['db']
+        cursor.execute("SHOW CREATE TABLE %s.%s" % (quote_name(db), quote_name(table['name'])))
+        schema = dump_file_name(db, table['name'], 'schema.sql.gz')
+        write_schema(os.path.join(directory, schema), ["DROP TABLE IF EXISTS %s" % quote_name(table['name']),
+                                                       cursor.fetchone()['Create Table']])
+
+        columns = get_dump_columns(cursor, db, table['name'])
+        entry = {'name': table['name'], 'schema': schema, 'chunks': []}
+        entries[db]['tables'].append(entry)
+        for number, (where, args) in enumerate(plan_chunks(cursor, db, table['name'], table['rows'], chunk_size)):
+            chunk = {'file': dump_file_name(db, table['name'], '%05d.sql.gz' % number), 'rows': None, 'bytes': None}
+            entry['chunks'].append(chunk)
+            tasks.append((chunk['file'], functools.partial(_dump_chunk, directory, db, table['name'], columns,
+                                                           chunk, where, args)))
+
+    for view in views:
+        cursor.execute("SHOW CREATE VIEW %s.%s" % (quote_name(view['db']), quote_name(view['name'])))
+        name = dump_file_name(view['db'], view['name'], 'view.sql.gz')
+        write_schema(os.path.join(directory, name), ["DROP VIEW IF EXISTS %s" % quote_name(view['name']),
+                                                     cursor.fetchone()['Create View']])
+        entries[view['db']]['views'].append({'name': view['name'], 'schema': name})
+
+    post_data = {'triggers': 0, 'routines': 0, 'events': 0}
+    for db in databases:
+        objects, object_warnings = get_post_data(cursor, db, [entry['name'] for entry in entries[db]['tables']])
+        warnings.extend(object_warnings)
+        if not objects:
+            continue
+        name = dump_file_name(db, suffix='post_data.sql.gz')
+        write_post_data(os.path.join(directory, name), objects)
+        entries[db]['post_data'] = {'file': name, 'triggers': 0, 'routines': 0, 'events': 0}
+        for item in objects:
+            kind = {'TRIGGER': 'triggers', 'EVENT': 'events'}.get(item['type'], 'routines')
+            entries[db]['post_data'][kind] += 1
+            post_data[kind] += 1
+
+    run_tasks(worker_cursors, tasks)
+
+    chunks = [chunk for entry in entries.values() for table in entry['tables'] for chunk in table['chunks']]
+    manifest['finished'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    summary = {
+        'directory': directory,
+        'databases': len(databases),
+        'tables': len(tables),
+        'views': len(views),
+        'triggers': post_data['triggers'],
+        'routines': post_data['routines'],
+        'events': post_data['events'],
+        'chunks': len(chunks),
+        'rows': sum(chunk['rows'] for chunk in chunks),
+        'bytes': sum(chunk['bytes'] for chunk in chunks),
+        'consistent': lock,
+        'binlog': binlog,
+        'execution_time_ms': round((time.time() - start_time) * 1000, 4),
+    }
+    return summary, warnings
+
+
+def read_manifest(directory):
+    """Read manifest.json of a dump directory.
+
+    Raises: ValueError when the dump has a format this version cannot restore.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != DUMP_FORMAT:
+        raise ValueError("%s has dump format %s, only format %s can be restored"
+                         % (MANIFEST_FILE, manifest.get('format'), DUMP_FORMAT))
+    return manifest
+
+
+def run_file(cursor, path):
+    """Run the statements of a file of a dump on the cursor.
+
+    Returns: Number of rows the statements changed.
+    """
+    rows = 0
+    with open_script(path) as f:
+        for statement in split_statements(f):
+            cursor.execute(statement.text)
+            rows += max(cursor.rowcount, 0)
+    return rows
+
+
+def _restore_chunk(directory, db, chunk, table_progress, clock, lock, cursor):
+    """Restore a chunk of restore_databases() on the cursor, adding its rows and bytes to table_progress.
+
+    clock holds the time the first chunk of the table started at, the throughput is measured from it.
+    """
+    start = time.time()
+    with lock:
+        clock['start'] = min(clock['start'] or start, start)
+    cursor.execute("USE %s" % quote_name(db))
+    rows = run_file(cursor, os.path.join(directory, chunk['file']))
+    cursor.connection.commit()
+
+    with lock:
+        elapsed = time.time() - clock['start']
+        table_progress['chunks'] += 1
+        table_progress['rows'] += rows
+        table_progress['bytes'] += chunk['bytes'] or 0
+        table_progress['execution_time_ms'] = round(elapsed * 1000, 4)
+        table_progress['rows_per_second'] = round(table_progress['rows'] / elapsed, 1) if elapsed else None
+
+
+def _run_schema(cursor, directory, db, name):
+    """Run a schema file of the dump in the database, raising DumpError when it fails."""
+    try:
+        cursor.execute("USE %s" % quote_name(db))
+        run_file(cursor, os.path.join(directory, name))
+    except Exception as e:
+        raise DumpError(name, e)
+
+
+def _create_views(cursor, directory, views):
+    """Create the views, in passes as long as views referencing views not created yet fail.
+
+    Arguments:
+        views (list): Tuples (database, view of the manifest).
+
+    Raises: DumpError of the first view failing in a pass that created none.
+    """
+    pending = list(views)
+    while pending:
+        failed = []
+        for db, view in pending:
+            try:
+                _run_schema(cursor, directory, db, view['schema'])
+            except DumpError as e:
+                failed.append((db, view, e))
+        if len(failed) == len(pending):
+            raise failed[0][2]
+        pending = [(db, view) for db, view, dummy in failed]
+
+
+def restore_databases(cursor, worker_cursors, directory, databases=None, progress=None):
+    """Restore databases from a directory written by dump_databases().
+
+    The databases and tables are created on cursor's connection first. Then the worker connections
+    restore the chunks of table rows at the same time, the largest chunks first, each in a transaction
+    of its own. The views, triggers, stored routines and events are created last, so the triggers
+    do not fire on the restored rows.
+
+    Arguments:
+        cursor (cursor): Cursor of the connection coordinating the restore.
+        worker_cursors (list): Cursors of the connections restoring the rows.
+        directory (str): Directory of the dump.
+        databases (list): Databases of the dump to restore, all when None.
+        progress (dict): The restore summary, updated while the restore runs,
+            so it tells how far the restore got when an exception is raised.
+
+    Returns: The progress dictionary.
+
+    Raises: DumpError of the first file that failed to restore,
+        ValueError when the dump cannot be restored or the databases are not in it.
+    """
+    start_time = time.time()
+    if progress is None:
+        progress = {}
+    progress.update({
+        'directory': directory,
+        'databases': 0,
+        'tables': 0,
+        'views': 0,
+        'triggers': 0,
+        'routines': 0,
+        'events': 0,
+        'chunks': 0,
+        'rows': 0,
+        'bytes': 0,
+        'execution_time_ms': 0,
+        'rows_per_second': None,
+        'table_progress': [],
+    })
+
+    entries = read_manifest(directory)['databases']
+    if databases is not None:
+        missing = sorted(set(databases) - set(entry['name'] for entry in entries))
+        if missing:
+            raise ValueError("The dump does not hold the database(s) %s" % ', '.join(missing))
+        entries = [entry for entry in entries if entry['name'] in databases]
+
+    try:
+        lock = threading.Lock()
+        tasks = []
+        for entry in entries:
+            db = entry['name']
+            try:
+                run_file(cursor, os.path.join(directory, entry['schema']))
+            except Exception as e:
+                raise DumpError(entry['schema'], e)
+            progress['databases'] += 1
+
+            for table in entry['tables']:
+                _run_schema(cursor, directory, db, table['schema'])
+                progress['tables'] += 1
+                table_progress = {'database': db, 'table': table['name'], 'chunks': 0, 'rows': 0, 'bytes': 0,
+                                  'execution_time_ms': 0, 'rows_per_second': None}
+                progress['table_progress'].append(table_progress)
+                clock = {'start': None}
+                for chunk in table['chunks']:
+                    tasks.append((chunk['file'], functools.partial(_restore_chunk, directory, db, chunk,
+                                                                   table_progress, clock, lock)))
+
+        # The largest chunks take longest, start them first
+        sizes = dict((chunk['file'], chunk['bytes'] or 0)
+                     for entry in entries for table in entry['tables'] for chunk in table['chunks'])
+        tasks.sort(key=lambda task: sizes[task[0]], reverse=True)
+        run_tasks(worker_cursors, tasks)
+
+        _create_views(cursor, directory, [(entry['name'], view) for entry in entries for view in entry['views']])
+        progress['views'] = sum(len(entry['views']) for entry in entries)
+
+        for entry in entries:
+            post_data = entry.get('post_data')
+            if post_data:
+                _run_schema(cursor, directory, entry['name'], post_data['file'])
+                for kind in ('triggers', 'routines', 'events'):
+                    progress[kind] += post_data[kind]
+    finally:
+        elapsed = time.time() - start_time
+        for key in ('chunks', 'rows', 'bytes'):
+            progress[key] = sum(table_progress[key] for table_progress in progress['table_progress'])
+        progress['execution_time_ms'] = round(elapsed * 1000, 4)
+        progress['rows_per_second'] = round(progress['rows'] / elapsed, 1) if elapsed else None
+
+    return progress
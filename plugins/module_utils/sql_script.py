@@ -0,0 +1,211 @@
+# This code is part of Ansible, but is an independent component.
+# This particular file snippet, and this file snippet only, is BSD licensed.
+# Modules you write using this snippet, which is embedded dynamically by Ansible
+# still belong to the author of the module, and may assign their own license
+# to the complete work.
+#
+# Simplified BSD License (see simplified_bsd.txt or https://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import bz2
+import gzip
+import lzma
+import re
+
+
+# Magic bytes of the compressed script formats and the functions opening them
+SCRIPT_OPENERS = (
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+)
+
+DEFAULT_DELIMITER = b';'
+
+# Statements changing only the session, run again when a script is resumed
+SESSION_KEYWORDS = ('SET', 'USE')
+
+# The mysql client's DELIMITER command, only recognized between statements
+DELIMITER_COMMAND = re.compile(rb'^\s*delimiter\s+(\S+)', re.IGNORECASE)
+
+# The rest of quoted strings and identifiers up to and including the closing quote.
+# Quotes are escaped by doubling them, in strings also by a backslash
+QUOTE_ENDS = {
+    b"'": re.compile(rb"[^'\\]*(?:(?:\\.|'')[^'\\]*)*'", re.DOTALL),
+    b'"': re.compile(rb'[^"\\]*(?:(?:\\.|"")[^"\\]*)*"', re.DOTALL),
+    b'`': re.compile(rb'[^`]*(?:``[^`]*)*`'),
+}
+
+COMMENT_END = re.compile(rb'\*/')
+
+# The first word of a statement, also within a versioned comment.
+# mysqldump writes statements like /*!40101 SET NAMES utf8 */
+FIRST_WORD = re.compile(rb'^\s*(?:/\*!\d*\s*)?(\w+)')
+
+
+def open_script(path):
+    """Open a SQL script for reading in binary mode.
+
+    gzip, bzip2 and xz compressed scripts are detected by their first bytes
+    and decompressed while they are read.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+
+    for prefix, opener in SCRIPT_OPENERS:
+        if magic.startswith(prefix):
+            return opener(path, 'rb')
+    return open(path, 'rb')
+
+
+class SQLStatement():
+    """A statement of a SQL script.
+
+    Arguments:
+        number (int): Position of the statement in the script, starting at 1.
+        line (int): Line of the script the statement starts on.
+        text (bytes): The statement without the delimiter and comments.
+    """
+
+    def __init__(self, number, line, text):
+        self.number = number
+        self.line = line
+        self.text = text
+
+    @property
+    def keyword(self):
+        """The first word of the statement in upper case, like INSERT."""
+        match = FIRST_WORD.match(self.text)
+        return match.group(1).decode('ascii', 'replace').upper() if match else ''
+
+    def is_session_statement(self):
+        """Whether the statement is a USE or SET statement."""
+        return self.keyword in SESSION_KEYWORDS
+
+
+def _token_patterns(delimiter):
+    """Return the patterns reading a script with the delimiter.
+
+    Returns: Tuple (pattern matching a run of text and complete quoted strings,
+        pattern matching the quote, comment or delimiter the run stops at).
+    """
+    first, rest = re.escape(delimiter[:1]), re.escape(delimiter[1:])
+    # The / and - that do not start a comment must not start the delimiter either, like DELIMITER //
+    not_delimiter = rb'(?!' + re.escape(delimiter) + rb')'
+    alternatives = [
+        rb'[^\'"`#/\-' + first + rb']+',
+        rb"'" + QUOTE_ENDS[b"'"].pattern,
+        rb'"' + QUOTE_ENDS[b'"'].pattern,
+        rb'`' + QUOTE_ENDS[b'`'].pattern,
+        not_delimiter + rb'/(?!\*)',
+        not_delimiter + rb'-(?!-(?:\s|$))',
+    ]
+    if rest:
+        alternatives.append(first + rb'(?!' + rest + rb')')
+    text = re.compile(rb'(?:' + rb'|'.join(alternatives) + rb')+', re.DOTALL)
+    # Like in the client, the delimiter wins over a comment starting with the same characters
+    token = re.compile(re.escape(delimiter) + rb'|[\'"`#]|--(?=\s|$)|/\*')
+    return text, token
+
+
+def split_statements(lines):
+    """Split a SQL script into statements like the mysql client does.
+
+    The script is read line by line and the statements are yielded as soon
+    as their delimiter is read, so only one statement is held in memory.
+    The delimiter is not split on within quoted strings, quoted identifiers
+    and comments. DELIMITER commands change the delimiter. Comments are
+    dropped, except versioned comments (/*!50003 ... */) and optimizer hints
+    (/*+ ... */), which the server runs.
+
+    Arguments:
+        lines (iterable): Lines of the script as bytes, like an open binary file.
+
+    Yields: SQLStatement objects of the non-empty statements.
+    """
+    delimiter = DEFAULT_DELIMITER
+    text_pattern, token_pattern = _token_patterns(delimiter)
+    parts = []
+    number = 0
+    start_line = None
+    # The quote character or b'/*' while a quoted string or comment continues on the next line
+    pending = None
+    keep_comment = False
+
+    for line_number, line in enumerate(lines, 1):
+        pos = 0
+        # start_line is only set when the statement has text
+        if pending is None and start_line is None:
+            match = DELIMITER_COMMAND.match(line)
+            if match:
+                delimiter = match.group(1)
+                text_pattern, token_pattern = _token_patterns(delimiter)
+                parts = []
+                continue
+
+        while pos < len(line):
+            if pending is not None:
+                if pending == b'/*':
+                    match = COMMENT_END.search(line, pos)
+                    end = match.end() if match else len(line)
+                    if keep_comment:
+                        parts.append(line[pos:end])
+                    elif match:
+                        parts.append(b' ')
+                    if match:
+                        pending = None
+                    pos = end
+                    continue
+
+                match = QUOTE_ENDS[pending].match(line, pos)
+                if match is None:
+                    parts.append(line[pos:])
+                    break
+                parts.append(line[pos:match.end()])
+                pending = None
+                pos = match.end()
+                continue
+
+            match = text_pattern.match(line, pos)
+            if match is not None:
+                if start_line is None and match.group(0).strip():
+                    start_line = line_number
+                parts.append(match.group(0))
+                pos = match.end()
+                continue
+
+            match = token_pattern.match(line, pos)
+            token = match.group(0)
+            pos = match.end()
+
+            if token == delimiter:
+                text = b''.join(parts).strip()
+                if text:
+                    number += 1
+                    yield SQLStatement(number, start_line, text)
+                parts = []
+                start_line = None
+            elif token in QUOTE_ENDS:
+                # The quoted string continues on the next line
+                if start_line is None:
+                    start_line = line_number
+                parts.append(token)
+                pending = token
+            elif token == b'/*':
+                keep_comment = line[pos:pos + 1] in (b'!', b'+')
+                if keep_comment:
+                    if start_line is None:
+                        start_line = line_number
+                    parts.append(token)
+                pending = b'/*'
+            else:
+                # The comment runs to the end of the line
+                parts.append(b'\n')
+                break
+
+    text = b''.join(parts).strip()
+    if text:
+        # The last statement does not need a delimiter
+        yield SQLStatement(number + 1, start_line, text)
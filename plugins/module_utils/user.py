@@ -18,6 +18,7 @@ import re
 from ansible_collections.community.mysql.plugins.module_utils.mysql import (
     mysql_driver,
     get_server_implementation,
+    get_server_profile,
 )
 from ansible_collections.community.mysql.plugins.module_utils.implementations.mysql.hash import (
     mysql_sha256_password_hash,
@@ -30,9 +31,7 @@ class InvalidPrivsError(Exception):
 
 
 def get_mode(cursor):
-    cursor.execute('SELECT @@sql_mode')
-    result = cursor.fetchone()
-    mode_str = result[0]
+    mode_str = get_server_profile(cursor).get_sql_mode(cursor)
     if 'ANSI' in mode_str:
         mode = 'ANSI'
     else:
@@ -118,14 +117,7 @@ def get_existing_authentication(cursor, user, host=None):
     If hostname is provided, return only the information about this particular
     account.
     """
-    cursor.execute("SELECT VERSION()")
-    srv_type = cursor.fetchone()
-    # Mysql_info use a DictCursor so we must convert back to a list
-    # otherwise we get KeyError 0
-    if isinstance(srv_type, dict):
-        srv_type = list(srv_type.values())
-
-    if 'mariadb' in srv_type[0].lower():
+    if get_server_implementation(cursor) == 'mariadb':
         # before MariaDB 10.2.19 and 10.3.11, "password" and "authentication_string" can differ
         # when using mysql_native_password
         if host:
@@ -305,20 +297,8 @@ def user_mod(cursor, user, host, host_all, password, encrypted,
         if not role:
             if bool(password):
 
-                # Get a list of valid columns in mysql.user table to check if Password and/or authentication_string exist
-                cursor.execute("""
-                    SELECT COLUMN_NAME FROM information_schema.COLUMNS
-                    WHERE TABLE_SCHEMA = 'mysql' AND TABLE_NAME = 'user' AND COLUMN_NAME IN ('Password', 'authentication_string')
-                    ORDER BY COLUMN_NAME DESC LIMIT 1
-                """)
-                colA = cursor.fetchone()
-
-                cursor.execute("""
-                    SELECT COLUMN_NAME FROM information_schema.COLUMNS
-                    WHERE TABLE_SCHEMA = 'mysql' AND TABLE_NAME = 'user' AND COLUMN_NAME IN ('Password', 'authentication_string')
-                    ORDER BY COLUMN_NAME ASC  LIMIT 1
-                """)
-                colB = cursor.fetchone()
+                # Valid columns in mysql.user table to check if Password and/or authentication_string exist
+                colA, colB = get_server_profile(cursor).get_user_password_columns(cursor)
 
                 # Select hash from either Password or authentication_string, depending which one exists and/or is filled
                 cursor.execute("""
@@ -327,7 +307,7 @@ def user_mod(cursor, user, host, host_all, password, encrypted,
                             CASE WHEN %s = '' THEN NULL ELSE %s END
                         )
                     FROM mysql.user WHERE user = %%s AND host = %%s
-                    """ % (colA[0], colA[0], colB[0], colB[0]), (user, host))
+                    """ % (colA, colA, colB, colB), (user, host))
                 current_pass_hash = cursor.fetchone()[0]
                 if isinstance(current_pass_hash, bytes):
                     current_pass_hash = current_pass_hash.decode('ascii')
@@ -988,14 +968,7 @@ def get_resource_limits(cursor, user, host):
         'MAX_USER_CONNECTIONS': res[3],
     }
 
-    cursor.execute("SELECT VERSION()")
-    srv_type = cursor.fetchone()
-    # Mysql_info use a DictCursor so we must convert back to a list
-    # otherwise we get KeyError 0
-    if isinstance(srv_type, dict):
-        srv_type = list(srv_type.values())
-
-    if 'mariadb' in srv_type[0].lower():
+    if get_server_implementation(cursor) == 'mariadb':
         query = ('SELECT max_statement_time AS MAX_STATEMENT_TIME '
                  'FROM mysql.user WHERE User = %s AND Host = %s')
         cursor.execute(query, (user, host))
@@ -1064,8 +1037,7 @@ def limit_resources(module, cursor, user, host, resource_limits, check_mode):
         module.fail_json(msg="The server version does not match the requirements "
                              "for resource_limits parameter. See module's documentation.")
 
-    cursor.execute("SELECT VERSION()")
-    if 'mariadb' not in cursor.fetchone()[0].lower():
+    if get_server_implementation(cursor) != 'mariadb':
         if 'MAX_STATEMENT_TIME' in resource_limits:
             module.fail_json(msg="MAX_STATEMENT_TIME resource limit is only supported by MariaDB.")
 
@@ -1164,14 +1136,7 @@ def get_attribute_support(cursor):
     Returns:
         True if attributes are supported, False if they are not.
     """
-    try:
-        # information_schema.tables does not hold the tables within information_schema itself
-        cursor.execute("SELECT attribute FROM INFORMATION_SCHEMA.USER_ATTRIBUTES LIMIT 0")
-        cursor.fetchone()
-    except mysql_driver.Error:
-        return False
-
-    return True
+    return get_server_profile(cursor).get_supports_user_attributes(cursor)
 
 
 def attributes_get(cursor, user, host):
@@ -48,6 +48,8 @@ options:
     - Location, on the remote host, of the dump file to read from or write to.
     - Uncompressed SQL files (C(.sql)) as well as bzip2 (C(.bz2)), gzip (C(.gz)),
       xz (Added in 2.0) and zstd (C(.zst)) (Added in 3.12.0) compressed files are supported.
+    - With I(state=import), a directory written by a dump with I(parallelism) is restored
+      over I(parallelism) connections, see I(parallelism).
     type: path
   single_transaction:
     description:
@@ -168,6 +170,59 @@ options:
       - Whether binary logging should be enabled or disabled for the connection.
     type: bool
     default: true
+  parallelism:
+    description:
+    - Number of connections dumping or restoring tables at the same time when I(state=dump) or I(state=import).
+    - With a value greater than C(1), the module dumps the databases itself instead of running C(mysqldump),
+      and I(target) is a directory. It contains a gzip compressed file with the C(CREATE) statement of
+      every database, table and view, a file of C(INSERT) statements for every chunk of I(dump_chunk_size) rows
+      of every table, and C(manifest.json) listing the files and the binary log coordinates of the dump.
+    - All connections read the same snapshot of the data, started while a global read lock
+      (C(FLUSH TABLES WITH READ LOCK)) is held for a moment, unless I(skip_lock_tables=true).
+      On MySQL 8.0+ the backup lock (C(LOCK INSTANCE FOR BACKUP)) blocks DDL statements during the dump.
+      Tables must use a transactional storage engine like InnoDB to be dumped consistently.
+    - The largest tables are dumped first. Tables with an integer primary key are split into chunks
+      by ranges of the key, so several connections dump them at the same time.
+    - With I(name=all), all databases except C(mysql), C(sys), C(information_schema) and C(performance_schema)
+      are dumped. Stored routines, triggers and events are dumped into a file per database.
+    - The dump is written to a temporary directory next to I(target), which replaces I(target) when it succeeded.
+      An existing I(target) must be an empty directory or a directory written by a previous dump.
+    - Cannot be used with I(master_data) and I(dump_extra_args), other C(mysqldump) options are ignored.
+    - When I(state=import) and I(target) is a directory of such a dump, the module restores it itself instead
+      of running C(mysql). It creates the databases and tables, then the connections restore the files of table rows
+      at the same time, the largest first, each file in a transaction. Views, triggers, stored routines and events
+      are created last, so the triggers do not fire on the restored rows. Tables and other objects of the dump which
+      exist already are dropped and created again. With I(name=all) all databases of the dump are restored,
+      otherwise the database I(name) of the dump. I(encoding), I(force) and I(use_shell) are ignored then.
+    type: int
+    default: 1
+    version_added: '4.3.0'
+  dump_chunk_size:
+    description:
+    - Approximate number of rows of a file of a table when I(parallelism) is greater than C(1).
+    - It is based on the estimated number of rows of the table, tables without an integer
+      primary key are dumped into one file.
+    type: int
+    default: 1000000
+    version_added: '4.3.0'
+  compression_level:
+    description:
+    - Compression level of a compressed I(target) when I(state=dump), from the fastest to the smallest
+      C(1) to C(9) for gzip and bzip2, C(0) to C(9) for xz and C(1) to C(19) for zstd.
+    - The default level of the compression program is used when not set.
+    - Ignored with I(parallelism) greater than C(1), which compresses the files of the dump itself.
+    type: int
+    version_added: '4.3.0'
+  compression_threads:
+    description:
+    - Number of threads compressing a compressed I(target) when I(state=dump),
+      or decompressing it when I(state=import). All CPUs of the host are used when not set.
+    - The multi-threaded programs C(pigz) for gzip, and C(lbzip2) or C(pbzip2) for bzip2, are used
+      when they are installed, otherwise C(gzip) and C(bzip2) with a single thread.
+      C(xz) and C(zstd) are run with C(-T), the threads of I(compression_threads) or all CPUs.
+    - Ignored with I(parallelism) greater than C(1).
+    type: int
+    version_added: '4.3.0'
 
 seealso:
 - module: community.mysql.mysql_info
@@ -317,6 +372,22 @@ EXAMPLES = r'''
     name: bobdata
     state: present
 
+- name: Dump a large database over 8 connections into a directory
+  community.mysql.mysql_db:
+    state: dump
+    name: acme
+    target: /srv/backup/acme
+    parallelism: 8
+  register: backup
+  # backup.dump.binlog holds the binary log coordinates of the dump
+
+- name: Restore the dump over 8 connections
+  community.mysql.mysql_db:
+    state: import
+    name: acme
+    target: /srv/backup/acme
+    parallelism: 8
+
 - name: Dump a database with compression and catch errors from mysqldump with bash pipefail
   community.mysql.mysql_db:
     state: dump
@@ -342,10 +413,145 @@ executed_commands:
   type: list
   sample: ["CREATE DATABASE acme"]
   version_added: '0.1.0'
+dump:
+  description: Summary of the dump when I(parallelism) is greater than C(1).
+  returned: when I(state=dump) and I(parallelism) is greater than C(1)
+  type: dict
+  sample: { "directory": "/srv/backup/acme", "databases": 1, "tables": 212, "views": 3, "triggers": 4, "routines": 2,
+            "events": 0, "chunks": 1934,
+            "rows": 1801200311, "bytes": 201326592000, "consistent": true, "execution_time_ms": 5612043.5512,
+            "binlog": { "file": "binlog.000042", "position": 1523, "gtid_executed": "3E11FA47-71CA-11E1-9E33-C80AA9429562:1-77" } }
+  contains:
+    directory:
+      description: The directory of the dump, I(target).
+      returned: always
+      type: str
+    databases:
+      description: Number of databases dumped.
+      returned: always
+      type: int
+    tables:
+      description: Number of tables dumped.
+      returned: always
+      type: int
+    views:
+      description: Number of views dumped.
+      returned: always
+      type: int
+    triggers:
+      description: Number of triggers dumped.
+      returned: always
+      type: int
+    routines:
+      description: Number of stored procedures and functions dumped.
+      returned: always
+      type: int
+    events:
+      description: Number of events dumped.
+      returned: always
+      type: int
+    chunks:
+      description: Number of files holding table rows.
+      returned: always
+      type: int
+    rows:
+      description: Number of table rows dumped.
+      returned: always
+      type: int
+    bytes:
+      description: Size of the compressed files holding table rows.
+      returned: always
+      type: int
+    consistent:
+      description: Whether all connections read the same snapshot, C(false) with I(skip_lock_tables=true).
+      returned: always
+      type: bool
+    binlog:
+      description:
+      - Binary log file, position and executed GTIDs of the snapshot, C(null) when the binary log is disabled.
+      - Only exact when I(consistent=true).
+      returned: always
+      type: dict
+    execution_time_ms:
+      description: Duration of the dump in milliseconds.
+      returned: always
+      type: float
+  version_added: '4.3.0'
+restore:
+  description:
+  - Summary of the restore when I(state=import) and I(target) is a directory of a dump.
+  - When the restore failed, it tells what was restored until then.
+  returned: when I(state=import) and I(target) is a directory
+  type: dict
+  sample: { "directory": "/srv/backup/acme", "databases": 1, "tables": 212, "views": 3, "triggers": 4, "routines": 2,
+            "events": 0, "chunks": 1934, "rows": 1801200311, "bytes": 201326592000, "execution_time_ms": 7212043.5512,
+            "rows_per_second": 249749.1,
+            "table_progress": [ { "database": "acme", "table": "orders", "chunks": 1210, "rows": 1210000000,
+                                  "bytes": 121634816000, "execution_time_ms": 7150321.0123, "rows_per_second": 169223.5 } ] }
+  contains:
+    directory:
+      description: The directory of the dump, I(target).
+      returned: always
+      type: str
+    databases:
+      description: Number of databases created.
+      returned: always
+      type: int
+    tables:
+      description: Number of tables created.
+      returned: always
+      type: int
+    views:
+      description: Number of views created.
+      returned: always
+      type: int
+    triggers:
+      description: Number of triggers created.
+      returned: always
+      type: int
+    routines:
+      description: Number of stored procedures and functions created.
+      returned: always
+      type: int
+    events:
+      description: Number of events created.
+      returned: always
+      type: int
+    chunks:
+      description: Number of files of table rows restored.
+      returned: always
+      type: int
+    rows:
+      description: Number of table rows restored.
+      returned: always
+      type: int
+    bytes:
+      description: Size of the compressed files of table rows restored.
+      returned: always
+      type: int
+    execution_time_ms:
+      description: Duration of the restore in milliseconds.
+      returned: always
+      type: float
+    rows_per_second:
+      description: Table rows restored per second over the whole restore.
+      returned: always
+      type: float
+    table_progress:
+      description:
+      - Rows restored into every table, and the rows per second from the start of its first file
+        to the end of its last file restored.
+      returned: always
+      type: list
+      elements: dict
+  version_added: '4.3.0'
 '''
 
+import functools
 import os
+import shutil
 import subprocess
+import tempfile
 import traceback
 import shlex
 
@@ -359,11 +565,35 @@ from ansible_collections.community.mysql.plugins.module_utils.mysql import (
     get_server_implementation,
     get_server_version,
 )
+from ansible_collections.community.mysql.plugins.module_utils.parallel_dump import (
+    MANIFEST_FILE,
+    DumpError,
+    dump_databases,
+    restore_databases,
+)
 from ansible_collections.community.mysql.plugins.module_utils.version import LooseVersion
 from ansible.module_utils.common.text.converters import to_native
 
 executed_commands = []
 
+# Compression programs of the target file extensions, the fastest first. Tuples (program,
+# arguments setting the number of threads, threads using all CPUs or None when that is the default).
+# The last program of an extension is the single-threaded fallback
+COMPRESSORS = {
+    '.gz': (('pigz', ('-p', '{0}'), None), ('gzip', (), None)),
+    '.bz2': (('lbzip2', ('-n', '{0}'), None), ('pbzip2', ('-p{0}',), None), ('bzip2', (), None)),
+    '.xz': (('xz', ('-T{0}',), 0),),
+    '.zst': (('zstd', ('-T{0}',), 0),),
+}
+
+# Compression levels of the target file extensions, from the fastest to the smallest
+COMPRESSION_LEVELS = {
+    '.gz': (1, 9),
+    '.bz2': (1, 9),
+    '.xz': (0, 9),
+    '.zst': (1, 19),
+}
+
 # ===========================================
 # MySQL module specific support methods.
 #
@@ -386,13 +616,45 @@ def db_delete(cursor, db):
     return True
 
 
+def get_compressor(module, target, level=None, threads=None):
+    """Return the command line (de)compressing the target file, or None when it is not compressed.
+
+    The fastest program installed is used, multi-threaded ones first.
+
+    Arguments:
+        level (int): Compression level, see COMPRESSION_LEVELS.
+        threads (int): Number of threads, all CPUs when None. Ignored by single-threaded programs.
+    """
+    programs = COMPRESSORS.get(os.path.splitext(target)[-1])
+    if not programs:
+        return None
+
+    for program, thread_args, all_threads in programs:
+        path = module.get_bin_path(program)
+        if path:
+            break
+    else:
+        # Fails with the name of the fallback program
+        path = module.get_bin_path(program, True)
+
+    cmd = [path]
+    if threads is None:
+        threads = all_threads
+    if threads is not None:
+        cmd.extend(arg.format(threads) for arg in thread_args)
+    if level is not None:
+        cmd.append('-%d' % level)
+    return cmd
+
+
 def db_dump(module, host, user, password, db_name, target, all_databases, port,
             config_file, server_implementation, server_version, socket=None,
             ssl_cert=None, ssl_key=None, ssl_ca=None,
             single_transaction=None, quick=None, ignore_tables=None, hex_blob=None,
             encoding=None, force=False, master_data=0, skip_lock_tables=False,
             dump_extra_args=None, unsafe_password=False, restrict_config_file=False,
-            check_implicit_admin=False, pipefail=False):
+            check_implicit_admin=False, pipefail=False, compress=False,
+            compression_level=None, compression_threads=None):
 
     cmd_str = 'mysqldump'
     if server_implementation == 'mariadb' and LooseVersion(server_version) >= LooseVersion("10.4.6"):
@@ -429,6 +691,8 @@ def db_dump(module, host, user, password, db_name, target, all_databases, port,
         cmd.append("--ssl-ca=%s" % shlex.quote(ssl_ca))
     if force:
         cmd.append("--force")
+    if compress:
+        cmd.append("--compress")
     if socket is not None:
         cmd.append("--socket=%s" % shlex.quote(socket))
     else:
@@ -463,20 +727,12 @@ def db_dump(module, host, user, password, db_name, target, all_databases, port,
     if dump_extra_args is not None:
         cmd.append(dump_extra_args)
 
-    path = None
-    if os.path.splitext(target)[-1] == '.gz':
-        path = module.get_bin_path('gzip', True)
-    elif os.path.splitext(target)[-1] == '.bz2':
-        path = module.get_bin_path('bzip2', True)
-    elif os.path.splitext(target)[-1] == '.xz':
-        path = module.get_bin_path('xz', True)
-    elif os.path.splitext(target)[-1] == '.zst':
-        path = module.get_bin_path('zstd', True)
+    compressor = get_compressor(module, target, compression_level, compression_threads)
 
     cmd = ' '.join(cmd)
 
-    if path:
-        cmd = '%s | %s > %s' % (cmd, path, shlex.quote(target))
+    if compressor:
+        cmd = '%s | %s > %s' % (cmd, ' '.join(shlex.quote(arg) for arg in compressor), shlex.quote(target))
         if pipefail:
             cmd = 'set -o pipefail && ' + cmd
     else:
@@ -492,11 +748,89 @@ def db_dump(module, host, user, password, db_name, target, all_databases, port,
     return rc, stdout, stderr
 
 
+def db_dump_parallel(module, connect, db_name, target, all_databases, server_implementation, server_version,
+                     parallelism, chunk_size, ignore_tables=None, skip_lock_tables=False):
+    """Dump the databases into the target directory over parallelism connections, see dump_databases().
+
+    Returns: Tuple (summary dictionary, list of warnings).
+    """
+    target = os.path.abspath(target)
+    if os.path.exists(target):
+        if not os.path.isdir(target):
+            module.fail_json(msg="target %s must be a directory with parallelism" % target)
+        if os.listdir(target) and not os.path.exists(os.path.join(target, MANIFEST_FILE)):
+            module.fail_json(msg="target %s is neither empty nor a directory of a dump" % target)
+
+    try:
+        cursor, db_connection = connect(cursor_class='DictCursor')
+        workers = [connect(cursor_class='SSCursor') for dummy in range(parallelism)]
+    except Exception as e:
+        module.fail_json(msg="unable to open the connections of parallelism: %s" % to_native(e))
+
+    directory = tempfile.mkdtemp(prefix='.%s.' % os.path.basename(target), dir=os.path.dirname(target))
+    try:
+        summary, warnings = dump_databases(cursor, [worker_cursor for worker_cursor, dummy in workers], directory,
+                                           server_implementation, server_version,
+                                           None if all_databases else db_name, ignore_tables or (),
+                                           chunk_size, not skip_lock_tables)
+    except Exception as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        if isinstance(e, DumpError):
+            module.fail_json(msg="Cannot dump %s" % to_native(e))
+        module.fail_json(msg="Cannot dump the databases: %s" % to_native(e))
+    finally:
+        for dummy, worker_connection in workers:
+            worker_connection.close()
+        db_connection.close()
+
+    # Replace the previous dump only now that the new one is complete
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(directory, 0o777 & ~umask)
+    if os.path.exists(target):
+        previous = tempfile.mkdtemp(prefix='.%s.' % os.path.basename(target), dir=os.path.dirname(target))
+        os.rename(target, os.path.join(previous, 'dump'))
+        os.rename(directory, target)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        os.rename(directory, target)
+
+    summary['directory'] = target
+    return summary, warnings
+
+
+def db_restore_parallel(module, connect, db_name, target, all_databases, parallelism):
+    """Restore the databases of the dump directory target over parallelism connections, see restore_databases().
+
+    Returns: The restore summary dictionary.
+    """
+    try:
+        cursor, db_connection = connect()
+        workers = [connect() for dummy in range(parallelism)]
+    except Exception as e:
+        module.fail_json(msg="unable to open the connections of parallelism: %s" % to_native(e))
+
+    progress = {}
+    try:
+        restore_databases(cursor, [worker_cursor for worker_cursor, dummy in workers], os.path.abspath(target),
+                          None if all_databases else db_name, progress)
+    except DumpError as e:
+        module.fail_json(msg="Cannot restore %s" % to_native(e), restore=progress)
+    except Exception as e:
+        module.fail_json(msg="Cannot restore the dump %s: %s" % (target, to_native(e)), restore=progress)
+    finally:
+        for dummy, worker_connection in workers:
+            worker_connection.close()
+        db_connection.close()
+
+    return progress
+
+
 def db_import(module, host, user, password, db_name, target, all_databases, port, config_file,
               server_implementation, server_version, socket=None, ssl_cert=None, ssl_key=None, ssl_ca=None,
               encoding=None, force=False,
               use_shell=False, unsafe_password=False, restrict_config_file=False,
-              check_implicit_admin=False):
+              check_implicit_admin=False, compress=False, compression_threads=None):
     if not os.path.exists(target):
         return module.fail_json(msg="target %s does not exist on the host" % target)
 
@@ -535,6 +869,8 @@ def db_import(module, host, user, password, db_name, target, all_databases, port
         cmd.append("--ssl-ca=%s" % shlex.quote(ssl_ca))
     if force:
         cmd.append("-f")
+    if compress:
+        cmd.append("--compress")
     if socket is not None:
         cmd.append("--socket=%s" % shlex.quote(socket))
     else:
@@ -546,21 +882,14 @@ def db_import(module, host, user, password, db_name, target, all_databases, port
         cmd.append("--one-database")
         cmd.append(shlex.quote(''.join(db_name)))
 
-    comp_prog_path = None
-    if os.path.splitext(target)[-1] == '.gz':
-        comp_prog_path = module.get_bin_path('gzip', required=True)
-    elif os.path.splitext(target)[-1] == '.bz2':
-        comp_prog_path = module.get_bin_path('bzip2', required=True)
-    elif os.path.splitext(target)[-1] == '.xz':
-        comp_prog_path = module.get_bin_path('xz', required=True)
-    elif os.path.splitext(target)[-1] == '.zst':
-        comp_prog_path = module.get_bin_path('zstd', required=True)
-    if comp_prog_path:
+    decompressor = get_compressor(module, target, threads=compression_threads)
+    if decompressor:
+        comp_prog_path = ' '.join(shlex.quote(arg) for arg in decompressor)
         # The line below is for returned data only:
         executed_commands.append('%s -dc %s | %s' % (comp_prog_path, target, cmd))
 
         if not use_shell:
-            p1 = subprocess.Popen([comp_prog_path, '-dc', target], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            p1 = subprocess.Popen(decompressor + ['-dc', target], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             p2 = subprocess.Popen(cmd, stdin=p1.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             (stdout2, stderr2) = p2.communicate()
             p1.stdout.close()
@@ -641,6 +970,10 @@ def main():
         chdir=dict(type='path'),
         pipefail=dict(type='bool', default=True),
         sql_log_bin=dict(type='bool', default=True),
+        parallelism=dict(type='int', default=1),
+        dump_chunk_size=dict(type='int', default=1000000),
+        compression_level=dict(type='int'),
+        compression_threads=dict(type='int'),
     )
 
     module = AnsibleModule(
@@ -648,7 +981,7 @@ def main():
         supports_check_mode=True,
     )
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params["connector"]):
         module.fail_json(msg=mysql_driver_fail_msg)
 
     db = module.params["name"]
@@ -692,6 +1025,11 @@ def main():
     chdir = module.params['chdir']
     pipefail = module.params['pipefail']
     sql_log_bin = module.params["sql_log_bin"]
+    compress = module.params["compress"]
+    parallelism = module.params["parallelism"]
+    dump_chunk_size = module.params["dump_chunk_size"]
+    compression_level = module.params["compression_level"]
+    compression_threads = module.params["compression_threads"]
 
     if chdir:
         try:
@@ -699,6 +1037,26 @@ def main():
         except Exception as e:
             module.fail_json("Cannot change the current directory to %s: %s" % (chdir, e))
 
+    if parallelism < 1:
+        module.fail_json(msg="parallelism must be greater than 0")
+    if dump_chunk_size < 1:
+        module.fail_json(msg="dump_chunk_size must be greater than 0")
+    if compression_threads is not None and compression_threads < 1:
+        module.fail_json(msg="compression_threads must be greater than 0")
+    if compression_level is not None and state == 'dump' and parallelism == 1:
+        extension = os.path.splitext(target or '')[-1]
+        if extension not in COMPRESSION_LEVELS:
+            module.fail_json(msg="compression_level needs a target with one of the extensions %s"
+                                 % ', '.join(sorted(COMPRESSION_LEVELS)))
+        lowest, highest = COMPRESSION_LEVELS[extension]
+        if not lowest <= compression_level <= highest:
+            module.fail_json(msg="compression_level of a %s target must be from %d to %d"
+                                 % (extension, lowest, highest))
+    if parallelism > 1 and state == 'dump':
+        for option in ('master_data', 'dump_extra_args'):
+            if module.params[option]:
+                module.fail_json(msg="%s cannot be used with parallelism" % option)
+
     if len(db) > 1 and state == 'import':
         module.fail_json(msg="Multiple databases are not supported with state=import")
     db_name = ' '.join(db)
@@ -734,12 +1092,27 @@ def main():
         else:
             module.fail_json(msg="unable to find %s. Exception message: %s" % (config_file, to_native(e)))
 
+    # mysql_connect() resolves a login_host list to the host it connected to,
+    # and sets login_unix_socket when it discovered a local socket
+    login_host = module.params["login_host"]
+    login_port = module.params["login_port"]
+    socket = module.params["login_unix_socket"]
+
     if state in ['absent', 'present'] and not sql_log_bin:
         cursor.execute("SET SQL_LOG_BIN=0;")
 
     server_implementation = get_server_implementation(cursor)
     server_version = get_server_version(cursor)
 
+    # Opens more connections like the first one, for parallelism
+    if check_implicit_admin:
+        connect_user, connect_password = 'root', ''
+    else:
+        connect_user, connect_password = login_user, login_password
+    connect = functools.partial(mysql_connect, module, connect_user, connect_password,
+                                module.params['config_file'], ssl_cert, ssl_key, ssl_ca,
+                                connect_timeout=connect_timeout, check_hostname=check_hostname)
+
     changed = False
     if not os.path.exists(config_file):
         config_file = None
@@ -778,6 +1151,14 @@ def main():
             module.fail_json(msg="Cannot dump database(s) %r - not found" % (', '.join(non_existence_list)))
         if module.check_mode:
             module.exit_json(changed=True, db=db_name, db_list=db)
+        if parallelism > 1:
+            summary, warnings = db_dump_parallel(module, connect, db, target, all_databases,
+                                                 server_implementation, server_version, parallelism,
+                                                 dump_chunk_size, ignore_tables, skip_lock_tables)
+            for warning in warnings:
+                module.warn(warning)
+            module.exit_json(changed=True, db=db_name, db_list=db, dump=summary,
+                             executed_commands=executed_commands)
         rc, stdout, stderr = db_dump(module, login_host, login_user,
                                      login_password, db, target, all_databases,
                                      login_port, config_file, server_implementation, server_version,
@@ -785,7 +1166,8 @@ def main():
                                      ssl_ca, single_transaction, quick, ignore_tables,
                                      hex_blob, encoding, force, master_data, skip_lock_tables,
                                      dump_extra_args, unsafe_login_password, restrict_config_file,
-                                     check_implicit_admin, pipefail)
+                                     check_implicit_admin, pipefail, compress,
+                                     compression_level, compression_threads)
         if rc != 0:
             module.fail_json(msg="%s" % stderr)
         module.exit_json(changed=True, db=db_name, db_list=db, msg=stdout,
@@ -793,6 +1175,12 @@ def main():
     elif state == "import":
         if module.check_mode:
             module.exit_json(changed=True, db=db_name, db_list=db)
+        if os.path.isdir(target):
+            if not os.path.exists(os.path.join(target, MANIFEST_FILE)):
+                module.fail_json(msg="target %s is a directory, but not a directory of a dump" % target)
+            summary = db_restore_parallel(module, connect, db, target, all_databases, parallelism)
+            module.exit_json(changed=True, db=db_name, db_list=db, restore=summary,
+                             executed_commands=executed_commands)
         if non_existence_list and not all_databases:
             try:
                 db_create(cursor, non_existence_list, encoding, collation)
@@ -805,7 +1193,8 @@ def main():
                                        login_port, config_file, server_implementation,
                                        server_version, socket, ssl_cert, ssl_key, ssl_ca,
                                        encoding, force, use_shell, unsafe_login_password,
-                                       restrict_config_file, check_implicit_admin)
+                                       restrict_config_file, check_implicit_admin, compress,
+                                       compression_threads)
         if rc != 0:
             module.fail_json(msg="%s" % stderr)
         module.exit_json(changed=True, db=db_name, db_list=db, msg=stdout,
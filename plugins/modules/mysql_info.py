@@ -45,6 +45,26 @@ options:
     - Includes names of empty databases to returned dictionary.
     type: bool
     default: false
+  result_format:
+    description:
+    - Form of I(users_info).
+    - C(records) returns a list of dictionaries, one for each account.
+    - C(columnar) returns a dictionary with C(columns), the list of field names,
+      and C(rows), a list with a list of values for every account. Fields an account does not have are C(null).
+    - Field names are not repeated for every account, which makes the result much smaller on servers with many accounts.
+    type: str
+    choices: [ columnar, records ]
+    default: records
+    version_added: '4.3.0'
+  dictionary_encoding:
+    description:
+    - With I(result_format=columnar), replace the values of string fields with few distinct values
+      by indexes into a list of the distinct values, for example C(host) or C(plugin).
+    - A field is encoded when the number of its distinct values is at most half the number of its non-C(null) values.
+    - The lists are returned in C(dictionaries), keyed by field name.
+    type: bool
+    default: false
+    version_added: '4.3.0'
 
 notes:
 - Compatible with MariaDB or MySQL.
@@ -251,6 +271,8 @@ users_info:
       ``plugin_hash_string`` will most likely be unreadable due to non-binary
       characters.
     - The "locked" field was aded in ``community.mysql`` 3.13.
+    - With I(result_format=columnar), a dictionary with C(columns) and C(rows) keys,
+      and C(dictionaries) if I(dictionary_encoding=true).
   returned: if not excluded by filter
   type: dict
   sample:
@@ -301,6 +323,54 @@ connector_version:
   sample:
   - "1.0.2"
   version_added: '3.6.0'
+connection:
+  description:
+    - Information about the server connection the module used.
+    - I(attempts) is returned when I(login_host) contains several hosts or I(login_host_read_only) is set.
+  returned: always
+  type: dict
+  sample: { "host": "db2", "port": 3306, "transport": "tcp", "retries": 0, "retry_wait_ms": 0.0, "attempts": [
+      { "host": "db1", "port": 3306, "status": "pending", "time_ms": null },
+      { "host": "db2", "port": 3306, "status": "connected", "time_ms": 4.1812 } ] }
+  contains:
+    host:
+      description: Host the module connected to.
+      returned: when connected over TCP
+      type: str
+    port:
+      description: Port the module connected to.
+      returned: when connected over TCP
+      type: int
+    unix_socket:
+      description: Unix socket the module connected to.
+      returned: when connected over a Unix socket
+      type: str
+    transport:
+      description:
+        - C(socket) or C(tcp), how the connection reaches the server.
+      returned: always
+      type: str
+    retries:
+      description:
+        - Number of retries of the connection and of reads, see I(retries).
+      returned: always
+      type: int
+    retry_wait_ms:
+      description:
+        - Total time in milliseconds the module waited before retries.
+      returned: always
+      type: float
+    attempts:
+      description:
+        - Connection attempts, one per host of I(login_host).
+        - I(status) is C(connected) for the used host, C(failed) when the connection failed,
+          C(rejected) when C(@@read_only) did not match I(login_host_read_only), C(discarded) when
+          the host answered after another one, and C(pending) when it had not answered yet.
+        - I(time_ms) is the duration of the attempt in milliseconds.
+      returned: when I(login_host) contains several hosts or I(login_host_read_only) is set
+      type: list
+      elements: dict
+  version_added: '4.3.0'
 '''
 
 from decimal import Decimal
@@ -310,6 +380,9 @@ from ansible_collections.community.mysql.plugins.module_utils.command_resolver i
     CommandResolver
 )
 from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    dictionary_encode,
+    execute_read,
+    get_connection_info,
     mysql_connect,
     mysql_common_argument_spec,
     mysql_driver,
@@ -318,14 +391,7 @@ from ansible_collections.community.mysql.plugins.module_utils.mysql import (
     get_connector_version,
     get_server_implementation,
     get_server_version,
-)
-
-from ansible_collections.community.mysql.plugins.module_utils.user import (
-    privileges_get,
-    get_resource_limits,
-    get_existing_authentication,
-    get_user_implementation,
-    user_is_locked,
+    rows_to_columnar,
 )
 from ansible.module_utils.common.text.converters import to_native
 
@@ -599,6 +665,14 @@ class MySQL_Info(object):
             }
         ]
         """
+        # The user helpers are heavy to import and only needed here
+        from ansible_collections.community.mysql.plugins.module_utils.user import (
+            privileges_get,
+            get_resource_limits,
+            get_existing_authentication,
+            user_is_locked,
+        )
+
         res = self.__exec_sql('SELECT * FROM mysql.user')
         if not res:
             return None
@@ -718,11 +792,10 @@ class MySQL_Info(object):
                 (mainly for DDL queries) (default False).
         """
         try:
-            self.cursor.execute(query)
-
             if not ddl:
-                res = self.cursor.fetchall()
-                return res
+                return execute_read(self.cursor, query)
+
+            self.cursor.execute(query)
             return True
 
         except Exception as e:
@@ -742,6 +815,8 @@ def main():
         filter=dict(type='list', elements='str'),
         exclude_fields=dict(type='list', elements='str'),
         return_empty_dbs=dict(type='bool', default=False),
+        result_format=dict(type='str', default='records', choices=['columnar', 'records']),
+        dictionary_encoding=dict(type='bool', default=False),
     )
 
     module = AnsibleModule(
@@ -768,7 +843,7 @@ def main():
     if exclude_fields:
         exclude_fields = set([f.strip() for f in exclude_fields])
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params['connector']):
         module.fail_json(msg=mysql_driver_fail_msg)
 
     connector_name = get_connector_name(mysql_driver)
@@ -785,6 +860,8 @@ def main():
                'Exception message: %s' % (connector_name, connector_version, config_file, to_native(e)))
         module.fail_json(msg)
 
+    from ansible_collections.community.mysql.plugins.module_utils.user import get_user_implementation
+
     server_implementation = get_server_implementation(cursor)
     server_version = get_server_version(cursor)
     user_implementation = get_user_implementation(cursor)
@@ -794,11 +871,18 @@ def main():
 
     mysql = MySQL_Info(module, cursor, server_implementation, server_version, user_implementation)
 
+    info = mysql.get_info(filter_, exclude_fields, return_empty_dbs)
+    if module.params['result_format'] == 'columnar' and isinstance(info.get('users_info'), list):
+        info['users_info'] = rows_to_columnar(info['users_info'])
+        if module.params['dictionary_encoding']:
+            dictionary_encode(info['users_info'])
+
     module.exit_json(changed=False,
                      server_engine='MariaDB' if server_implementation == 'mariadb' else 'MySQL',
                      connector_name=connector_name,
                      connector_version=connector_version,
-                     **mysql.get_info(filter_, exclude_fields, return_empty_dbs))
+                     connection=get_connection_info(db_conn),
+                     **info)
 
 
 if __name__ == '__main__':
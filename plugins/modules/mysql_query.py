@@ -15,7 +15,7 @@ description:
 - Runs arbitrary MySQL or MariaDB queries.
 - Pay attention, the module does not support check mode!
   All queries will be executed in autocommit mode.
-- To run SQL queries from a file, use M(community.mysql.mysql_db) module.
+- To run SQL queries from a file, use I(script_file) or the M(community.mysql.mysql_db) module.
 version_added: '0.1.0'
 options:
   query:
@@ -29,8 +29,8 @@ options:
       and C(mysqlclient) or C(PyMySQL 0.10.0+) connectors, the module will report
       that the state has been changed even if it has not. If it is important in your
       workflow, use the C(PyMySQL 0.9.3) connector instead.
+    - Required unless I(script_file) is set.
     type: raw
-    required: true
   positional_args:
     description:
     - List of values to be passed as positional arguments to the query.
@@ -57,6 +57,251 @@ options:
      - Cannot be used to set global variables, use the M(community.mysql.mysql_variables) module instead.
      type: dict
      version_added: '3.16.0'
+  batch_args:
+    description:
+    - Run the query once for every parameter set of this list with the driver's C(executemany()),
+      instead of binding I(positional_args) or I(named_args) once.
+    - Elements are lists for C(%s) placeholders or dictionaries for C(%(name)s) placeholders.
+    - Can also be the path of a file on the target host. A C(.csv) file has a header line with the parameter names
+      and C(\N) fields are passed as C(NULL), like in C(LOAD DATA). A C(.jsonl) file has one JSON list or object per line.
+      The file is read batch by batch.
+    - The connectors rewrite a single-row C(INSERT ... VALUES) or C(REPLACE ... VALUES) query into
+      multi-row statements, which is much faster than running it for every parameter set.
+    - Requires exactly one query in I(query).
+    - Mutually exclusive with I(positional_args), I(named_args), I(output_file) and I(single_transaction).
+    type: raw
+    version_added: '4.3.0'
+  batch_size:
+    description:
+    - Number of parameter sets of I(batch_args) passed to C(executemany()) at once.
+    type: int
+    default: 1000
+    version_added: '4.3.0'
+  batch_commit_interval:
+    description:
+    - Commit after this number of batches of I(batch_args), and after the last batch.
+    - If the module fails, the batches committed before stay in the database.
+    - If not set, every statement is committed by autocommit.
+    type: int
+    version_added: '4.3.0'
+  result_format:
+    description:
+    - Form of the rows of every query in I(query_result).
+    - C(records) returns a list of dictionaries in C(column:value) form.
+    - C(columnar) returns a dictionary with C(columns), the list of column names,
+      and C(rows), a list with a list of values for every row.
+      Column names are not repeated for every row, so large results take much less memory and time to transfer.
+    type: str
+    choices: [ columnar, records ]
+    default: records
+    version_added: '4.3.0'
+  dictionary_encoding:
+    description:
+    - With I(result_format=columnar), replace the values of string columns with few distinct values
+      by indexes into a list of the distinct values.
+    - A column is encoded when the number of its distinct values is at most half the number of its non-C(NULL) values.
+    - The lists are returned in C(dictionaries), keyed by column name. C(NULL) values are not encoded.
+    type: bool
+    default: false
+    version_added: '4.3.0'
+  query_stats:
+    description:
+    - Collect execution statistics of every query and return them in I(query_stats).
+    - C(none) does not collect statistics.
+    - C(explain) returns the plan of every C(SELECT), C(TABLE), C(WITH), C(INSERT), C(REPLACE), C(UPDATE)
+      and C(DELETE) query from C(EXPLAIN FORMAT=JSON), run before the query,
+      and the statement counters the server recorded in C(performance_schema.events_statements_history).
+    - C(analyze) is like C(explain), but the plan of C(SELECT), C(TABLE) and C(WITH) queries comes from
+      C(EXPLAIN ANALYZE) on MySQL 8.0.18 and later, or C(ANALYZE FORMAT=JSON) on MariaDB, which contain
+      the measured rows and times of every step. These statements run the query, so it runs twice.
+      On older MySQL versions C(EXPLAIN FORMAT=JSON) is used.
+    - The statement counters require the C(events_statements_history) consumer of the Performance Schema to be enabled
+      and the C(SELECT) privilege on C(performance_schema). When they are not available, I(statement) is C(null).
+    type: str
+    choices: [ analyze, explain, none ]
+    default: none
+    version_added: '4.3.0'
+  parallelism:
+    description:
+    - Number of connections running the queries of I(query) at the same time.
+    - With a value greater than C(1), every connection runs the next query of the list that has not started yet,
+      so the queries must not depend on each other. The results are returned in the order of I(query).
+    - I(session_vars) are set on every connection.
+    - When a query fails, no more queries are started and the module fails with the error
+      of the first failed query in the list. Unlike with C(1), queries after the failed one may have run.
+    - Cannot be greater than C(1) with I(single_transaction), I(output_file) or I(batch_args).
+    type: int
+    default: 1
+    version_added: '4.3.0'
+  query_timeout:
+    description:
+    - Cancel a query of I(query) that runs longer than I(query_timeout) seconds and fail.
+    - The server limits the execution time of statements with the C(max_statement_time) session variable
+      on MariaDB, and of C(SELECT) statements with the C(max_execution_time) session variable on MySQL.
+      Set in I(session_vars), these variables take precedence.
+    - For the statements the server does not limit, a watchdog opens another connection when the time is up
+      and cancels the query with C(KILL QUERY). The statement is rolled back, the connection stays open.
+      For the statements the server limits, the watchdog only cancels the query when it still runs
+      one second after the server's limit, for example because the limit does not apply to it.
+    - The failed query and how long it ran are returned in I(timed_out).
+    - Cannot be used with I(batch_args), I(script_file) or I(chunk_table).
+    type: float
+    version_added: '4.3.0'
+  read_from:
+    description:
+    - Replicas to run the queries on, as C(host) or C(host:port).
+    - The module connects to all of them at the same time with the same credentials and TLS options
+      as to I(login_host), measures their replication lag, and runs the queries on the replica
+      with the least lag. Replicas that cannot be reached, do not replicate or lag more than I(read_max_lag)
+      are skipped, when no replica is left the queries run on the server of I(login_host) with a warning.
+    - The lag is C(Seconds_Behind_Source) of C(SHOW REPLICA STATUS), or the age of the newest row
+      of I(read_heartbeat_table).
+    - All queries must be read-only, starting with C(SELECT), C(SHOW), C(DESC), C(DESCRIBE) or C(EXPLAIN).
+    - The server that answered is returned in I(routing) and I(connection).
+    - Cannot be used with I(batch_args), I(script_file) or I(chunk_table).
+    type: list
+    elements: str
+    version_added: '4.3.0'
+  read_max_lag:
+    description:
+    - Maximum replication lag in seconds of a replica in I(read_from) to run the queries on.
+    - By default, every replica that replicates qualifies.
+    type: float
+    version_added: '4.3.0'
+  read_heartbeat_table:
+    description:
+    - Table a tool like C(pt-heartbeat) updates on the primary, its C(ts) column holding the time of the update.
+    - The replication lag of the replicas in I(read_from) is measured with it instead of C(SHOW REPLICA STATUS).
+    type: str
+    version_added: '4.3.0'
+  prepared:
+    description:
+    - Run the queries as server-side prepared statements.
+    - Every connection prepares a query once with C(PREPARE) and runs it with C(EXECUTE), so the server
+      parses it only once when it runs with several parameter sets of I(batch_args),
+      or several times in I(query). Parameters are sent in user variables C(@_ansible_p0), C(@_ansible_p1)
+      and so on, set by one C(SET) statement before every C(EXECUTE).
+    - Up to 64 statements are kept prepared per connection, the least recently used one is deallocated
+      when another one is prepared. All are deallocated before the module exits.
+    - The drivers do not support the binary protocol, so every execution with parameters takes two statements
+      instead of one. This pays off for queries that take long to parse and optimize, not for simple point queries.
+    - Statements the server cannot prepare run as plain queries.
+    - With I(batch_args), every parameter set runs as one C(EXECUTE), also for C(INSERT) queries
+      that are otherwise sent as one multi-row C(INSERT) per batch.
+    - I(executed_queries) contains the queries without the parameters.
+    type: bool
+    default: false
+    version_added: '4.3.0'
+  script_file:
+    description:
+    - Path to a SQL script on the target host to run instead of I(query).
+    - The script can be compressed with gzip, bzip2 or xz, it is decompressed while it is read.
+    - The script is split into statements like the C(mysql) client does, so C(DELIMITER) commands,
+      quoted strings, comments and versioned comments like C(/*!40101 SET NAMES utf8 */) are handled.
+      Every statement runs as soon as it is read, so the size of the script does not affect the memory use of the module.
+    - Rows returned by statements are discarded.
+    - Mutually exclusive with I(query), I(positional_args), I(named_args), I(batch_args) and I(output_file).
+    type: path
+    version_added: '4.3.0'
+  script_commit_interval:
+    description:
+    - Run the statements of I(script_file) in transactions committed every I(script_commit_interval) statements.
+    - Without it every statement is committed when it completes, unless I(single_transaction) is set.
+    - Statements like C(CREATE TABLE) commit implicitly on the server.
+    type: int
+    version_added: '4.3.0'
+  script_resume_from:
+    description:
+    - Number of the first statement of I(script_file) to run, the statements are numbered from C(1).
+    - The statements before it are skipped, except C(SET) and C(USE) statements, so the session is
+      set up like in the first run.
+    - When the script fails, the module returns the number to resume from in I(script.resume_from).
+    type: int
+    default: 1
+    version_added: '4.3.0'
+  chunk_table:
+    description:
+    - Run I(query) in chunks of I(chunk_size) rows of this table, for example to update or delete
+      many rows without long transactions, lock waits and replication lag.
+    - The module walks the index of I(chunk_column) and runs I(query) once for every range of
+      I(chunk_size) rows. I(query) selects the rows of the range with the C(%(chunk_start)s)
+      and C(%(chunk_end)s) placeholders, like C(WHERE id BETWEEN %(chunk_start)s AND %(chunk_end)s).
+    - Every chunk is committed when it completes. When a chunk fails, the chunks before it stay
+      committed and I(chunks.last_chunk_end) tells where to continue.
+    - I(query) must be a single query. I(named_args) are passed to every chunk.
+    - Mutually exclusive with I(positional_args), I(batch_args), I(script_file), I(output_file)
+      and I(single_transaction).
+    type: str
+    version_added: '4.3.0'
+  chunk_column:
+    description:
+    - Column of I(chunk_table) to walk, it must be the first column of an index.
+    - The first column of the primary key is used by default.
+    type: str
+    version_added: '4.3.0'
+  chunk_size:
+    description:
+    - Number of rows of I(chunk_table) in a chunk.
+    type: int
+    default: 1000
+    version_added: '4.3.0'
+  chunk_max_lag:
+    description:
+    - Pause between chunks while the replication lag of a replica in I(chunk_replicas) is more than
+      I(chunk_max_lag) seconds.
+    - The lag is C(Seconds_Behind_Source) of C(SHOW REPLICA STATUS), or the age of the newest row
+      of I(chunk_heartbeat_table).
+    - The module fails when replication is not running on a replica.
+    type: float
+    version_added: '4.3.0'
+  chunk_replicas:
+    description:
+    - Replicas to check the lag of, as C(host) or C(host:port), see I(chunk_max_lag).
+    - The module connects to them with the same credentials and TLS options as to I(login_host).
+    type: list
+    elements: str
+    version_added: '4.3.0'
+  chunk_heartbeat_table:
+    description:
+    - Table a tool like C(pt-heartbeat) updates on the primary, its C(ts) column holding the time of the update.
+    - The replication lag of I(chunk_max_lag) is measured with it instead of C(SHOW REPLICA STATUS),
+      which is more precise and works with every replication topology.
+    type: str
+    version_added: '4.3.0'
+  chunk_max_threads_running:
+    description:
+    - Pause between chunks while the C(Threads_running) status variable of the server is more than this.
+    type: int
+    version_added: '4.3.0'
+  output_file:
+    description:
+    - Write the rows returned by the queries to this file on the target host instead of returning them.
+    - The rows are read from the server with an unbuffered cursor and written batch by batch,
+      so the size of the result does not affect the memory use of the module.
+    - The file is written to a temporary file next to it and moved into place when all queries succeeded.
+    - When I(query) is a list, the rows of all queries returning rows are written one after another.
+    - I(query_result) contains an empty list for every query.
+    type: path
+    version_added: '4.3.0'
+  output_format:
+    description:
+    - Format of I(output_file).
+    - C(jsonl) writes one JSON object per row in C(column:value) form like in I(query_result).
+    - C(csv) writes a header line with the column names for every query returning rows, then one line per row.
+      C(NULL) is written as an empty field.
+    - In both formats, values the server returns as bytes, like those of C(BLOB), C(BINARY) and C(BIT) columns,
+      are written as base64 strings. Other values that are not numbers or strings are written as strings.
+    type: str
+    choices: [ csv, jsonl ]
+    default: jsonl
+    version_added: '4.3.0'
+  output_compression:
+    description:
+    - Compress I(output_file) while it is written.
+    type: str
+    choices: [ bz2, gzip, none, xz ]
+    default: none
+    version_added: '4.3.0'
 attributes:
   check_mode:
     support: none
@@ -104,6 +349,105 @@ EXAMPLES = r'''
       - INSERT INTO articles (id, story) VALUES (2, 'my_long_story')
       - INSERT INTO prices (id, price) VALUES (123, '100.00')
     single_transaction: true
+
+- name: Export a large table to a compressed JSON Lines file on the target host
+  community.mysql.mysql_query:
+    login_db: acme
+    query: SELECT * FROM orders
+    output_file: /srv/export/orders.jsonl.gz
+    output_compression: gzip
+
+- name: Insert rows from a CSV file with a header line id,story, committing every 10000 rows
+  community.mysql.mysql_query:
+    login_db: acme
+    query: INSERT INTO articles (id, story) VALUES (%(id)s, %(story)s)
+    batch_args: /srv/import/articles.csv
+    batch_size: 1000
+    batch_commit_interval: 10
+
+- name: Update many rows by primary key, parsing the query only once
+  community.mysql.mysql_query:
+    login_db: acme
+    query: UPDATE orders SET status = %(status)s WHERE id = %(id)s
+    batch_args: /srv/import/order_status.jsonl
+    prepared: true
+
+- name: Run a compressed migration script, committing every 1000 statements
+  community.mysql.mysql_query:
+    login_db: acme
+    script_file: /srv/migrations/2024-05-seed.sql.gz
+    script_commit_interval: 1000
+  register: migration
+
+- name: Continue the migration after fixing the statement it failed on
+  community.mysql.mysql_query:
+    login_db: acme
+    script_file: /srv/migrations/2024-05-seed.sql.gz
+    script_commit_interval: 1000
+    script_resume_from: "{{ migration.script.resume_from }}"
+  when: migration is failed
+
+- name: Delete old orders in chunks of 5000 rows while the replicas keep up
+  community.mysql.mysql_query:
+    login_db: acme
+    query: >-
+      DELETE FROM orders WHERE id BETWEEN %(chunk_start)s AND %(chunk_end)s
+      AND created < %(created)s
+    named_args:
+      created: '2020-01-01'
+    chunk_table: orders
+    chunk_size: 5000
+    chunk_max_lag: 2
+    chunk_replicas:
+      - db2.example.com
+      - db3.example.com:3307
+    chunk_max_threads_running: 50
+
+- name: Run a report on the least lagged replica that is at most 30 seconds behind
+  community.mysql.mysql_query:
+    login_host: db1.example.com
+    login_db: acme
+    query: SELECT country, SUM(total) AS revenue FROM orders GROUP BY country
+    read_from:
+      - db2.example.com
+      - db3.example.com:3307
+    read_max_lag: 30
+  register: report
+  # report.routing.server is the replica that answered
+
+- name: Return a large result in columnar form with low-cardinality columns dictionary encoded
+  community.mysql.mysql_query:
+    login_db: acme
+    query: SELECT id, status, country FROM orders
+    result_format: columnar
+    dictionary_encoding: true
+  register: orders
+  # orders.query_result[0] is like
+  # {"columns": ["id", "status", "country"], "rows": [[1, "new", 0], [2, "shipped", 0]],
+  #  "dictionaries": {"country": ["NL"]}}
+
+- name: Analyze the tables of acme over four connections
+  community.mysql.mysql_query:
+    login_db: acme
+    query:
+      - ANALYZE TABLE orders
+      - ANALYZE TABLE customers
+      - ANALYZE TABLE articles
+      - ANALYZE TABLE prices
+    parallelism: 4
+
+- name: Run a migration and show why its statements were slow
+  community.mysql.mysql_query:
+    login_db: acme
+    query:
+      - UPDATE orders SET status = 'archived' WHERE created < '2020-01-01'
+      - SELECT COUNT(*) FROM orders WHERE status = 'archived'
+    query_stats: explain
+  register: migration
+
+- name: Show the rows every query examined
+  ansible.builtin.debug:
+    msg: "{{ migration.query_stats | map(attribute='statement.rows_examined') | list }}"
 '''
 
 RETURN = r'''
@@ -116,6 +460,8 @@ query_result:
     description:
     - List of lists (sublist for each query) containing dictionaries
       in column:value form representing returned rows.
+    - With I(result_format=columnar), list of dictionaries (one for each query) with C(columns) and C(rows) keys,
+      and C(dictionaries) if I(dictionary_encoding=true).
     returned: changed
     type: list
     sample: [[{"Column": "Value1"},{"Column": "Value2"}], [{"ID": 1}, {"ID": 2}]]
@@ -133,26 +479,1123 @@ execution_time_ms:
     type: list
     sample: [7104, 85]
     version_added: '3.12.0'
+query_stats:
+    description: Execution statistics of every query, see I(query_stats).
+    returned: when I(query_stats) is not C(none)
+    type: list
+    elements: dict
+    sample: [ { "plan": { "query_block": { "select_id": 1, "cost_info": { "query_cost": "1.10" } } },
+                "plan_format": "json", "analyzed": false,
+                "statement": { "rows_examined": 9, "rows_sent": 0, "rows_affected": 9, "created_tmp_tables": 0,
+                               "created_tmp_disk_tables": 0, "sort_merge_passes": 0, "sort_rows": 0,
+                               "no_index_used": true, "no_good_index_used": false,
+                               "lock_time_ms": 0.004, "timer_wait_ms": 1.2251 } } ]
+    contains:
+      plan:
+        description:
+        - The plan of the query, a dictionary when I(plan_format=json), a string when I(plan_format=tree).
+        - C(null) for queries that cannot be explained.
+        returned: always
+        type: raw
+      plan_format:
+        description: C(json) or C(tree), C(null) when I(plan) is C(null).
+        returned: always
+        type: str
+      analyzed:
+        description: Whether I(plan) contains the rows and times measured while running the query.
+        returned: always
+        type: bool
+      statement:
+        description:
+        - Counters of the query from C(performance_schema.events_statements_history).
+        - The counts are the lowercase column names of the table, times are in milliseconds.
+        - C(null) when the Performance Schema does not have them.
+        returned: always
+        type: dict
+    version_added: '4.3.0'
+batches:
+    description: Rows affected and execution time of every batch of I(batch_args).
+    returned: when I(batch_args) is set
+    type: list
+    elements: dict
+    sample: [ { "rowcount": 1000, "time_ms": 85.1532 }, { "rowcount": 250, "time_ms": 24.0021 } ]
+    contains:
+      rowcount:
+        description: Number of rows affected by the batch.
+        returned: always
+        type: int
+      time_ms:
+        description: Execution time of the batch in milliseconds.
+        returned: always
+        type: float
+    version_added: '4.3.0'
+output:
+    description: Information about I(output_file).
+    returned: when I(output_file) is set
+    type: dict
+    sample: { "path": "/srv/export/orders.jsonl.gz", "rows": 1000000, "bytes": 21474836,
+              "checksum": "2a9b8e7c3f6d1e0a5b4c8d7e6f5a4b3c2d1e0f9a" }
+    contains:
+      path:
+        description: Path of the file.
+        returned: always
+        type: str
+      rows:
+        description: Number of rows written.
+        returned: always
+        type: int
+      bytes:
+        description: Size of the file in bytes, after compression.
+        returned: always
+        type: int
+      checksum:
+        description: SHA1 checksum of the file.
+        returned: always
+        type: str
+    version_added: '4.3.0'
+script:
+    description: Progress of I(script_file), also returned when the script failed.
+    returned: when I(script_file) is set
+    type: dict
+    sample: { "path": "/srv/migrations/seed.sql.gz", "statements": 51200, "skipped": 0, "rowcount": 10240000,
+              "commits": 51, "execution_time_ms": 381532.1265, "resume_from": 51201 }
+    contains:
+      path:
+        description: Path of the script.
+        returned: always
+        type: str
+      statements:
+        description: Number of statements run.
+        returned: always
+        type: int
+      skipped:
+        description: Number of statements skipped because of I(script_resume_from).
+        returned: always
+        type: int
+      rowcount:
+        description: Sum of the rows affected by the statements.
+        returned: always
+        type: int
+      commits:
+        description: Number of commits made because of I(script_commit_interval) or I(single_transaction).
+        returned: always
+        type: int
+      execution_time_ms:
+        description: Total execution time of the statements in milliseconds.
+        returned: always
+        type: float
+      resume_from:
+        description:
+        - Value of I(script_resume_from) that continues the script after the statements it committed.
+        - After a failure, the statements from this one on were not run or were rolled back.
+        returned: always
+        type: int
+    version_added: '4.3.0'
+chunks:
+    description: Progress of I(chunk_table), also returned when a chunk failed.
+    returned: when I(chunk_table) is set
+    type: dict
+    sample: { "count": 1200, "rowcount": 5998211, "throttled": 14, "throttle_time_ms": 21500.0,
+              "execution_time_ms": 612043.5512, "last_chunk_end": 6000000 }
+    contains:
+      count:
+        description: Number of chunks run.
+        returned: always
+        type: int
+      rowcount:
+        description: Sum of the rows affected by the chunks.
+        returned: always
+        type: int
+      throttled:
+        description: Number of pauses made because of I(chunk_max_lag) or I(chunk_max_threads_running).
+        returned: always
+        type: int
+      throttle_time_ms:
+        description: Total time of the pauses in milliseconds.
+        returned: always
+        type: float
+      execution_time_ms:
+        description: Total execution time of the chunks in milliseconds.
+        returned: always
+        type: float
+      last_chunk_end:
+        description:
+        - Value of I(chunk_column) the last committed chunk ended at, C(null) before the first chunk.
+        returned: always
+        type: raw
+    version_added: '4.3.0'
+routing:
+    description: The server the queries ran on because of I(read_from), and the lag of the replicas.
+    returned: when I(read_from) is set
+    type: dict
+    sample: { "role": "replica", "server": "db3.example.com:3307", "lag": 0.0, "candidates": [
+        { "server": "db2.example.com:3306", "lag": 42.0, "error": null },
+        { "server": "db3.example.com:3307", "lag": 0.0, "error": null } ] }
+    contains:
+      role:
+        description: C(replica) when a replica ran the queries, C(primary) when the server of I(login_host) did.
+        returned: always
+        type: str
+        choices: [ primary, replica ]
+      server:
+        description: The replica that ran the queries as C(host:port), C(null) for the primary.
+        returned: always
+        type: str
+      lag:
+        description: Replication lag in seconds of the replica that ran the queries, C(null) for the primary.
+        returned: always
+        type: float
+      candidates:
+        description: The replicas of I(read_from), with their lag or the error that disqualified them.
+        returned: always
+        type: list
+        elements: dict
+    version_added: '4.3.0'
+timed_out:
+    description: The query cancelled because of I(query_timeout).
+    returned: when a query ran longer than I(query_timeout)
+    type: dict
+    sample: { "query": "SELECT COUNT(*) FROM orders", "execution_time_ms": 30001.8341, "cancelled_by": "server" }
+    contains:
+      query:
+        description: The cancelled query.
+        returned: always
+        type: str
+      execution_time_ms:
+        description: How long the query ran in milliseconds.
+        returned: always
+        type: float
+      cancelled_by:
+        description:
+        - C(server) when the server cancelled the query because of its session variables,
+          C(watchdog) when the module cancelled it with C(KILL QUERY).
+        returned: always
+        type: str
+        choices: [ server, watchdog ]
+    version_added: '4.3.0'
+prepared_statements:
+    description: Number of statements prepared and executed, see I(prepared).
+    returned: when I(prepared=true)
+    type: dict
+    sample: { "prepared": 1, "executed": 10000 }
+    contains:
+      prepared:
+        description: Number of C(PREPARE) statements run, including those deallocated to make room for others.
+        returned: always
+        type: int
+      executed:
+        description: Number of C(EXECUTE) statements run.
+        returned: always
+        type: int
+    version_added: '4.3.0'
+connection:
+    description:
+    - Information about the server connection the module used.
+    - I(attempts) is returned when I(login_host) contains several hosts or I(login_host_read_only) is set.
+    returned: always
+    type: dict
+    sample: { "host": "db2", "port": 3306, "transport": "tcp", "retries": 0, "retry_wait_ms": 0.0, "attempts": [
+        { "host": "db1", "port": 3306, "status": "pending", "time_ms": null },
+        { "host": "db2", "port": 3306, "status": "connected", "time_ms": 4.1812 } ] }
+    contains:
+      host:
+        description: Host the module connected to.
+        returned: when connected over TCP
+        type: str
+      port:
+        description: Port the module connected to.
+        returned: when connected over TCP
+        type: int
+      unix_socket:
+        description: Unix socket the module connected to.
+        returned: when connected over a Unix socket
+        type: str
+      transport:
+        description:
+        - C(socket) or C(tcp), how the connection reaches the server.
+        returned: always
+        type: str
+      retries:
+        description:
+        - Number of retries of the connection and of reads, see I(retries).
+        returned: always
+        type: int
+      retry_wait_ms:
+        description:
+        - Total time in milliseconds the module waited before retries.
+        returned: always
+        type: float
+      attempts:
+        description:
+        - Connection attempts, one per host of I(login_host).
+        - I(status) is C(connected) for the used host, C(failed) when the connection failed,
+          C(rejected) when C(@@read_only) did not match I(login_host_read_only), C(discarded) when
+          the host answered after another one, and C(pending) when it had not answered yet.
+        - I(time_ms) is the duration of the attempt in milliseconds.
+        returned: when I(login_host) contains several hosts or I(login_host_read_only) is set
+        type: list
+        elements: dict
+    version_added: '4.3.0'
 '''
 
+import base64
+import bz2
+import csv
+import functools
+import gzip
 import json
+import lzma
+import math
+import os
+import queue
+import tempfile
+import threading
 import time
 import warnings
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.community.mysql.plugins.module_utils.database import mysql_quote_identifier
 from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    PreparedStatements,
+    dictionary_encode,
+    fetch_row_batches,
+    get_connection_info,
+    get_replica_lag,
+    get_row_converter,
+    get_server_profile,
     mysql_connect,
     mysql_common_argument_spec,
     mysql_driver,
     mysql_driver_fail_msg,
+    parse_login_hosts,
     set_session_vars,
 )
+from ansible_collections.community.mysql.plugins.module_utils.sql_script import open_script, split_statements
+from ansible_collections.community.mysql.plugins.module_utils.version import LooseVersion
 from ansible.module_utils.common.text.converters import to_native
 
 DML_QUERY_KEYWORDS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
 # TRUNCATE is not DDL query but it also returns 0 rows affected:
 DDL_QUERY_KEYWORDS = ('CREATE', 'DROP', 'ALTER', 'RENAME', 'TRUNCATE')
 
+# Queries read_from can run on a replica
+READ_ONLY_QUERY_KEYWORDS = ('SELECT', 'SHOW', 'DESC', 'DESCRIBE', 'EXPLAIN')
+
+# Functions opening output_file in text mode for each output_compression
+OUTPUT_OPENERS = {
+    'none': open,
+    # Level 6 is the zlib default, the gzip module's 9 costs much time for a few percent
+    'gzip': functools.partial(gzip.open, compresslevel=6),
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+# Placeholders of the chunk range in the query of chunked mode
+CHUNK_PLACEHOLDERS = ('%(chunk_start)s', '%(chunk_end)s')
+
+# Chunked mode checks the throttling conditions at most once in this many seconds
+CHUNK_CHECK_INTERVAL = 1.0
+
+# First and longest pause of chunked mode while it is throttled, in seconds
+CHUNK_THROTTLE_DELAY = 0.25
+CHUNK_THROTTLE_MAX_DELAY = 10.0
+
+# Errors of statements cancelled by KILL QUERY, MariaDB's max_statement_time and MySQL's max_execution_time
+QUERY_TIMEOUT_ERROR_CODES = (1317, 1969, 3024)
+SERVER_TIMEOUT_ERROR_CODES = (1969, 3024)
+
+# Seconds QueryWatchdog waits beyond the execution time limit of the server
+QUERY_WATCHDOG_GRACE = 1.0
+
+# Queries EXPLAIN accepts, and the ones EXPLAIN ANALYZE may run
+EXPLAIN_QUERY_KEYWORDS = ('SELECT', 'TABLE', 'WITH', 'INSERT', 'REPLACE', 'UPDATE', 'DELETE')
+ANALYZE_QUERY_KEYWORDS = ('SELECT', 'TABLE', 'WITH')
+
+# Columns of performance_schema.events_statements_history returned in query_stats,
+# the timers are in picoseconds
+STATEMENT_COUNTERS = ('ROWS_EXAMINED', 'ROWS_SENT', 'ROWS_AFFECTED', 'CREATED_TMP_TABLES',
+                      'CREATED_TMP_DISK_TABLES', 'SORT_MERGE_PASSES', 'SORT_ROWS')
+STATEMENT_FLAGS = ('NO_INDEX_USED', 'NO_GOOD_INDEX_USED')
+STATEMENT_TIMERS = ('LOCK_TIME', 'TIMER_WAIT')
+
+
+def read_batch_args_file(path):
+    """Yield parameter sets from a CSV or JSON Lines file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield dict((key, None if value == '\\N' else value) for key, value in row.items())
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_batches(params, batch_size):
+    """Yield lists of at most batch_size elements of params."""
+    batch = []
+    for param in params:
+        batch.append(param)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def execute_batches(cursor, db_connection, query, batches, commit_interval=None, statements=None):
+    """Run query with executemany() for every batch of parameter sets.
+
+    With statements, a PreparedStatements object, the query runs as a prepared statement.
+
+    Returns: List of dictionaries with rowcount and time_ms of every batch.
+    """
+    results = []
+    for batch in batches:
+        batch_rowcount, exec_time_ms = execute_many_and_return_time(cursor, query, batch, statements)
+        results.append({'rowcount': batch_rowcount, 'time_ms': exec_time_ms})
+        if commit_interval and len(results) % commit_interval == 0:
+            db_connection.commit()
+
+    if commit_interval and len(results) % commit_interval:
+        db_connection.commit()
+
+    return results
+
+
+def encode_output_value(value):
+    """Convert a value of an output_file row that JSON and CSV cannot write as is to a string.
+
+    Bytes are encoded in base64, other values are converted with str().
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+def _csv_field(value):
+    if value is None:
+        return ''
+    if isinstance(value, (bytes, bytearray)):
+        return encode_output_value(value)
+    return value
+
+
+class OutputFile():
+    """Write query results to a file batch by batch.
+
+    Rows are written to a temporary file in the directory of the file,
+    which replaces the file when close() is called.
+    """
+
+    def __init__(self, module, path, output_format, compression):
+        self.module = module
+        self.path = path
+        self.output_format = output_format
+        self.rows = 0
+
+        fd, self.tmp_path = tempfile.mkstemp(prefix='.ansible_tmp', dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        # Removed when the module fails
+        module.add_cleanup_file(self.tmp_path)
+        self.fh = OUTPUT_OPENERS[compression](self.tmp_path, 'wt', encoding='utf-8', newline='')
+        if output_format == 'csv':
+            self.csv_writer = csv.writer(self.fh)
+
+    def write_result(self, cursor):
+        """Write the rows of the last executed statement.
+
+        Returns: Number of rows written.
+        """
+        if cursor.description is None:
+            # The statement does not return rows
+            return 0
+
+        if self.output_format == 'csv':
+            self.csv_writer.writerow([column[0] for column in cursor.description])
+
+        rows = 0
+        for batch in fetch_row_batches(cursor):
+            if self.output_format == 'csv':
+                # Dict rows keep the column order, duplicate column names get other keys
+                self.csv_writer.writerows([[_csv_field(v) for v in row.values()] for row in batch])
+            else:
+                self.fh.write(''.join(json.dumps(dict(row), default=encode_output_value) + '\n' for row in batch))
+            rows += len(batch)
+
+        self.rows += rows
+        return rows
+
+    def close(self):
+        """Move the file into place.
+
+        Returns: Dictionary with the path, rows, bytes and checksum of the file.
+        """
+        self.fh.close()
+        self.module.atomic_move(self.tmp_path, self.path)
+        return {
+            'path': self.path,
+            'rows': self.rows,
+            'bytes': os.path.getsize(self.path),
+            'checksum': self.module.sha1(self.path),
+        }
+
+
+class QueryStats():
+    """Collect the plan and the Performance Schema counters of queries.
+
+    Uses its own buffered cursor, so the rows of the module cursor
+    must be fetched before statement() is called.
+    """
+
+    def __init__(self, module, db_connection, mode):
+        self.module = module
+        self.cursor = db_connection.cursor()
+        self.analyze = mode == 'analyze'
+        self._analyze_statement = None
+        self._thread_id = None
+        # Cleared when the counters cannot be read, so the module warns once
+        self._statements_available = True
+
+    def _get_analyze_statement(self):
+        """Return the statement prefix running and explaining a query, or None."""
+        if self._analyze_statement is None:
+            profile = get_server_profile(self.cursor)
+            if profile.implementation == 'mariadb':
+                self._analyze_statement = 'ANALYZE FORMAT=JSON '
+            elif LooseVersion(profile.version) >= LooseVersion('8.0.18'):
+                self._analyze_statement = 'EXPLAIN ANALYZE '
+            else:
+                self._analyze_statement = ''
+        return self._analyze_statement or None
+
+    def _lookup_thread(self):
+        """Look up the Performance Schema thread of the connection once.
+
+        The lookup is a statement of the session itself, so it must run
+        before the query, or it is the last statement statement() reads.
+        """
+        if self._thread_id is not None or not self._statements_available:
+            return
+
+        try:
+            # PS_CURRENT_THREAD_ID() is only available on MySQL 8.0.16 and later
+            self.cursor.execute("SELECT THREAD_ID FROM performance_schema.threads "
+                                "WHERE PROCESSLIST_ID = CONNECTION_ID()")
+            row = self.cursor.fetchone()
+        except mysql_driver.Error as e:
+            self._statements_available = False
+            self.module.warn("Cannot read performance_schema.threads: %s" % to_native(e))
+            return
+
+        if row is None:
+            # The thread is not instrumented
+            self._statements_available = False
+            return
+        self._thread_id = row[0]
+
+    def explain(self, query, args):
+        """Run before the query.
+
+        Returns: Dictionary with the plan, plan_format and analyzed keys.
+        """
+        self._lookup_thread()
+        keyword = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+        stats = {'plan': None, 'plan_format': None, 'analyzed': False}
+        if keyword not in EXPLAIN_QUERY_KEYWORDS:
+            return stats
+
+        statement = 'EXPLAIN FORMAT=JSON '
+        if self.analyze and keyword in ANALYZE_QUERY_KEYWORDS:
+            statement = self._get_analyze_statement() or statement
+
+        try:
+            self.cursor.execute(statement + query, args)
+            plan = self.cursor.fetchone()[0]
+        except mysql_driver.Error as e:
+            self.module.warn("Cannot explain '%s': %s" % (query, to_native(e)))
+            return stats
+
+        stats['analyzed'] = statement != 'EXPLAIN FORMAT=JSON '
+        if statement == 'EXPLAIN ANALYZE ':
+            stats['plan'] = plan
+            stats['plan_format'] = 'tree'
+        else:
+            stats['plan'] = json.loads(plan)
+            stats['plan_format'] = 'json'
+        return stats
+
+    def statement(self):
+        """Run after the query and the fetching of its rows.
+
+        Returns: Dictionary with the counters of the last statement
+            of the session, or None when they are not available.
+        """
+        if not self._statements_available or self._thread_id is None:
+            return None
+
+        try:
+            columns = STATEMENT_COUNTERS + STATEMENT_FLAGS + STATEMENT_TIMERS
+            # The statement reading the history is not in it until it completes
+            self.cursor.execute("SELECT %s FROM performance_schema.events_statements_history "
+                                "WHERE THREAD_ID = %%s ORDER BY EVENT_ID DESC LIMIT 1" % ', '.join(columns),
+                                (self._thread_id,))
+            row = self.cursor.fetchone()
+        except mysql_driver.Error as e:
+            self._statements_available = False
+            self.module.warn("Cannot read performance_schema.events_statements_history: %s" % to_native(e))
+            return None
+
+        if row is None:
+            return None
+
+        values = dict(zip(columns, row))
+        stats = dict((column.lower(), int(values[column])) for column in STATEMENT_COUNTERS)
+        stats.update((column.lower(), bool(values[column])) for column in STATEMENT_FLAGS)
+        stats.update((column.lower() + '_ms', round(int(values[column] or 0) / 1e9, 4))
+                     for column in STATEMENT_TIMERS)
+        return stats
+
+
+class QueryWatchdog():
+    """Cancel the query running on a connection when it runs longer than a timeout.
+
+    When the session variables make the server cancel the query, the
+    watchdog waits QUERY_WATCHDOG_GRACE seconds beyond the server's limit,
+    so it does not race with the server.
+
+    Arguments:
+        connect (callable): Opens another connection to the server, returning a tuple (cursor, connection).
+            It is called when the first query is cancelled.
+        db_connection (connection): The connection running the queries.
+        timeout (float): Timeout in seconds.
+        session_vars (dict): Session variables of the connection.
+    """
+
+    def __init__(self, connect, db_connection, timeout, session_vars=None):
+        self.connect = connect
+        self.connection_id = db_connection.thread_id()
+        self.timeout = timeout
+        self.session_vars = session_vars or {}
+        self.timer = None
+        self.killed = False
+        self.kill_error = None
+        self.kill_cursor = None
+
+    def start(self, query):
+        """Start the timeout of a query."""
+        self.killed = False
+        timeout = self.timeout
+        server_limit = get_server_time_limit(self.session_vars, query)
+        if server_limit is not None:
+            timeout = max(timeout, server_limit) + QUERY_WATCHDOG_GRACE
+        self.timer = threading.Timer(timeout, self.kill)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self):
+        """Stop the timeout of the query, waiting for a KILL QUERY that is running."""
+        self.timer.cancel()
+        self.timer.join()
+
+    def kill(self):
+        try:
+            if self.kill_cursor is None:
+                self.kill_cursor, dummy = self.connect()
+            self.kill_cursor.execute("KILL QUERY %d" % self.connection_id)
+            self.killed = True
+        except Exception as e:
+            self.kill_error = to_native(e)
+
+
+def is_read_only_query(query):
+    """Whether the query starts with a keyword of READ_ONLY_QUERY_KEYWORDS."""
+    words = query.lstrip(' \t\r\n(').split(None, 1)
+    return bool(words) and words[0].upper() in READ_ONLY_QUERY_KEYWORDS
+
+
+def probe_replicas(connect, endpoints, heartbeat_table=None):
+    """Connect to the replicas and measure their replication lag, all at the same time.
+
+    Arguments:
+        connect (callable): mysql_connect() with the module's arguments, called with endpoint.
+        endpoints (list): Tuples (host, port) of the replicas.
+        heartbeat_table (str): See get_replica_lag().
+
+    Returns: List of dictionaries with the server as host:port, its lag, the error
+        that prevented measuring it, and the cursor and connection to the replica.
+    """
+    probes = []
+    for endpoint in endpoints:
+        probes.append({'endpoint': endpoint, 'server': '%s:%s' % endpoint, 'lag': None, 'error': None,
+                       'cursor': None, 'connection': None})
+
+    def probe(p):
+        try:
+            p['cursor'], p['connection'] = connect(endpoint=p['endpoint'])
+            # The cursor of the queries may be unbuffered, the probe must not leave rows pending on the connection
+            probe_cursor = p['connection'].cursor(**{mysql_driver._cursor_param: mysql_driver.cursors.DictCursor})
+            try:
+                p['lag'] = get_replica_lag(probe_cursor, heartbeat_table)
+            finally:
+                probe_cursor.close()
+            if p['lag'] is None:
+                p['error'] = 'replication is not running'
+        except Exception as e:
+            p['error'] = to_native(e)
+
+    threads = [threading.Thread(target=probe, args=(p,)) for p in probes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return probes
+
+
+def choose_replica(probes, max_lag=None):
+    """Return the probe of the replica with the least lag at most max_lag, the first one of equal ones.
+
+    Returns: The probe, or None when no replica qualifies.
+    """
+    qualified = [p for p in probes if p['lag'] is not None and (max_lag is None or p['lag'] <= max_lag)]
+    if not qualified:
+        return None
+    return min(qualified, key=lambda p: p['lag'])
+
+
+def get_query_timeout_vars(cursor, timeout):
+    """Return the session variables limiting the execution time of statements to timeout seconds.
+
+    Returns: Dictionary of the variables, empty when the server has none.
+    """
+    profile = get_server_profile(cursor)
+    if profile.implementation == 'mariadb':
+        if LooseVersion(profile.version) >= LooseVersion('10.1.1'):
+            return {'max_statement_time': timeout}
+    elif LooseVersion(profile.version) >= LooseVersion('5.7.8'):
+        # Limits SELECT statements only, in milliseconds
+        return {'max_execution_time': max(int(math.ceil(timeout * 1000)), 1)}
+    return {}
+
+
+def get_server_time_limit(session_vars, query):
+    """Return the seconds after which the server cancels the query because of the session variables, or None."""
+    for name, unit in (('max_statement_time', 1.0), ('max_execution_time', 0.001)):
+        if name not in session_vars:
+            continue
+        if name == 'max_execution_time' and (query.lstrip(' \t\r\n(').split(None, 1) or [''])[0].upper() != 'SELECT':
+            # MySQL limits SELECT statements only
+            continue
+        try:
+            limit = float(session_vars[name]) * unit
+        except (TypeError, ValueError):
+            continue
+        if limit > 0:
+            return limit
+    return None
+
+
+def get_timeout_error_code(error):
+    """Return the error code if the exception is raised by a statement cancelled because of its execution time, or None."""
+    if isinstance(error, mysql_driver.Error) and error.args and error.args[0] in QUERY_TIMEOUT_ERROR_CODES:
+        return error.args[0]
+    return None
+
+
+def run_query(cursor, query, args, stats=None, output=None, columnar=False, dictionary_encoding=False,
+              statements=None, watchdog=None):
+    """Execute one query of the query option and read its result.
+
+    With statements, a PreparedStatements object of the cursor's connection,
+    the query runs as a prepared statement and executed_query is the query itself.
+    With watchdog, a QueryWatchdog of the cursor's connection, the query is cancelled
+    when it runs longer than its timeout.
+
+    Returns: Dictionary with the query, its executed_query, query_result,
+        rowcount, execution_time_ms, already_exists flag and query_stats.
+        When the query fails, error holds the message to fail the module with,
+        and timed_out the query and its execution time if it was cancelled because of it.
+    """
+    start_time = get_time()
+    if watchdog is not None:
+        watchdog.start(query)
+    try:
+        result = _run_query(cursor, query, args, stats, output, columnar, dictionary_encoding, statements)
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+
+    killed = watchdog is not None and watchdog.killed
+    if result['error'] is not None and (result['timed_out'] or killed):
+        # The error code tells who cancelled the query, a KILL QUERY of the watchdog can come too late
+        if result['timed_out'] in SERVER_TIMEOUT_ERROR_CODES or not killed:
+            cancelled_by = 'server'
+        else:
+            cancelled_by = 'watchdog'
+        result['timed_out'] = {
+            'query': query,
+            'execution_time_ms': round((get_time() - start_time) * 1000, 4),
+            'cancelled_by': cancelled_by,
+        }
+    else:
+        result['timed_out'] = None
+    return result
+
+
+def _run_query(cursor, query, args, stats, output, columnar, dictionary_encoding, statements):
+    """Execute a query for run_query(), timed_out is the error code when it failed because of a timeout."""
+    result = {
+        'query': query,
+        'executed_query': None,
+        'query_result': None,
+        'rowcount': None,
+        'execution_time_ms': None,
+        'already_exists': False,
+        'query_stats': None,
+        'error': None,
+        'timed_out': None,
+    }
+    if stats is not None:
+        result['query_stats'] = stats.explain(query, args)
+
+    try:
+        cursor, result['execution_time_ms'] = execute_and_return_time(cursor, query, args, statements)
+    except mysql_driver.Warning:
+        # When something is run with IF NOT EXISTS
+        # and there's "already exists" MySQL warning,
+        # set the flag as True.
+        # PyMySQL < 0.10.0 throws the warning, mysqlclient
+        # and PyMySQL 0.10.0+ does NOT.
+        result['already_exists'] = True
+    except Exception as e:
+        result['error'] = "Cannot execute SQL '%s' args [%s]: %s" % (query, args, to_native(e))
+        result['timed_out'] = get_timeout_error_code(e)
+        return result
+
+    output_rows = None
+    try:
+        if output is not None:
+            # Unbuffered cursors do not know the number of rows before they are read
+            output_rows = output.write_result(cursor)
+            result['query_result'] = []
+        elif not result['already_exists']:
+            result['query_result'] = fetch_result(cursor, columnar, dictionary_encoding)
+    except Exception as e:
+        result['error'] = "Cannot fetch rows from cursor: %s" % to_native(e)
+        result['timed_out'] = get_timeout_error_code(e)
+        return result
+
+    if stats is not None:
+        result['query_stats']['statement'] = stats.statement()
+
+    if output_rows is not None and cursor.description is not None:
+        result['rowcount'] = output_rows
+    else:
+        result['rowcount'] = cursor.rowcount
+
+    if statements is not None:
+        # The cursor knows the EXECUTE statement only
+        result['executed_query'] = query
+        return result
+
+    try:
+        result['executed_query'] = cursor._last_executed
+    except AttributeError:
+        # MySQLdb removed cursor._last_executed as a duplicate of cursor._executed
+        result['executed_query'] = cursor._executed
+    return result
+
+
+def fetch_result(cursor, columnar=False, dictionary_encoding=False):
+    """Fetch the rows of the last executed statement in the query_result form."""
+    rows = []
+    convert = None
+    for batch in fetch_row_batches(cursor):
+        if not rows:
+            # Coerce non-serializable types (e.g. decimal.Decimal, datetime)
+            # to their string representations, preventing Ansible's exit_json
+            # from failing with "Value of unknown type: <class 'decimal.Decimal'>".
+            convert = get_row_converter(cursor.description, batch[0])
+        if convert is not None:
+            batch = [convert(row) for row in batch]
+        if columnar:
+            if not rows:
+                # Keys of dict rows, unlike description, are unique
+                columns = list(batch[0])
+            batch = [list(row.values()) for row in batch]
+        rows.extend(batch)
+
+    if columnar:
+        if not rows:
+            columns = [column[0] for column in cursor.description or ()]
+        rows = {'columns': columns, 'rows': rows}
+        if dictionary_encoding:
+            dictionary_encode(rows)
+    return rows
+
+
+def execute_parallel(workers, queries):
+    """Run queries over a pool of connections, one thread per connection.
+
+    Arguments:
+        workers (list): Functions taking a query and returning its run_query() result,
+            one for every connection of the pool.
+        queries (list): Queries, started in this order.
+
+    Returns: List of the results in the order of queries. After a query fails,
+        no more queries are started and the results of the queries that were not started are None.
+    """
+    results = [None] * len(queries)
+    pending = queue.Queue()
+    for i, query in enumerate(queries):
+        pending.put((i, query))
+    failed = threading.Event()
+
+    def work(run):
+        while not failed.is_set():
+            try:
+                i, query = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                results[i] = run(query)
+            except Exception as e:
+                results[i] = {'query': query, 'error': "Cannot execute SQL '%s': %s" % (query, to_native(e))}
+            if results[i]['error'] is not None:
+                failed.set()
+
+    threads = [threading.Thread(target=work, args=(run,)) for run in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class ScriptError(Exception):
+    """A statement of script_file failed.
+
+    Arguments:
+        statement (SQLStatement): The failed statement.
+        error (Exception): The exception the statement raised.
+    """
+
+    def __init__(self, statement, error):
+        super(ScriptError, self).__init__(to_native(error))
+        self.statement = statement
+        self.error = error
+
+
+def execute_script(cursor, db_connection, statements, progress, resume_from=1, autocommit=True, commit_interval=None):
+    """Run the statements of a script read by split_statements().
+
+    Arguments:
+        progress (dict): The script return value, updated while the statements run,
+            so it tells how far the script got when an exception is raised.
+        resume_from (int): Number of the first statement to run. The SET and USE statements
+            before it run too.
+        autocommit (bool): Whether the connection commits every statement.
+            Otherwise the statements are committed when the script completes.
+        commit_interval (int): Without autocommit, also commit after every commit_interval statements run.
+
+    Returns: Whether a statement changed something.
+    """
+    changed = False
+    uncommitted = 0
+    number = 0
+    for statement in statements:
+        number = statement.number
+        resumed = statement.number >= resume_from
+        if not resumed and not statement.is_session_statement():
+            progress['skipped'] += 1
+            continue
+
+        try:
+            cursor, exec_time_ms = execute_and_return_time(cursor, statement.text, None)
+        except Exception as e:
+            raise ScriptError(statement, e)
+        progress['execution_time_ms'] = round(progress['execution_time_ms'] + exec_time_ms, 4)
+        progress['statements'] += 1
+        if not resumed:
+            continue
+
+        rowcount = max(cursor.rowcount, 0)
+        progress['rowcount'] += rowcount
+        if statement.keyword in DDL_QUERY_KEYWORDS or (statement.keyword in DML_QUERY_KEYWORDS and rowcount > 0):
+            changed = True
+
+        if autocommit:
+            progress['resume_from'] = statement.number + 1
+            continue
+
+        uncommitted += 1
+        if uncommitted == commit_interval:
+            db_connection.commit()
+            progress['commits'] += 1
+            progress['resume_from'] = statement.number + 1
+            uncommitted = 0
+
+    if uncommitted:
+        db_connection.commit()
+        progress['commits'] += 1
+    progress['resume_from'] = max(progress['resume_from'], number + 1)
+    return changed
+
+
+class ChunkThrottle():
+    """Pause chunked mode while replicas lag or the server is busy.
+
+    Arguments:
+        module (AnsibleModule): The module, failed when a replica does not replicate.
+        cursor (cursor): Dict cursor of the server the chunks run on.
+        replicas (list): Tuples (name, dict cursor) of the replicas to check the lag of.
+        max_lag (float): Maximum lag of the replicas in seconds.
+        heartbeat_table (str): Table to measure the lag with, see get_replica_lag().
+        max_threads_running (int): Maximum Threads_running of the server.
+    """
+
+    def __init__(self, module, cursor, replicas=(), max_lag=None, heartbeat_table=None, max_threads_running=None):
+        self.module = module
+        self.cursor = cursor
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.heartbeat_table = heartbeat_table
+        self.max_threads_running = max_threads_running
+        self.throttled = 0
+        self.last_check = None
+
+    def check(self):
+        """Return the pause the conditions ask for in seconds, or None when no pause is needed."""
+        if self.max_threads_running is not None:
+            row = read_chunk_rows(self.cursor, "SHOW GLOBAL STATUS LIKE 'Threads_running'")[0]
+            if int(row['Value']) > self.max_threads_running:
+                return 0
+
+        for name, cursor in self.replicas:
+            lag = get_replica_lag(cursor, self.heartbeat_table)
+            if lag is None:
+                self.module.fail_json(msg="Cannot get the replication lag of %s, replication is not running" % name)
+            if lag > self.max_lag:
+                # Wait about as long as the replica needs to catch up
+                return lag - self.max_lag
+
+        return None
+
+    def wait(self):
+        """Pause until the conditions are met.
+
+        Returns: Seconds paused.
+        """
+        if self.last_check is not None and time.time() - self.last_check < CHUNK_CHECK_INTERVAL:
+            return 0
+
+        waited = 0
+        delay = CHUNK_THROTTLE_DELAY
+        while True:
+            pause = self.check()
+            self.last_check = time.time()
+            if pause is None:
+                return waited
+
+            # Back off while the condition persists
+            pause = min(max(pause, delay), CHUNK_THROTTLE_MAX_DELAY)
+            time.sleep(pause)
+            waited += pause
+            self.throttled += 1
+            delay = min(delay * 2, CHUNK_THROTTLE_MAX_DELAY)
+
+
+def read_chunk_rows(cursor, query, args=None):
+    """Run a read of the chunked DML on its connection and return all rows.
+
+    Unlike execute_read(), a lost connection is not reopened, so the
+    chunks never continue in a session without the session_vars.
+    """
+    cursor.execute(query, args)
+    return cursor.fetchall()
+
+
+def execute_chunks(cursor, query, args, table, column, chunk_size, progress, throttle=None):
+    """Run query once for every range of chunk_size rows of table, walking the index of column.
+
+    The query limits its rows to the range with the %(chunk_start)s and %(chunk_end)s placeholders,
+    like column BETWEEN %(chunk_start)s AND %(chunk_end)s. Every chunk runs in its own transaction.
+
+    Arguments:
+        args (dict): Named arguments of the query besides chunk_start and chunk_end.
+        table (str): Quoted table name.
+        column (str): Quoted column name.
+        progress (dict): The chunks return value, updated after every chunk.
+        throttle (ChunkThrottle): Pauses before the chunks.
+    """
+    select = "SELECT %s AS chunk_value FROM %s " % (column, table)
+    first_query = select + "ORDER BY %s LIMIT 1" % column
+    # The last value of the chunk and the first one of the next chunk
+    bounds_query = select + "WHERE %s >= %%s ORDER BY %s LIMIT 2 OFFSET %d" % (column, column, chunk_size - 1)
+    last_query = "SELECT MAX(%s) AS chunk_value FROM %s WHERE %s >= %%s" % (column, table, column)
+    next_query = select + "WHERE %s > %%s ORDER BY %s LIMIT 1" % (column, column)
+
+    rows = read_chunk_rows(cursor, first_query)
+    start = rows[0]['chunk_value'] if rows else None
+    while start is not None:
+        if throttle is not None:
+            progress['throttle_time_ms'] = round(progress['throttle_time_ms'] + throttle.wait() * 1000, 4)
+            progress['throttled'] = throttle.throttled
+
+        rows = read_chunk_rows(cursor, bounds_query, (start,))
+        if rows:
+            end = rows[0]['chunk_value']
+        else:
+            end = read_chunk_rows(cursor, last_query, (start,))[0]['chunk_value']
+            if end is None:
+                # The rows were deleted meanwhile
+                break
+
+        chunk_args = dict(args or {}, chunk_start=start, chunk_end=end)
+        cursor, exec_time_ms = execute_and_return_time(cursor, query, chunk_args)
+        progress['count'] += 1
+        progress['rowcount'] += max(cursor.rowcount, 0)
+        progress['execution_time_ms'] = round(progress['execution_time_ms'] + exec_time_ms, 4)
+        progress['last_chunk_end'] = end
+
+        if len(rows) == 2 and rows[1]['chunk_value'] != end:
+            start = rows[1]['chunk_value']
+        else:
+            rows = read_chunk_rows(cursor, next_query, (end,))
+            start = rows[0]['chunk_value'] if rows else None
+
+
+def get_primary_key_column(cursor, table, db):
+    """Return the first primary key column of the table, or None if it has no primary key.
+
+    The table can be qualified by its database, otherwise it is looked up in db or the default database.
+    """
+    schema, dummy, name = table.rpartition('.')
+    rows = read_chunk_rows(cursor, "SELECT COLUMN_NAME AS column_name FROM information_schema.KEY_COLUMN_USAGE "
+                                   "WHERE TABLE_SCHEMA = COALESCE(%s, DATABASE()) AND TABLE_NAME = %s "
+                                   "AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY ORDINAL_POSITION LIMIT 1",
+                           (schema or db, name))
+    return rows[0]['column_name'] if rows else None
+
+
+def get_prepared_statements_info(all_statements):
+    """Return the prepared_statements return value of PreparedStatements objects.
+
+    Returns: Dictionary with the prepared_statements key, empty when prepared is not set.
+    """
+    all_statements = [statements for statements in all_statements if statements is not None]
+    if not all_statements:
+        return {}
+
+    return {'prepared_statements': {
+        'prepared': sum(statements.prepared for statements in all_statements),
+        'executed': sum(statements.executed for statements in all_statements),
+    }}
+
 
 # ===========================================
 # Module execution.
@@ -167,33 +1610,104 @@ def get_time():
     return time_taken
 
 
-def execute_and_return_time(cursor, query, args):
+def execute_and_return_time(cursor, query, args, statements=None):
     # Measure query execution time in milliseconds
     start_time = get_time()
 
-    cursor.execute(query, args)
+    if statements is not None:
+        statements.execute(query, args)
+    else:
+        cursor.execute(query, args)
 
     # Calculate the execution time rounding it to 4 decimal places
     exec_time_ms = round((get_time() - start_time) * 1000, 4)
     return cursor, exec_time_ms
 
 
+def execute_many_and_return_time(cursor, query, args, statements=None):
+    # Measure batch execution time in milliseconds
+    start_time = get_time()
+
+    if statements is not None:
+        rowcount = statements.executemany(query, args)
+    else:
+        cursor.executemany(query, args)
+        rowcount = cursor.rowcount
+
+    exec_time_ms = round((get_time() - start_time) * 1000, 4)
+    return rowcount, exec_time_ms
+
+
 def main():
     argument_spec = mysql_common_argument_spec()
     argument_spec.update(
-        query=dict(type='raw', required=True),
+        query=dict(type='raw'),
         login_db=dict(type='str'),
         positional_args=dict(type='list', elements='raw'),
         named_args=dict(type='dict'),
         single_transaction=dict(type='bool', default=False),
         session_vars=dict(type='dict'),
+        batch_args=dict(type='raw'),
+        batch_size=dict(type='int', default=1000),
+        batch_commit_interval=dict(type='int'),
+        result_format=dict(type='str', default='records', choices=['columnar', 'records']),
+        dictionary_encoding=dict(type='bool', default=False),
+        query_stats=dict(type='str', default='none', choices=['analyze', 'explain', 'none']),
+        parallelism=dict(type='int', default=1),
+        query_timeout=dict(type='float'),
+        read_from=dict(type='list', elements='str'),
+        read_max_lag=dict(type='float'),
+        read_heartbeat_table=dict(type='str'),
+        prepared=dict(type='bool', default=False),
+        script_file=dict(type='path'),
+        script_commit_interval=dict(type='int'),
+        script_resume_from=dict(type='int', default=1),
+        chunk_table=dict(type='str'),
+        chunk_column=dict(type='str'),
+        chunk_size=dict(type='int', default=1000),
+        chunk_max_lag=dict(type='float'),
+        chunk_replicas=dict(type='list', elements='str'),
+        chunk_heartbeat_table=dict(type='str'),
+        chunk_max_threads_running=dict(type='int'),
+        output_file=dict(type='path'),
+        output_format=dict(type='str', default='jsonl', choices=['csv', 'jsonl']),
+        output_compression=dict(type='str', default='none', choices=['bz2', 'gzip', 'none', 'xz']),
     )
 
     module = AnsibleModule(
         argument_spec=argument_spec,
         mutually_exclusive=(
             ('positional_args', 'named_args'),
+            ('batch_args', 'positional_args'),
+            ('batch_args', 'named_args'),
+            ('batch_args', 'output_file'),
+            ('batch_args', 'single_transaction'),
+            ('script_file', 'query'),
+            ('script_file', 'positional_args'),
+            ('script_file', 'named_args'),
+            ('script_file', 'batch_args'),
+            ('script_file', 'output_file'),
+            ('script_commit_interval', 'single_transaction'),
+            ('chunk_table', 'positional_args'),
+            ('chunk_table', 'batch_args'),
+            ('chunk_table', 'script_file'),
+            ('chunk_table', 'output_file'),
+            ('chunk_table', 'single_transaction'),
         ),
+        required_one_of=(
+            ('query', 'script_file'),
+        ),
+        required_by={
+            'batch_commit_interval': 'batch_args',
+            'script_commit_interval': 'script_file',
+            'chunk_column': 'chunk_table',
+            'chunk_max_lag': ('chunk_table', 'chunk_replicas'),
+            'chunk_replicas': 'chunk_max_lag',
+            'chunk_heartbeat_table': 'chunk_max_lag',
+            'chunk_max_threads_running': 'chunk_table',
+            'read_max_lag': 'read_from',
+            'read_heartbeat_table': 'read_from',
+        },
     )
 
     db = module.params['login_db']
@@ -207,8 +1721,30 @@ def main():
     config_file = module.params['config_file']
     query = module.params["query"]
     session_vars = module.params["session_vars"]
+    output_file = module.params["output_file"]
+    columnar = module.params["result_format"] == 'columnar'
+    batch_args = module.params["batch_args"]
+    batch_size = module.params["batch_size"]
+    batch_commit_interval = module.params["batch_commit_interval"]
+    parallelism = module.params["parallelism"]
+    script_file = module.params["script_file"]
+    script_commit_interval = module.params["script_commit_interval"]
+    chunk_table = module.params["chunk_table"]
+    query_timeout = module.params["query_timeout"]
+    read_from = module.params["read_from"]
 
-    if not isinstance(query, (str, list)):
+    if script_file is not None:
+        if not os.path.isfile(script_file):
+            module.fail_json(msg="the script_file %s does not exist" % script_file)
+        if script_commit_interval is not None and script_commit_interval < 1:
+            module.fail_json(msg="script_commit_interval must be greater than 0")
+        if module.params["script_resume_from"] < 1:
+            module.fail_json(msg="script_resume_from must be greater than 0")
+        for option in ('prepared', 'query_stats'):
+            if module.params[option] not in (False, 'none'):
+                module.fail_json(msg="%s cannot be used with script_file" % option)
+        query = []
+    elif not isinstance(query, (str, list)):
         module.fail_json(msg="the query option value must be a string or list, passed %s" % type(query))
 
     if isinstance(query, str):
@@ -218,7 +1754,55 @@ def main():
         if not isinstance(elem, str):
             module.fail_json(msg="the elements in query list must be strings, passed '%s' %s" % (elem, type(elem)))
 
-    if module.params["single_transaction"]:
+    if query_timeout is not None:
+        if query_timeout <= 0:
+            module.fail_json(msg="query_timeout must be greater than 0")
+        for option in ('batch_args', 'script_file', 'chunk_table'):
+            if module.params[option]:
+                module.fail_json(msg="query_timeout cannot be used with %s" % option)
+
+    if read_from:
+        for option in ('batch_args', 'script_file', 'chunk_table'):
+            if module.params[option]:
+                module.fail_json(msg="read_from cannot be used with %s" % option)
+        for elem in query:
+            if not is_read_only_query(elem):
+                module.fail_json(msg="read_from requires read-only queries, passed '%s'" % elem)
+
+    if parallelism < 1:
+        module.fail_json(msg="parallelism must be greater than 0")
+    if parallelism > 1:
+        for option in ('single_transaction', 'output_file', 'batch_args', 'script_file', 'chunk_table'):
+            if module.params[option]:
+                module.fail_json(msg="parallelism cannot be used with %s" % option)
+
+    if batch_args is not None:
+        if len(query) != 1:
+            module.fail_json(msg="batch_args requires exactly one query, passed %s" % len(query))
+        if not isinstance(batch_args, (str, list)):
+            module.fail_json(msg="the batch_args option value must be a list or a file path, passed %s" % type(batch_args))
+        if isinstance(batch_args, str) and not os.path.isfile(batch_args):
+            module.fail_json(msg="the batch_args file %s does not exist" % batch_args)
+        if batch_size < 1:
+            module.fail_json(msg="batch_size must be greater than 0")
+        if batch_commit_interval is not None and batch_commit_interval < 1:
+            module.fail_json(msg="batch_commit_interval must be greater than 0")
+
+    if chunk_table is not None:
+        if len(query) != 1:
+            module.fail_json(msg="chunk_table requires exactly one query, passed %s" % len(query))
+        for placeholder in CHUNK_PLACEHOLDERS:
+            if placeholder not in query[0]:
+                module.fail_json(msg="the query must contain the %s placeholder with chunk_table" % placeholder)
+        if module.params["chunk_size"] < 1:
+            module.fail_json(msg="chunk_size must be greater than 0")
+        if module.params["chunk_max_lag"] is not None and module.params["chunk_max_lag"] < 0:
+            module.fail_json(msg="chunk_max_lag must not be negative")
+        for option in ('prepared', 'query_stats'):
+            if module.params[option] not in (False, 'none'):
+                module.fail_json(msg="%s cannot be used with chunk_table" % option)
+
+    if module.params["single_transaction"] or batch_commit_interval or script_commit_interval:
         autocommit = False
     else:
         autocommit = True
@@ -230,101 +1814,296 @@ def main():
     else:
         arguments = None
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params['connector']):
         module.fail_json(msg=mysql_driver_fail_msg)
 
     # Connect to DB:
+    connect = functools.partial(mysql_connect, module, login_user, login_password,
+                                config_file, ssl_cert, ssl_key, ssl_ca, db,
+                                check_hostname=check_hostname,
+                                connect_timeout=connect_timeout,
+                                cursor_class='SSDictCursor' if output_file else 'DictCursor',
+                                autocommit=autocommit)
     try:
-        cursor, db_connection = mysql_connect(module, login_user, login_password,
-                                              config_file, ssl_cert, ssl_key, ssl_ca, db,
-                                              check_hostname=check_hostname,
-                                              connect_timeout=connect_timeout,
-                                              cursor_class='DictCursor', autocommit=autocommit)
+        cursor, db_connection = connect()
     except Exception as e:
         module.fail_json(msg="unable to connect to database, check login_user and "
                              "login_password are correct or %s has the credentials. "
                              "Exception message: %s" % (config_file, to_native(e)))
 
+    routing = None
+    if read_from:
+        probes = probe_replicas(connect, parse_login_hosts(','.join(read_from), module.params['login_port']),
+                                module.params['read_heartbeat_table'])
+        chosen = choose_replica(probes, module.params['read_max_lag'])
+        for p in probes:
+            if p is not chosen and p['connection'] is not None:
+                p['connection'].close()
+
+        routing = {
+            'role': 'primary',
+            'server': None,
+            'lag': None,
+            'candidates': [{'server': p['server'], 'lag': p['lag'], 'error': p['error']} for p in probes],
+        }
+        if chosen is None:
+            module.warn("No replica of read_from qualifies, the queries run on the primary")
+        else:
+            db_connection.close()
+            cursor, db_connection = chosen['cursor'], chosen['connection']
+            # The connections of parallelism and query_timeout go to the replica too
+            connect = functools.partial(connect, endpoint=chosen['endpoint'])
+            routing.update(role='replica', server=chosen['server'], lag=chosen['lag'])
+
     # Set defaults:
     changed = False
 
     max_keyword_len = len(max(DML_QUERY_KEYWORDS + DDL_QUERY_KEYWORDS, key=len))
 
+    if query_timeout is not None:
+        # The session_vars take precedence
+        session_vars = dict(get_query_timeout_vars(cursor, query_timeout), **(session_vars or {}))
+
     if session_vars:
         set_session_vars(module, cursor, session_vars)
 
-    # Execute query:
-    query_result = []
-    executed_queries = []
-    rowcount = []
-    execution_time_ms = []
+    statements = None
+    if module.params['prepared']:
+        statements = PreparedStatements(cursor)
 
-    already_exists = False
-    for q in query:
-        try:
-            with warnings.catch_warnings():
-                warnings.filterwarnings(action='error',
-                                        message='.*already exists*',
-                                        category=mysql_driver.Warning)
-
-                try:
-                    cursor, exec_time_ms = execute_and_return_time(cursor, q, arguments)
-                    execution_time_ms.append(exec_time_ms)
-                except mysql_driver.Warning:
-                    # When something is run with IF NOT EXISTS
-                    # and there's "already exists" MySQL warning,
-                    # set the flag as True.
-                    # PyMySQL < 0.10.0 throws the warning, mysqlclient
-                    # and PyMySQL 0.10.0+ does NOT.
-                    already_exists = True
+    if batch_args is not None:
+        if isinstance(batch_args, str):
+            params = read_batch_args_file(batch_args)
+        else:
+            params = batch_args
 
+        try:
+            batches = execute_batches(cursor, db_connection, query[0], iter_batches(params, batch_size),
+                                      batch_commit_interval, statements)
+            if statements is not None:
+                statements.close()
         except Exception as e:
             if not autocommit:
                 db_connection.rollback()
 
-            cursor.close()
-            module.fail_json(msg="Cannot execute SQL '%s' args [%s]: %s" % (q, arguments, to_native(e)))
+            module.fail_json(msg="Cannot execute SQL '%s' with batch_args: %s" % (query[0], to_native(e)))
+
+        total_rowcount = sum(batch['rowcount'] for batch in batches)
+        module.exit_json(
+            changed=total_rowcount > 0,
+            executed_queries=[query[0]],
+            query_result=[[]],
+            rowcount=[total_rowcount],
+            execution_time_ms=[round(sum(batch['time_ms'] for batch in batches), 4)],
+            batches=batches,
+            connection=get_connection_info(db_connection),
+            **get_prepared_statements_info([statements])
+        )
 
+    if script_file is not None:
+        progress = {
+            'path': script_file,
+            'statements': 0,
+            'skipped': 0,
+            'rowcount': 0,
+            'commits': 0,
+            'execution_time_ms': 0.0,
+            'resume_from': module.params['script_resume_from'],
+        }
         try:
-            if not already_exists:
-                rows = [dict(row) for row in cursor.fetchall()]
-                # Round-trip through JSON to coerce non-serializable types
-                # (e.g. decimal.Decimal, datetime) to their string representations,
-                # preventing Ansible's exit_json from failing with
-                # "Value of unknown type: <class 'decimal.Decimal'>".
-                query_result.append(json.loads(json.dumps(rows, default=str)))
+            with open_script(script_file) as f:
+                changed = execute_script(cursor, db_connection, split_statements(f), progress,
+                                         module.params['script_resume_from'], autocommit, script_commit_interval)
+        except ScriptError as e:
+            if not autocommit:
+                db_connection.rollback()
 
+            module.fail_json(msg="Cannot execute statement %s (line %s) of %s: %s, "
+                                 "continue with script_resume_from=%s" % (
+                                     e.statement.number, e.statement.line, script_file,
+                                     to_native(e.error), progress['resume_from']),
+                             script=progress)
         except Exception as e:
             if not autocommit:
                 db_connection.rollback()
 
-            module.fail_json(msg="Cannot fetch rows from cursor: %s" % to_native(e))
-
-        # Check DML or DDL keywords in query and set changed accordingly:
-        q = q.lstrip()[0:max_keyword_len].upper()
-        for keyword in DML_QUERY_KEYWORDS:
-            if keyword in q and cursor.rowcount > 0:
-                changed = True
-
-        for keyword in DDL_QUERY_KEYWORDS:
-            if keyword in q:
-                if already_exists:
-                    # Indicates the entity already exists
-                    changed = False
-                    already_exists = False  # Reset flag
-                else:
-                    changed = True
+            module.fail_json(msg="Cannot read %s: %s" % (script_file, to_native(e)), script=progress)
+
+        module.exit_json(
+            changed=changed,
+            executed_queries=[],
+            query_result=[],
+            rowcount=[progress['rowcount']],
+            execution_time_ms=[progress['execution_time_ms']],
+            script=progress,
+            connection=get_connection_info(db_connection),
+        )
+
+    if chunk_table is not None:
+        table = mysql_quote_identifier(chunk_table, 'table')
+        column = module.params['chunk_column']
+        if column is None:
+            column = get_primary_key_column(cursor, chunk_table, db)
+            if column is None:
+                module.fail_json(msg="%s has no primary key, set chunk_column" % chunk_table)
+        column = mysql_quote_identifier(column, 'column')
+
+        replicas = []
+        for endpoint in parse_login_hosts(','.join(module.params['chunk_replicas'] or []),
+                                          module.params['login_port']):
+            name = '%s:%s' % endpoint
+            try:
+                replica_cursor, dummy = connect(endpoint=endpoint)
+            except Exception as e:
+                module.fail_json(msg="unable to connect to the replica %s: %s" % (name, to_native(e)))
+            replicas.append((name, replica_cursor))
+
+        throttle = None
+        if replicas or module.params['chunk_max_threads_running'] is not None:
+            throttle = ChunkThrottle(module, cursor, replicas, module.params['chunk_max_lag'],
+                                     module.params['chunk_heartbeat_table'],
+                                     module.params['chunk_max_threads_running'])
+
+        progress = {
+            'count': 0,
+            'rowcount': 0,
+            'throttled': 0,
+            'throttle_time_ms': 0.0,
+            'execution_time_ms': 0.0,
+            'last_chunk_end': None,
+        }
         try:
-            executed_queries.append(cursor._last_executed)
-        except AttributeError:
-            # MySQLdb removed cursor._last_executed as a duplicate of cursor._executed
-            executed_queries.append(cursor._executed)
-        rowcount.append(cursor.rowcount)
+            execute_chunks(cursor, query[0], arguments, table, column, module.params['chunk_size'],
+                           progress, throttle)
+        except Exception as e:
+            module.fail_json(msg="Cannot execute SQL '%s' on chunk %s of %s: %s" % (
+                query[0], progress['count'] + 1, chunk_table, to_native(e)), chunks=progress)
+
+        module.exit_json(
+            changed=progress['rowcount'] > 0,
+            executed_queries=[query[0]],
+            query_result=[[]],
+            rowcount=[progress['rowcount']],
+            execution_time_ms=[progress['execution_time_ms']],
+            chunks=progress,
+            connection=get_connection_info(db_connection),
+        )
+
+    output = None
+    if output_file:
+        try:
+            output = OutputFile(module, output_file, module.params['output_format'],
+                                module.params['output_compression'])
+        except Exception as e:
+            module.fail_json(msg="Cannot create %s: %s" % (output_file, to_native(e)))
+
+    stats = None
+    if module.params['query_stats'] != 'none':
+        stats = QueryStats(module, db_connection, module.params['query_stats'])
+
+    watchdog = None
+    if query_timeout is not None:
+        watchdog = QueryWatchdog(connect, db_connection, query_timeout, session_vars)
+
+    # Cursor, QueryStats, PreparedStatements and QueryWatchdog of the connections running the queries in parallel
+    pool = []
+    if parallelism > 1 and len(query) > 1:
+        pool.append((cursor, stats, statements, watchdog))
+        for dummy in range(min(parallelism, len(query)) - 1):
+            try:
+                pool_cursor, pool_connection = connect()
+            except Exception as e:
+                module.fail_json(msg="unable to open connection %s of parallelism: %s" % (len(pool) + 1, to_native(e)))
+
+            if session_vars:
+                set_session_vars(module, pool_cursor, session_vars)
+            pool_stats = None
+            if stats is not None:
+                pool_stats = QueryStats(module, pool_connection, module.params['query_stats'])
+            pool_statements = None
+            if statements is not None:
+                pool_statements = PreparedStatements(pool_cursor)
+            pool_watchdog = None
+            if watchdog is not None:
+                pool_watchdog = QueryWatchdog(connect, pool_connection, query_timeout, session_vars)
+            pool.append((pool_cursor, pool_stats, pool_statements, pool_watchdog))
+
+    # Execute query:
+    query_result = []
+    executed_queries = []
+    rowcount = []
+    execution_time_ms = []
+    query_stats = []
+
+    run = functools.partial(run_query, args=arguments, output=output, columnar=columnar,
+                            dictionary_encoding=module.params['dictionary_encoding'])
+    with warnings.catch_warnings():
+        warnings.filterwarnings(action='error',
+                                message='.*already exists*',
+                                category=mysql_driver.Warning)
+
+        if pool:
+            results = execute_parallel([functools.partial(run, c, stats=s, statements=p, watchdog=w)
+                                        for c, s, p, w in pool], query)
+        else:
+            # Lazy, so the queries after a failed one do not run
+            results = (run(cursor, q, stats=stats, statements=statements, watchdog=watchdog) for q in query)
+
+        for result in results:
+            if result['error'] is not None:
+                if not autocommit:
+                    db_connection.rollback()
+
+                if result.get('timed_out'):
+                    module.fail_json(msg="%s, the query ran longer than query_timeout" % result['error'],
+                                     timed_out=result['timed_out'])
+                module.fail_json(msg=result['error'])
+
+            if result['execution_time_ms'] is not None:
+                execution_time_ms.append(result['execution_time_ms'])
+            if result['query_result'] is not None:
+                query_result.append(result['query_result'])
+            if stats is not None:
+                query_stats.append(result['query_stats'])
+
+            # Check DML or DDL keywords in query and set changed accordingly:
+            q = result['query'].lstrip()[0:max_keyword_len].upper()
+            for keyword in DML_QUERY_KEYWORDS:
+                if keyword in q and result['rowcount'] > 0:
+                    changed = True
+
+            for keyword in DDL_QUERY_KEYWORDS:
+                if keyword in q:
+                    if result['already_exists']:
+                        # Indicates the entity already exists
+                        changed = False
+                    else:
+                        changed = True
+            executed_queries.append(result['executed_query'])
+            rowcount.append(result['rowcount'])
+
+    for w in [w for dummy, dummy, dummy, w in pool] or [watchdog]:
+        if w is not None and w.kill_error is not None:
+            module.warn("Cannot cancel a query that ran longer than query_timeout: %s" % w.kill_error)
+
+    all_statements = [p for dummy, dummy, p, dummy in pool] or [statements]
+    try:
+        for p in all_statements:
+            if p is not None:
+                p.close()
+    except Exception as e:
+        module.fail_json(msg="Cannot deallocate prepared statements: %s" % to_native(e))
 
     # When the module run with the single_transaction == True:
     if not autocommit:
         db_connection.commit()
 
+    if output is not None:
+        try:
+            output_info = output.close()
+        except Exception as e:
+            module.fail_json(msg="Cannot write %s: %s" % (output_file, to_native(e)))
+
     # Create dict with returned values:
     kw = {
         'changed': changed,
@@ -332,7 +2111,15 @@ def main():
         'query_result': query_result,
         'rowcount': rowcount,
         'execution_time_ms': execution_time_ms,
+        'connection': get_connection_info(db_connection),
     }
+    if output is not None:
+        kw['output'] = output_info
+    if stats is not None:
+        kw['query_stats'] = query_stats
+    if routing is not None:
+        kw['routing'] = routing
+    kw.update(get_prepared_statements_info(all_statements))
 
     # Exit:
     module.exit_json(**kw)
@@ -308,6 +308,7 @@ from ansible_collections.community.mysql.plugins.module_utils.command_resolver i
     CommandResolver
 )
 from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    execute_read,
     get_server_version,
     get_server_implementation,
     mysql_connect,
@@ -322,10 +323,7 @@ executed_queries = []
 
 def get_primary_status(cursor, command_resolver):
     query = command_resolver.resolve_command("SHOW MASTER STATUS")
-    cursor.execute(query)
-
-    primarystatus = cursor.fetchone()
-    return primarystatus
+    return execute_read(cursor, query, fetchone=True)
 
 
 def get_replica_status(cursor, connection_name='', channel='', term='REPLICA'):
@@ -337,9 +335,7 @@ def get_replica_status(cursor, connection_name='', channel='', term='REPLICA'):
     if channel:
         query += " FOR CHANNEL '%s'" % channel
 
-    cursor.execute(query)
-    replica_status = cursor.fetchone()
-    return replica_status
+    return execute_read(cursor, query, fetchone=True)
 
 
 def stop_replica(module, cursor, connection_name='', channel='', fail_on_error=False, term='REPLICA'):
@@ -545,7 +541,7 @@ def main():
     channel = module.params['channel']
     fail_on_error = module.params['fail_on_error']
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params["connector"]):
         module.fail_json(msg=mysql_driver_fail_msg)
     else:
         warnings.filterwarnings('error', category=mysql_driver.Warning)
@@ -568,7 +564,6 @@ def main():
     server_version = get_server_version(cursor)
     server_implementation = get_server_implementation(cursor)
     command_resolver = CommandResolver(server_implementation, server_version)
-    cursor.execute("SELECT VERSION()")
     if server_implementation == 'mariadb':
         from ansible_collections.community.mysql.plugins.module_utils.implementations.mariadb import replication as impl
     else:
@@ -321,6 +321,7 @@ RETURN = '''#'''
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    get_server_implementation,
     mysql_connect,
     mysql_driver,
     mysql_driver_fail_msg,
@@ -425,9 +426,7 @@ class DbServer():
         Returns:
             library: Depending on a server type (MySQL or MariaDB).
         """
-        self.cursor.execute("SELECT VERSION()")
-
-        if 'mariadb' in self.cursor.fetchone()[0].lower():
+        if get_server_implementation(self.cursor) == 'mariadb':
             import ansible_collections.community.mysql.plugins.module_utils.implementations.mariadb.role as role_impl
         else:
             import ansible_collections.community.mysql.plugins.module_utils.implementations.mysql.role as role_impl
@@ -1037,7 +1036,7 @@ def main():
     if priv and isinstance(priv, dict):
         priv = convert_priv_dict_to_str(priv)
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params['connector']):
         module.fail_json(msg=mysql_driver_fail_msg)
 
     cursor = None
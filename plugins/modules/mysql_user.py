@@ -540,7 +540,7 @@ def main():
     if priv and isinstance(priv, dict):
         priv = convert_priv_dict_to_str(priv)
 
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params["connector"]):
         module.fail_json(msg=mysql_driver_fail_msg)
 
     if password_expire_interval and password_expire_interval < 1:
@@ -571,8 +571,10 @@ def main():
         module.fail_json(msg="unable to connect to database, check login_user and login_password are correct or %s has the credentials. "
                              "Exception message: %s" % (config_file, to_native(e)))
 
+    # Disabling the binary log is sent in one statement with the session variables
     if not sql_log_bin:
-        cursor.execute("SET SQL_LOG_BIN=0;")
+        session_vars = dict(session_vars or {})
+        session_vars.setdefault('sql_log_bin', 0)
 
     if session_vars:
         set_session_vars(module, cursor, session_vars)
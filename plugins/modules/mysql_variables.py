@@ -102,7 +102,13 @@ from re import match
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.community.mysql.plugins.module_utils.database import SQLParseError, mysql_quote_identifier
-from ansible_collections.community.mysql.plugins.module_utils.mysql import mysql_connect, mysql_driver, mysql_driver_fail_msg, mysql_common_argument_spec
+from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    execute_read,
+    mysql_common_argument_spec,
+    mysql_connect,
+    mysql_driver,
+    mysql_driver_fail_msg,
+)
 from ansible.module_utils.common.text.converters import to_native
 
 executed_queries = []
@@ -153,8 +159,7 @@ def typedvalue(value):
 
 
 def getvariable(cursor, mysqlvar):
-    cursor.execute("SHOW VARIABLES WHERE Variable_name = %s", (mysqlvar,))
-    mysqlvar_val = cursor.fetchall()
+    mysqlvar_val = execute_read(cursor, "SHOW VARIABLES WHERE Variable_name = %s", (mysqlvar,))
     if len(mysqlvar_val) == 1:
         return mysqlvar_val[0][1]
     else:
@@ -228,7 +233,7 @@ def main():
         module.fail_json(msg="Cannot run without variable to operate with")
     if match('^[0-9A-Za-z_.]+$', mysqlvar) is None:
         module.fail_json(msg="invalid variable name \"%s\"" % mysqlvar)
-    if mysql_driver is None:
+    if not mysql_driver.use(module.params["connector"]):
         module.fail_json(msg=mysql_driver_fail_msg)
     else:
         warnings.filterwarnings('error', category=mysql_driver.Warning)
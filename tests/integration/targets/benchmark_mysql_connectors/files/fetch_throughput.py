@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Fetch and decode rows with every installed connector backend.
+
+Prints a JSON object mapping backend names to the number of rows read
+and the best time of the runs. The password is read from MYSQL_PWD.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import json
+import os
+import time
+
+from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    CONNECTOR_BACKENDS,
+    _driver_connect,
+    fetch_row_batches,
+    mysql_driver,
+)
+
+DIGITS = '(SELECT 0 AS n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 ' \
+         'UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9)'
+
+
+def build_query(digits):
+    """Return a query generating 10 ** digits rows of integer, string, decimal and datetime columns."""
+    tables = ['%s AS d%d' % (DIGITS, i) for i in range(digits)]
+    row_id = ' + '.join('d%d.n * %d' % (i, 10 ** i) for i in range(digits))
+    return ('SELECT id, CONCAT(\'row-\', id) AS name, CAST(id / 100 AS DECIMAL(12, 2)) AS amount, '
+            'TIMESTAMP(\'2020-01-01\') + INTERVAL id SECOND AS created '
+            'FROM (SELECT %s AS id FROM %s) AS r' % (row_id, ' CROSS JOIN '.join(tables)))
+
+
+def fetch(config, query):
+    """Read all rows of query through an unbuffered dict cursor.
+
+    Returns: Tuple (number of rows, seconds).
+    """
+    db_connection = _driver_connect(config, True)
+    cursor = db_connection.cursor(**{mysql_driver._cursor_param: mysql_driver.cursors.SSDictCursor})
+    start = time.perf_counter()
+    cursor.execute(query)
+    rows = 0
+    for batch in fetch_row_batches(cursor):
+        rows += len(batch)
+    elapsed = time.perf_counter() - start
+    cursor.close()
+    db_connection.close()
+    return rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--digits', type=int, default=6)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    config = {
+        'host': args.host,
+        'port': args.port,
+        'user': args.user,
+        'password': os.environ.get('MYSQL_PWD', ''),
+    }
+    query = build_query(args.digits)
+
+    results = {}
+    for backend in sorted(CONNECTOR_BACKENDS):
+        if not mysql_driver.use(backend):
+            results[backend] = {'skipped': True}
+            continue
+
+        runs = [fetch(config, query) for dummy in range(args.runs)]
+        rows = runs[0][0]
+        seconds = min(elapsed for dummy, elapsed in runs)
+        results[backend] = {
+            'skipped': False,
+            'version': mysql_driver.__version__,
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_second': int(rows / seconds),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) Ansible Project
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Run a parameterized point query with and without prepared statements.
+
+Prints a JSON object mapping backend names to the best time of the runs
+of the plain queries (client-side interpolation, text protocol) and of
+the prepared statements of the prepared option. The password is read
+from MYSQL_PWD.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import json
+import os
+import time
+
+from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    CONNECTOR_BACKENDS,
+    PreparedStatements,
+    _driver_connect,
+    mysql_driver,
+)
+
+TABLE = 'ansible_benchmark.point_query'
+QUERY = 'SELECT id, name FROM %s WHERE id = %%s' % TABLE
+
+
+def create_table(config, rows):
+    db_connection = _driver_connect(config, True)
+    cursor = db_connection.cursor()
+    cursor.execute('CREATE DATABASE IF NOT EXISTS ansible_benchmark')
+    cursor.execute('DROP TABLE IF EXISTS %s' % TABLE)
+    cursor.execute('CREATE TABLE %s (id INT PRIMARY KEY, name VARCHAR(32))' % TABLE)
+    cursor.executemany('INSERT INTO %s VALUES (%%s, %%s)' % TABLE, [(i, 'row-%d' % i) for i in range(rows)])
+    db_connection.close()
+
+
+def run(config, executions, rows, prepared):
+    """Run QUERY executions times for ids cycling through the table.
+
+    Returns: Seconds.
+    """
+    db_connection = _driver_connect(config, True)
+    cursor = db_connection.cursor()
+    execute = PreparedStatements(cursor).execute if prepared else cursor.execute
+    start = time.perf_counter()
+    for i in range(executions):
+        execute(QUERY, (i % rows,))
+        cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    db_connection.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--executions', type=int, default=10000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    config = {
+        'host': args.host,
+        'port': args.port,
+        'user': args.user,
+        'password': os.environ.get('MYSQL_PWD', ''),
+    }
+
+    results = {}
+    for backend in sorted(CONNECTOR_BACKENDS):
+        if not mysql_driver.use(backend):
+            results[backend] = {'skipped': True}
+            continue
+
+        create_table(config, args.rows)
+        results[backend] = {'skipped': False, 'version': mysql_driver.__version__, 'executions': args.executions}
+        for mode, prepared in (('text', False), ('prepared', True)):
+            seconds = min(run(config, args.executions, args.rows, prepared) for dummy in range(args.runs))
+            results[backend][mode] = {
+                'seconds': round(seconds, 3),
+                'executions_per_second': int(args.executions / seconds),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,48 @@ from __future__ import (absolute_import, division, print_function)
 
 __metaclass__ = type
 
+import datetime
+import json
+import socket
+import sys
+import time
+import types
+from decimal import Decimal
+
 import pytest
 
-from ansible_collections.community.mysql.plugins.module_utils.mysql import get_server_version, get_server_implementation
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from ansible_collections.community.mysql.plugins.module_utils import mysql as mysql_utils
+from ansible_collections.community.mysql.plugins.module_utils.mysql import (
+    _connect_first_endpoint,
+    _connect_unix_socket,
+    _read_mysql_config_file,
+    RetryPolicy,
+    SessionLostError,
+    _LazyDriver,
+    PreparedStatements,
+    dictionary_encode,
+    execute_read,
+    fetch_row_batches,
+    find_unix_sockets,
+    get_server_implementation,
+    get_server_profile,
+    get_server_version,
+    mysql_driver,
+    parse_from_mysql_config_file,
+    get_connection_info,
+    get_replica_lag,
+    get_row_converter,
+    parse_login_hosts,
+    rows_to_columnar,
+    set_session_vars,
+    to_prepared_statement,
+)
+from ansible_collections.community.mysql.plugins.module_utils.user import get_mode, get_user_implementation
 from ..utils import dummy_cursor_class
 
 
@@ -41,3 +80,756 @@ def test_get_server_implamentation(cursor_return_version, cursor_return_type, se
     cursor = dummy_cursor_class(cursor_return_version, cursor_return_type)
 
     assert get_server_implementation(cursor) == server_implementation
+
+
+class counting_cursor_class():
+    """Cursor double that answers the ServerProfile probes and records executed queries."""
+    def __init__(self, version):
+        self.version = version
+        self.connection = type('Connection', (), {})()
+        self.executed = []
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+
+    def fetchone(self):
+        if 'VERSION()' in self.executed[-1]:
+            return (self.version, 'ANSI_QUOTES')
+        return ('ANSI_QUOTES',)
+
+    def fetchall(self):
+        return [('Password',), ('authentication_string',)]
+
+
+@pytest.mark.parametrize(
+    'server_version,server_implementation',
+    [
+        ('8.0.22-mysql', 'mysql'),
+        ('10.5.1-mariadb', 'mariadb'),
+    ]
+)
+def test_server_profile_probes_once(server_version, server_implementation):
+    """
+    Test that repeated helper calls reuse the ServerProfile stored on the connection.
+    """
+    cursor = counting_cursor_class(server_version)
+
+    for dummy in range(3):
+        assert get_server_version(cursor) == server_version
+        assert get_server_implementation(cursor) == server_implementation
+        user_impl = get_user_implementation(cursor)
+        user_impl.use_old_user_mgmt(cursor)
+        user_impl.server_supports_alter_user(cursor)
+        user_impl.server_supports_password_expire(cursor)
+        assert get_mode(cursor) == 'ANSI'
+        assert get_server_profile(cursor).get_user_password_columns(cursor) == ('Password', 'authentication_string')
+
+    # One query for the version and sql_mode, one for the password columns
+    assert len(cursor.executed) == 2
+    assert len([q for q in cursor.executed if 'VERSION()' in q]) == 1
+
+
+def test_server_profile_probes_calling_cursor():
+    """
+    Test that the lazy probes run on the cursor passed by the caller, not on the cursor that created the profile.
+    """
+    first = counting_cursor_class('8.0.22-mysql')
+    get_server_profile(first)
+    second = counting_cursor_class('8.0.22-mysql')
+    second.connection = first.connection
+    second.fetchall = lambda: []
+
+    assert get_server_profile(second).get_user_password_columns(second) == ('authentication_string', 'authentication_string')
+    assert len(first.executed) == 1
+    assert second.executed == ["SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                               "WHERE TABLE_SCHEMA = 'mysql' AND TABLE_NAME = 'user' "
+                               "AND COLUMN_NAME IN ('Password', 'authentication_string') "
+                               "ORDER BY COLUMN_NAME DESC"]
+
+
+def test_server_profile_reset_by_session_vars():
+    """
+    Test that setting session variables drops the cached sql_mode only.
+    """
+    cursor = counting_cursor_class('8.0.22-mysql')
+    get_mode(cursor)
+    set_session_vars(None, cursor, {'sql_mode': 'ANSI_QUOTES'})
+    get_mode(cursor)
+
+    assert len([q for q in cursor.executed if 'VERSION()' in q]) == 1
+    assert len([q for q in cursor.executed if '@@sql_mode' in q]) == 2
+
+
+def test_set_session_vars_single_statement():
+    """
+    Test that all session variables are set by one statement.
+    """
+    cursor = MagicMock()
+    set_session_vars(None, cursor, {'sql_log_bin': 0, 'wsrep_on': 'OFF'})
+
+    cursor.execute.assert_called_once_with('SET SESSION `sql_log_bin` = %s, `wsrep_on` = %s', (0, 'OFF'))
+
+    cursor.reset_mock()
+    set_session_vars(None, cursor, {})
+    assert not cursor.execute.called
+
+
+def test_parse_from_mysql_config_file_includes(tmp_path):
+    """
+    Test that !include and !includedir are followed, and the group of the including file continues after them.
+    """
+    conf_d = tmp_path / 'conf.d'
+    conf_d.mkdir()
+    (conf_d / '10-credentials.cnf').write_text(u'[client]\nuser = fromdir\npassword = "secret"\n')
+    (conf_d / '20-ignored.txt').write_text(u'[client]\nuser = ignored\n')
+    (tmp_path / 'port.cnf').write_text(u'[client]\nport = 3307\n!include %s\n' % (tmp_path / 'my.cnf'))
+    (tmp_path / 'my.cnf').write_text(
+        u'[client]\nhost = db1\n!includedir %s\n!include port.cnf\nsocket = /tmp/mysql.sock\n[mysqldump]\nquick\n' % conf_d
+    )
+
+    cp = parse_from_mysql_config_file(str(tmp_path / 'my.cnf'))
+
+    assert cp.get('client', 'host') == 'db1'
+    assert cp.get('client', 'user') == 'fromdir'
+    assert cp.get('client', 'password') == '"secret"'
+    assert cp.getint('client', 'port') == 3307
+    assert cp.get('client', 'socket') == '/tmp/mysql.sock'
+    assert cp.has_option('mysqldump', 'quick')
+
+
+def test_parse_from_mysql_config_file_include_loop(tmp_path):
+    """
+    Test that a file included again through a symlink or another relative path is not followed twice.
+    """
+    conf_d = tmp_path / 'conf.d'
+    conf_d.mkdir()
+    (conf_d / 'extra.cnf').write_text(u'[client]\nport = 3307\n!include %s\n' % (conf_d / '..' / 'my.cnf'))
+    (tmp_path / 'link.cnf').symlink_to(conf_d / 'extra.cnf')
+    (tmp_path / 'my.cnf').write_text(u'[client]\nhost = db1\n!include link.cnf\n!includedir conf.d\n')
+
+    cp, included_files = _read_mysql_config_file(str(tmp_path / 'my.cnf'))
+
+    assert cp.get('client', 'host') == 'db1'
+    assert cp.getint('client', 'port') == 3307
+    assert included_files == [str((conf_d / 'extra.cnf').resolve())]
+
+
+def test_parse_from_mysql_config_file_later_options_win(tmp_path):
+    """
+    Test that options of an included file are overridden by options that follow the directive.
+    """
+    (tmp_path / 'extra.cnf').write_text(u'[client]\nhost = included\nport = 3308\n')
+    (tmp_path / 'my.cnf').write_text(u'[client]\nhost = top\n!include extra.cnf\nhost = last\n')
+
+    cp = parse_from_mysql_config_file(str(tmp_path / 'my.cnf'))
+
+    assert cp.get('client', 'host') == 'last'
+    assert cp.get('client', 'port') == '3308'
+
+
+@pytest.mark.parametrize(
+    'login_host,endpoints',
+    [
+        ('localhost', [('localhost', 3306)]),
+        ('db1, db2:3307', [('db1', 3306), ('db2', 3307)]),
+        ('::1,[2001:db8::1]:3308,[::2]', [('::1', 3306), ('2001:db8::1', 3308), ('::2', 3306)]),
+    ]
+)
+def test_parse_login_hosts(login_host, endpoints):
+    """
+    Test that hosts with optional ports are parsed from login_host.
+    """
+    assert parse_login_hosts(login_host, 3306) == endpoints
+
+
+class fake_driver_class():
+    """Driver module double whose connect() answers after a delay that depends on the host."""
+    __name__ = 'pymysql'
+
+    class OperationalError(Exception):
+        pass
+
+    def __init__(self, delays, read_only=None):
+        self.delays = delays
+        self.read_only = read_only or {}
+        self.closed = []
+
+    def connect(self, host, port, autocommit, **kwargs):
+        driver = self
+        time.sleep(self.delays[host])
+        if self.delays[host] >= 1:
+            raise self.OperationalError(2003, "Can't connect to MySQL server on '%s'" % host)
+
+        class Connection():
+            def cursor(self):
+                cursor = MagicMock()
+                cursor.fetchone.return_value = (driver.read_only.get(host, 0),)
+                return cursor
+
+            def close(self):
+                driver.closed.append(host)
+
+        return Connection()
+
+
+@pytest.mark.parametrize(
+    'read_only,expected_host',
+    [
+        (None, 'fast'),
+        (True, 'slow'),
+    ]
+)
+def test_connect_first_endpoint(monkeypatch, read_only, expected_host):
+    """
+    Test that the first qualifying host wins without waiting for a host that does not answer.
+    """
+    driver = fake_driver_class({'dead': 3, 'fast': 0, 'slow': 0.2}, read_only={'slow': 1})
+    monkeypatch.setattr(mysql_driver, '_module', driver)
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+
+    start = time.perf_counter()
+    db_connection, winner, attempts = _connect_first_endpoint({}, [('dead', 3306), ('fast', 3306), ('slow', 3306)],
+                                                              True, read_only, 30)
+
+    assert time.perf_counter() - start < 1
+    assert db_connection is not None
+    assert winner['host'] == expected_host
+    assert [a['status'] for a in attempts if a['host'] == 'dead'] == ['pending']
+    if read_only:
+        assert [a['status'] for a in attempts if a['host'] == 'fast'] == ['rejected']
+        assert driver.closed == ['fast']
+
+
+class streaming_cursor_class():
+    """Cursor double that hands out rows on fetchmany like an unbuffered cursor."""
+    def __init__(self, row_count):
+        self.rows = iter(range(row_count))
+        self.fetched = 0
+
+    def fetchmany(self, size):
+        batch = [(row,) for dummy, row in zip(range(size), self.rows)]
+        self.fetched += len(batch)
+        return tuple(batch)
+
+
+@pytest.mark.parametrize(
+    'row_count,batch_size,batch_lengths',
+    [
+        (0, 2, []),
+        (4, 2, [2, 2]),
+        (5, 2, [2, 2, 1]),
+        (3, 1000, [3]),
+    ]
+)
+def test_fetch_row_batches(row_count, batch_size, batch_lengths):
+    """
+    Test that rows are yielded in batches of at most batch_size and fetched only when consumed.
+    """
+    cursor = streaming_cursor_class(row_count)
+    batches = fetch_row_batches(cursor, batch_size)
+
+    assert cursor.fetched == 0
+    result = list(batches)
+
+    assert [len(batch) for batch in result] == batch_lengths
+    assert [row[0] for batch in result for row in batch] == list(range(row_count))
+    assert all(isinstance(batch, list) for batch in result)
+
+
+@pytest.fixture
+def unix_sockets(tmp_path):
+    """Create listening Unix sockets and return a function returning their paths."""
+    sockets = []
+
+    def create(name):
+        path = str(tmp_path / name)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen(1)
+        sockets.append(sock)
+        return path
+
+    yield create
+
+    for sock in sockets:
+        sock.close()
+
+
+def test_find_unix_sockets(monkeypatch, tmp_path, unix_sockets):
+    """
+    Test that sockets from option files come first and paths that are not sockets are skipped.
+    """
+    client_socket = unix_sockets('client.sock')
+    server_socket = unix_sockets('server.sock')
+    default_socket = unix_sockets('default.sock')
+    not_a_socket = tmp_path / 'file.sock'
+    not_a_socket.write_text(u'')
+
+    cnf = tmp_path / 'my.cnf'
+    cnf.write_text(u'[client]\nsocket = "%s"\n[mysqld]\nsocket = %s\n' % (client_socket, server_socket))
+    monkeypatch.setattr(mysql_utils, 'MYSQL_UNIX_SOCKET_PATHS',
+                        (str(not_a_socket), str(tmp_path / 'missing.sock'), default_socket, client_socket))
+
+    assert find_unix_sockets([str(cnf), str(tmp_path / 'missing.cnf')]) == [client_socket, server_socket, default_socket]
+
+
+def test_connect_unix_socket(monkeypatch):
+    """
+    Test that a socket of a server listening on another port or failing the port probe is not used.
+    """
+    ports = {'/run/other.sock': 3307, '/run/starting.sock': None, '/run/mysqld.sock': 3306}
+    closed = []
+
+    class Error(Exception):
+        pass
+
+    class Connection():
+        def __init__(self, unix_socket, **kwargs):
+            self.unix_socket = unix_socket
+
+        def cursor(self):
+            cursor = MagicMock()
+            if ports[self.unix_socket] is None:
+                cursor.execute.side_effect = Error(2013, 'Lost connection to MySQL server during query')
+            cursor.fetchone.return_value = (ports[self.unix_socket],)
+            return cursor
+
+        def close(self):
+            closed.append(self.unix_socket)
+
+    driver = MagicMock()
+    driver.__name__ = 'pymysql'
+    driver.connect = Connection
+    driver.Error = Error
+    monkeypatch.setattr(mysql_driver, '_module', driver)
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(mysql_utils, 'find_unix_sockets',
+                        lambda config_files: ['/run/other.sock', '/run/starting.sock', '/run/mysqld.sock'])
+
+    db_connection, path = _connect_unix_socket({'host': 'localhost', 'port': 3306, 'user': 'root'}, True, [])
+
+    assert path == '/run/mysqld.sock'
+    assert db_connection.unix_socket == '/run/mysqld.sock'
+    assert closed == ['/run/other.sock', '/run/starting.sock']
+
+    monkeypatch.setattr(mysql_utils, 'find_unix_sockets', lambda config_files: ['/run/other.sock'])
+    assert _connect_unix_socket({'host': 'localhost', 'port': 3306}, True, []) == (None, None)
+
+
+class error_driver_class():
+    """Driver double providing the exception classes."""
+    __name__ = 'pymysql'
+
+    class Error(Exception):
+        pass
+
+    class OperationalError(Error):
+        pass
+
+
+@pytest.fixture
+def retry_driver(monkeypatch):
+    """Load the driver double and record sleeps instead of sleeping."""
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    sleeps = []
+    monkeypatch.setattr(mysql_utils.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def failing_operation(errors, result='ok'):
+    """Return a function raising the given error codes one by one, then returning result."""
+    errors = list(errors)
+
+    def operation():
+        if errors:
+            raise error_driver_class.OperationalError(errors.pop(0), 'error')
+        return result
+
+    return operation
+
+
+@pytest.mark.parametrize(
+    'errors,retries,timeout,expected_retried',
+    [
+        ([], 3, 60, 0),
+        ([1040, 2003], 3, 60, 2),
+        ([1040, 1040, 1040, 1040], 3, 60, None),
+        ([1045], 3, 60, None),
+        ([2003], 3, 0, None),
+        ([2003], 0, 60, None),
+    ]
+)
+def test_retry_policy(retry_driver, errors, retries, timeout, expected_retried):
+    """
+    Test that only transient errors are retried, within the retry count and the deadline.
+    """
+    policy = RetryPolicy(retries, 1.0, timeout)
+
+    if expected_retried is None:
+        with pytest.raises(error_driver_class.OperationalError):
+            policy.run(failing_operation(errors))
+    else:
+        assert policy.run(failing_operation(errors)) == 'ok'
+        assert policy.retried == expected_retried
+        assert len(retry_driver) == expected_retried
+
+    # Waits are jittered below an exponentially growing bound
+    for retry, wait in enumerate(retry_driver):
+        assert 0 <= wait <= 2 ** retry
+    assert policy.wait == pytest.approx(sum(retry_driver))
+
+
+def test_execute_read_reconnects(retry_driver):
+    """
+    Test that a read is retried with the policy of the connection after reopening a lost connection.
+    """
+    cursor = MagicMock()
+    cursor.execute.side_effect = [error_driver_class.OperationalError(2013, 'Lost connection'), None]
+    cursor.fetchone.return_value = ('row',)
+    cursor.connection._ansible_retry_policy = RetryPolicy(2)
+    cursor.connection.server_status = 0
+
+    assert execute_read(cursor, 'SHOW REPLICA STATUS', fetchone=True) == ('row',)
+    cursor.connection.ping.assert_called_once_with(True)
+    assert cursor.execute.call_count == 2
+
+    info = get_connection_info(cursor.connection)
+    assert info['retries'] == 1
+    assert info['retry_wait_ms'] == pytest.approx(retry_driver[0] * 1000, abs=0.001)
+
+
+def test_execute_read_restores_session(retry_driver):
+    """
+    Test that the session vars are set again on the reopened connection before the read is retried.
+    """
+    cursor = MagicMock()
+    cursor.execute.side_effect = [None, error_driver_class.OperationalError(2006, 'Server has gone away'), None, None]
+    cursor.connection._ansible_retry_policy = RetryPolicy(2)
+    cursor.connection.server_status = 0
+    cursor.connection._ansible_server_profile = None
+    set_session_vars(MagicMock(), cursor, {'sql_log_bin': 0})
+
+    execute_read(cursor, 'SELECT 1')
+
+    assert [c.args for c in cursor.execute.call_args_list] == [
+        ('SET SESSION `sql_log_bin` = %s', (0,)),
+        ('SELECT 1',),
+        ('SET SESSION `sql_log_bin` = %s', (0,)),
+        ('SELECT 1',),
+    ]
+
+
+@pytest.mark.parametrize('server_status,autocommit', [
+    # PyMySQL reports the open transaction
+    (0x0003, True),
+    # Other drivers may be in a transaction without autocommit
+    (None, False),
+])
+def test_execute_read_within_transaction(retry_driver, server_status, autocommit):
+    """
+    Test that a connection lost within a transaction is not reopened.
+    """
+    cursor = MagicMock()
+    cursor.execute.side_effect = error_driver_class.OperationalError(2013, 'Lost connection')
+    cursor.connection._ansible_retry_policy = RetryPolicy(2)
+    cursor.connection.server_status = server_status
+    cursor.connection.get_autocommit.return_value = autocommit
+
+    with pytest.raises(SessionLostError):
+        execute_read(cursor, 'SELECT 1')
+
+    cursor.connection.ping.assert_not_called()
+    assert cursor.execute.call_count == 1
+
+
+@pytest.mark.parametrize(
+    'installed,connector,expected_module,expected_cursor_param',
+    [
+        (['fake_pymysql', 'fake_mysqldb'], 'auto', 'fake_pymysql', 'cursor'),
+        (['fake_mysqldb'], 'auto', 'fake_mysqldb', 'cursorclass'),
+        (['fake_pymysql', 'fake_mysqldb'], 'mysqlclient', 'fake_mysqldb', 'cursorclass'),
+        (['fake_mysqldb'], 'pymysql', None, None),
+        ([], 'auto', None, None),
+    ]
+)
+def test_lazy_driver_use(monkeypatch, installed, connector, expected_module, expected_cursor_param):
+    """
+    Test that the chosen connector backend is loaded with its cursor class keyword.
+    """
+    monkeypatch.setattr(mysql_utils, 'CONNECTOR_BACKENDS', {
+        'pymysql': ('fake_pymysql', 'cursor'),
+        'mysqlclient': ('fake_mysqldb', 'cursorclass'),
+    })
+    for name in ('fake_pymysql', 'fake_mysqldb'):
+        for module_name in (name, name + '.cursors'):
+            monkeypatch.setitem(sys.modules, module_name, types.ModuleType(module_name) if name in installed else None)
+
+    driver = _LazyDriver()
+    assert driver.use(connector) == (expected_module is not None)
+    assert getattr(driver._module, '__name__', None) == expected_module
+    assert driver._cursor_param == expected_cursor_param
+
+    # Switching back to auto reloads the driver
+    driver.use('auto')
+    if installed:
+        assert driver._module.__name__ == installed[0]
+
+
+# cursor.description and a row of a result with every kind of column
+MIXED_DESCRIPTION = (
+    ('id', 8), ('price', 246), ('created', 12), ('day', 10), ('duration', 11),
+    ('name', 253), ('data', 252), ('note', 253), ('ratio', 5), ('flags', 248), ('doc', 245),
+)
+
+
+def mixed_row(i):
+    return {
+        'id': i,
+        'price': Decimal('%d.25' % i),
+        'created': datetime.datetime(2024, 1, 1, 12, 0, i % 60),
+        'day': datetime.date(2024, 1, 1 + i % 28),
+        'duration': datetime.timedelta(seconds=i),
+        'name': u'name \u00e9 %d' % i,
+        'data': b'\x00\xffdata',
+        'note': None if i % 2 else 'note',
+        'ratio': i / 3.0,
+        'flags': set(['a']),
+        'doc': '{"a": 1}',
+    }
+
+
+def test_get_row_converter():
+    """
+    Test that rows are converted exactly like the JSON round trip does.
+    """
+    rows = [mixed_row(i) for i in range(10)]
+    # NULL stays NULL in columns converted to strings
+    rows.append(dict(mixed_row(0), price=None, created=None, day=None))
+    expected = json.loads(json.dumps(rows, default=str))
+
+    convert = get_row_converter(MIXED_DESCRIPTION, rows[0])
+    assert [convert(row) for row in rows] == expected
+
+    assert get_row_converter((('id', 3), ('ratio', 4)), {'id': 1, 'ratio': 0.5}) is None
+
+
+def test_get_row_converter_benchmark():
+    """
+    Compare the JSON round trip with the type-directed conversion on a 100k-row mixed result.
+    """
+    row_count = 100000
+    timings = {'json': [], 'converter': []}
+    for dummy in range(3):
+        rows = [mixed_row(i) for i in range(row_count)]
+        start = time.perf_counter()
+        expected = json.loads(json.dumps(rows, default=str))
+        timings['json'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        convert = get_row_converter(MIXED_DESCRIPTION, rows[0])
+        result = [convert(row) for row in rows]
+        timings['converter'].append(time.perf_counter() - start)
+
+        assert result == expected
+
+    print('100k rows: JSON round trip %.3fs, converter %.3fs' % (min(timings['json']), min(timings['converter'])))
+    assert min(timings['converter']) < min(timings['json'])
+
+
+def test_rows_to_columnar():
+    """
+    Test that keys of all rows become columns and missing keys become None.
+    """
+    rows = [{'name': 'a', 'host': '%'}, {'name': 'b', 'host': 'localhost', 'locked': True}]
+
+    assert rows_to_columnar(rows) == {
+        'columns': ['name', 'host', 'locked'],
+        'rows': [['a', '%', None], ['b', 'localhost', True]],
+    }
+    assert rows_to_columnar(rows, ['host']) == {'columns': ['host'], 'rows': [['%'], ['localhost']]}
+    assert rows_to_columnar([]) == {'columns': [], 'rows': []}
+
+
+def test_dictionary_encode():
+    """
+    Test that only string columns with few distinct values are encoded and NULL is kept.
+    """
+    result = {
+        'columns': ['id', 'status', 'name', 'country'],
+        'rows': [
+            [1, 'new', 'a', 'NL'],
+            [2, 'shipped', 'b', None],
+            [3, 'new', 'c', 'NL'],
+            [4, 'new', 'd', 'NL'],
+        ],
+    }
+
+    assert dictionary_encode(result) == {
+        'columns': ['id', 'status', 'name', 'country'],
+        'rows': [
+            [1, 0, 'a', 0],
+            [2, 1, 'b', None],
+            [3, 0, 'c', 0],
+            [4, 0, 'd', 0],
+        ],
+        'dictionaries': {'status': ['new', 'shipped'], 'country': ['NL']},
+    }
+
+
+def test_columnar_payload_size():
+    """
+    Test that the columnar form of a typical result is several times smaller as JSON.
+    """
+    statuses = ['new', 'paid', 'shipped', 'delivered']
+    rows = [{'order_id': i, 'customer_id': i % 5000, 'status': statuses[i % 4],
+             'country': 'NL' if i % 3 else 'DE', 'amount': '%d.99' % (i % 100)} for i in range(10000)]
+
+    records_size = len(json.dumps(rows))
+    columnar_size = len(json.dumps(dictionary_encode(rows_to_columnar(rows, list(rows[0])))))
+
+    assert records_size > columnar_size * 2.5
+
+
+@pytest.mark.parametrize('query,args,expected', [
+    ('SELECT * FROM t WHERE id = %s AND name = %s', [1, 'a'], ('SELECT * FROM t WHERE id = ? AND name = ?', [1, 'a'])),
+    ('SELECT * FROM t WHERE id = %(id)s OR parent = %(id)s', {'id': 3}, ('SELECT * FROM t WHERE id = ? OR parent = ?', [3, 3])),
+    ("SELECT * FROM t WHERE name LIKE 'a%%' AND id = %s", (2,), ("SELECT * FROM t WHERE name LIKE 'a%' AND id = ?", [2])),
+])
+def test_to_prepared_statement(query, args, expected):
+    """
+    Test that pyformat placeholders become ? placeholders with the values in their order.
+    """
+    assert to_prepared_statement(query, args) == expected
+
+
+@pytest.mark.parametrize('query,args', [
+    ('SELECT %s, %s', [1]),
+    ('SELECT %s', [1, 2]),
+])
+def test_to_prepared_statement_wrong_args(query, args):
+    """
+    Test that a wrong number of positional arguments fails like the driver's interpolation.
+    """
+    with pytest.raises(TypeError):
+        to_prepared_statement(query, args)
+
+
+class recording_cursor_class():
+    """Cursor double recording the executed statements."""
+    def __init__(self, unsupported=()):
+        self.executed = []
+        self.unsupported = unsupported
+        self.rowcount = 1
+
+    def execute(self, query, args=None):
+        if query.startswith('PREPARE') and args[0] in self.unsupported:
+            raise error_driver_class.OperationalError(1295, 'not supported in the prepared statement protocol yet')
+        self.executed.append((query, args))
+
+
+def test_prepared_statements_cache(monkeypatch):
+    """
+    Test that statements are prepared once and the least recently used one is deallocated.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    cursor = recording_cursor_class()
+    statements = PreparedStatements(cursor, size=2)
+
+    statements.execute('SELECT * FROM a WHERE id = %s', [1])
+    statements.execute('SELECT * FROM a WHERE id = %s', [2])
+    statements.execute('SELECT * FROM b')
+    statements.execute('SELECT * FROM a WHERE id = %s', [3])
+    statements.execute('SELECT * FROM c')
+    statements.close()
+
+    assert cursor.executed == [
+        ('PREPARE _ansible_stmt_0 FROM %s', ('SELECT * FROM a WHERE id = ?',)),
+        ('SET @_ansible_p0 = %s', [1]),
+        ('EXECUTE _ansible_stmt_0 USING @_ansible_p0', None),
+        ('SET @_ansible_p0 = %s', [2]),
+        ('EXECUTE _ansible_stmt_0 USING @_ansible_p0', None),
+        ('PREPARE _ansible_stmt_1 FROM %s', ('SELECT * FROM b',)),
+        ('EXECUTE _ansible_stmt_1', None),
+        ('SET @_ansible_p0 = %s', [3]),
+        ('EXECUTE _ansible_stmt_0 USING @_ansible_p0', None),
+        # SELECT * FROM b is the least recently used
+        ('PREPARE _ansible_stmt_2 FROM %s', ('SELECT * FROM c',)),
+        ('DEALLOCATE PREPARE _ansible_stmt_1', None),
+        ('EXECUTE _ansible_stmt_2', None),
+        ('DEALLOCATE PREPARE _ansible_stmt_2', None),
+        ('DEALLOCATE PREPARE _ansible_stmt_0', None),
+    ]
+    assert (statements.prepared, statements.executed) == (3, 5)
+
+
+def test_prepared_statements_unsupported(monkeypatch):
+    """
+    Test that a statement the server cannot prepare runs as a plain query, and is not prepared again.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    cursor = recording_cursor_class(unsupported=('LOCK TABLES t READ',))
+    statements = PreparedStatements(cursor)
+
+    assert statements.executemany('LOCK TABLES t READ', [None, None]) == 2
+
+    assert cursor.executed == [('LOCK TABLES t READ', None), ('LOCK TABLES t READ', None)]
+    assert statements.executed == 0
+
+
+class status_cursor_class():
+    """Dict cursor double answering every statement with the same row."""
+    def __init__(self, row):
+        self.row = row
+        self.connection = None
+        self.executed = []
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+
+    def fetchone(self):
+        return self.row
+
+
+@pytest.mark.parametrize('implementation,replica_terminology,row,expected_query,expected', [
+    ('mysql', True, {'Seconds_Behind_Source': 3}, 'SHOW REPLICA STATUS', 3.0),
+    ('mysql', False, {'Seconds_Behind_Master': 0}, 'SHOW SLAVE STATUS', 0.0),
+    ('mariadb', True, {'Seconds_Behind_Master': 12}, 'SHOW REPLICA STATUS', 12.0),
+    # Replication is stopped
+    ('mysql', True, {'Seconds_Behind_Source': None}, 'SHOW REPLICA STATUS', None),
+    # Not a replica
+    ('mariadb', False, None, 'SHOW SLAVE STATUS', None),
+])
+def test_get_replica_lag(monkeypatch, implementation, replica_terminology, row, expected_query, expected):
+    """
+    Test that the lag is read from the replica status of the implementation.
+    """
+    from ansible_collections.community.mysql.plugins.module_utils.implementations.mariadb import replication as mariadb
+    from ansible_collections.community.mysql.plugins.module_utils.implementations.mysql import replication as mysql
+
+    monkeypatch.setattr(mysql_utils, 'get_server_implementation', lambda cursor: implementation)
+    impl = mariadb if implementation == 'mariadb' else mysql
+    monkeypatch.setattr(impl, 'uses_replica_terminology', lambda cursor: replica_terminology)
+    cursor = status_cursor_class(row)
+
+    assert get_replica_lag(cursor) == expected
+    assert cursor.executed == [expected_query]
+
+
+@pytest.mark.parametrize('row,expected', [
+    ({'lag': 1500000}, 1.5),
+    # The clock of the replica is behind the one of the primary
+    ({'lag': -20}, 0.0),
+    # The table is empty
+    ({'lag': None}, None),
+])
+def test_get_replica_lag_heartbeat(row, expected):
+    """
+    Test that the lag is the age of the newest row of the heartbeat table.
+    """
+    cursor = status_cursor_class(row)
+
+    assert get_replica_lag(cursor, 'percona.heartbeat') == expected
+    assert cursor.executed == ['SELECT TIMESTAMPDIFF(MICROSECOND, MAX(ts), NOW(6)) AS lag FROM `percona`.`heartbeat`']
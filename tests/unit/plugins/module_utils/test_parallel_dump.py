@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from ansible_collections.community.mysql.plugins.module_utils import parallel_dump
+from ansible_collections.community.mysql.plugins.module_utils.parallel_dump import (
+    MANIFEST_FILE,
+    DumpError,
+    dump_file_name,
+    dump_rows,
+    get_post_data,
+    get_row_literal,
+    list_tables,
+    plan_chunks,
+    restore_databases,
+    run_tasks,
+    write_post_data,
+    write_schema,
+)
+from ansible_collections.community.mysql.plugins.module_utils.sql_script import split_statements
+
+
+class answer_cursor_class():
+    """Dict cursor double answering statements by the first prefix they start with."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.executed = []
+        self.rows = []
+
+    def execute(self, query, args=None):
+        self.executed.append((query, args))
+        for prefix, rows in self.answers:
+            if query.startswith(prefix):
+                self.rows = list(rows)
+                return
+        raise AssertionError('unexpected query %s' % query)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class literal_connection_class():
+    """Connection double escaping values to bytes like MySQLdb."""
+    encoding = 'utf8'
+
+    def character_set_name(self):
+        return 'utf8mb4'
+
+    def literal(self, value):
+        if value is None:
+            return b'NULL'
+        if isinstance(value, str):
+            return ("'%s'" % value.replace("'", "\\'")).encode('utf8')
+        return str(value).encode('ascii')
+
+
+class commit_connection_class():
+    """Connection double counting commits."""
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+class restore_cursor_class():
+    """Cursor double recording the statements it runs, failing the ones containing fail_on."""
+    def __init__(self, log, fail_on=()):
+        self.connection = commit_connection_class()
+        self.log = log
+        self.fail_on = list(fail_on)
+        self.rowcount = 0
+
+    def execute(self, query, args=None):
+        query = query.decode('utf8') if isinstance(query, bytes) else query
+        for text in self.fail_on:
+            if text in query:
+                self.fail_on.remove(text)
+                raise RuntimeError('failed %s' % text)
+        self.log.append(query)
+        self.rowcount = query.count('\n(') if query.startswith('INSERT') else 0
+
+
+class rows_cursor_class():
+    """Unbuffered tuple cursor double returning rows in batches."""
+    def __init__(self, rows):
+        self.connection = literal_connection_class()
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, args=None):
+        self.executed.append((query, args))
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return tuple(batch)
+
+
+@pytest.mark.parametrize('db,table,suffix,expected', [
+    ('acme', None, 'schema.sql.gz', 'acme.schema.sql.gz'),
+    ('acme', 'orders', '00001.sql.gz', 'acme.orders.00001.sql.gz'),
+    # Dots and path separators are encoded
+    ('a.b', 'c', 'schema.sql.gz', 'a%2Eb.c.schema.sql.gz'),
+    ('a', 'b.c', 'schema.sql.gz', 'a.b%2Ec.schema.sql.gz'),
+    ('x', '../t', '00000.sql.gz', 'x.%2E%2E%2Ft.00000.sql.gz'),
+])
+def test_dump_file_name(db, table, suffix, expected):
+    """
+    Test that every database and table gets files of its own.
+    """
+    assert dump_file_name(db, table, suffix) == expected
+
+
+def test_list_tables():
+    """
+    Test that tables come largest first, views separately, ignored tables not at all.
+    """
+    cursor = answer_cursor_class([('SELECT', [
+        {'db': 'acme', 'name': 'small', 'type': 'BASE TABLE', 'table_rows': 10, 'size': 16384},
+        {'db': 'acme', 'name': 'large', 'type': 'BASE TABLE', 'table_rows': 10 ** 6, 'size': 10 ** 9},
+        {'db': 'acme', 'name': 'report', 'type': 'VIEW', 'table_rows': None, 'size': None},
+        {'db': 'acme', 'name': 'sessions', 'type': 'BASE TABLE', 'table_rows': 10 ** 5, 'size': 10 ** 8},
+    ])])
+
+    tables, views = list_tables(cursor, ['acme'], ['acme.sessions'])
+
+    assert [table['name'] for table in tables] == ['large', 'small']
+    assert tables[0]['rows'] == 10 ** 6
+    assert views == [{'db': 'acme', 'name': 'report'}]
+    assert cursor.executed[0][1] == ('acme',)
+
+
+def chunk_ranges(chunks, low, high):
+    """Return the keys from low to high of every chunk."""
+    ranges = []
+    for where, args in chunks:
+        if where is None:
+            ranges.append(list(range(low, high + 1)))
+        elif ' AND ' in where:
+            ranges.append([k for k in range(low, high + 1) if args[0] <= k < args[1]])
+        elif '<' in where:
+            ranges.append([k for k in range(low, high + 1) if k < args[0]])
+        else:
+            ranges.append([k for k in range(low, high + 1) if k >= args[0]])
+    return ranges
+
+
+@pytest.mark.parametrize('rows,low,high,chunk_size,expected_chunks', [
+    (2500, 1, 2500, 1000, 3),
+    (10000, 1, 10000, 1000, 10),
+    # Gaps in the keys
+    (3000, -5000, 100000, 1000, 3),
+    # Fewer keys than the estimated rows
+    (5000, 1, 3, 1000, 3),
+    # Small tables are not split
+    (1999, 1, 1999, 1000, 1),
+])
+def test_plan_chunks(rows, low, high, chunk_size, expected_chunks):
+    """
+    Test that the chunks cover every key exactly once.
+    """
+    cursor = answer_cursor_class([
+        ('SELECT k.COLUMN_NAME', [{'name': 'id'}]),
+        ('SELECT MIN', [{'low': low, 'high': high}]),
+    ])
+
+    chunks = plan_chunks(cursor, 'acme', 'orders', rows, chunk_size)
+
+    assert len(chunks) == expected_chunks
+    ranges = chunk_ranges(chunks, low - 10, high + 10)
+    assert sorted(k for r in ranges for k in r) == list(range(low - 10, high + 11))
+    assert all(ranges)
+
+
+@pytest.mark.parametrize('answers', [
+    # No integer primary key
+    [('SELECT k.COLUMN_NAME', [])],
+    # The table is empty now
+    [('SELECT k.COLUMN_NAME', [{'name': 'id'}]), ('SELECT MIN', [{'low': None, 'high': None}])],
+])
+def test_plan_chunks_single(answers):
+    """
+    Test that tables that cannot be split are dumped in one chunk.
+    """
+    assert plan_chunks(answer_cursor_class(answers), 'acme', 'orders', 10 ** 6, 1000) == [(None, ())]
+
+
+def test_dump_rows(tmp_path, monkeypatch):
+    """
+    Test that the rows are written as INSERT statements of about DUMP_STATEMENT_SIZE bytes.
+    """
+    monkeypatch.setattr(parallel_dump, 'DUMP_STATEMENT_SIZE', 40)
+    rows = [(i, "it's %s" % i, None) for i in range(5)]
+    cursor = rows_cursor_class(rows)
+    path = str(tmp_path / 'acme.orders.00001.sql.gz')
+
+    count, size = dump_rows(cursor, path, 'acme', 'orders', ['id', 'note', 'shipped'], '`id` >= %s', (0,))
+
+    assert (count, size) == (5, (tmp_path / 'acme.orders.00001.sql.gz').stat().st_size)
+    assert cursor.executed == [('SELECT `id`, `note`, `shipped` FROM `acme`.`orders` WHERE `id` >= %s', (0,))]
+    with gzip.open(path, 'rb') as f:
+        lines = f.read().decode('utf8').split('\n')
+    assert lines[0] == '/*!40101 SET NAMES utf8mb4 */;'
+    assert lines[4:] == [
+        'INSERT INTO `orders` (`id`, `note`, `shipped`) VALUES',
+        "(0,'it\\'s 0',NULL),",
+        "(1,'it\\'s 1',NULL);",
+        'INSERT INTO `orders` (`id`, `note`, `shipped`) VALUES',
+        "(2,'it\\'s 2',NULL),",
+        "(3,'it\\'s 3',NULL);",
+        'INSERT INTO `orders` (`id`, `note`, `shipped`) VALUES',
+        "(4,'it\\'s 4',NULL);",
+        '',
+    ]
+
+
+def test_get_row_literal_pymysql():
+    """
+    Test that PyMySQL rows are escaped in one call, binary values included.
+    """
+    pymysql = pytest.importorskip('pymysql')
+    connection = pymysql.connections.Connection(defer_connect=True)
+
+    literal = get_row_literal(connection)
+
+    assert literal((1, "a'b", None, b'\xff\x00', datetime.date(2024, 5, 1))) == (
+        b"(1,'a\\'b',NULL,_binary X'ff00','2024-05-01')")
+
+
+def test_run_tasks():
+    """
+    Test that the tasks run at the same time, one per connection.
+    """
+    done = []
+    threads = set()
+
+    def task(cursor, number):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        done.append((cursor, number))
+
+    start = time.time()
+    run_tasks(['c1', 'c2', 'c3', 'c4'], [('task %s' % i, lambda cursor, i=i: task(cursor, i)) for i in range(8)])
+
+    assert time.time() - start < 1
+    assert sorted(number for dummy, number in done) == list(range(8))
+    assert len(threads) == 4
+
+
+def test_run_tasks_failure():
+    """
+    Test that no more tasks start after one failed, and its error is raised.
+    """
+    started = []
+
+    def task(cursor, number):
+        started.append(number)
+        if number == 1:
+            raise ValueError('disk full')
+
+    with pytest.raises(DumpError) as e:
+        run_tasks(['c1'], [('task %s' % i, lambda cursor, i=i: task(cursor, i)) for i in range(5)])
+
+    assert str(e.value) == 'task 1: disk full'
+    assert started == [0, 1]
+
+
+def test_get_post_data():
+    """
+    Test that the triggers of dumped tables, the routines and the events are read with their session settings.
+    """
+    cursor = answer_cursor_class([
+        ('SELECT TRIGGER_NAME', [{'name': 'audit', 'tbl': 'orders'}, {'name': 'skip', 'tbl': 'ignored'}]),
+        ('SELECT ROUTINE_TYPE', [{'type': 'FUNCTION', 'name': 'total'}, {'type': 'PROCEDURE', 'name': 'secret'}]),
+        ('SELECT EVENT_NAME', [{'name': 'purge'}]),
+        ('SHOW CREATE TRIGGER', [{'sql_mode': 'STRICT_TRANS_TABLES', 'SQL Original Statement': 'CREATE TRIGGER audit'}]),
+        ('SHOW CREATE FUNCTION', [{'sql_mode': '', 'Create Function': 'CREATE FUNCTION total() RETURNS INT RETURN 1'}]),
+        ('SHOW CREATE PROCEDURE', [{'sql_mode': '', 'Create Procedure': None}]),
+        ('SHOW CREATE EVENT', [{'sql_mode': '', 'time_zone': 'SYSTEM', 'Create Event': 'CREATE EVENT purge'}]),
+    ])
+
+    objects, warnings = get_post_data(cursor, 'acme', ['orders'])
+
+    assert [(item['type'], item['name']) for item in objects] == [
+        ('TRIGGER', 'audit'), ('FUNCTION', 'total'), ('EVENT', 'purge')]
+    assert objects[0]['drop'] == 'DROP TRIGGER IF EXISTS `audit`'
+    assert objects[0]['sql_mode'] == 'STRICT_TRANS_TABLES'
+    assert objects[2]['time_zone'] == 'SYSTEM'
+    assert warnings == ['Cannot read the definition of procedure acme.secret, it is not dumped']
+
+
+def test_write_post_data(tmp_path):
+    """
+    Test that the statements with semicolons in their bodies are read back whole.
+    """
+    path = str(tmp_path / 'acme.post_data.sql.gz')
+    body = "CREATE PROCEDURE p() BEGIN SELECT 1; SELECT ';;'; END"
+
+    write_post_data(path, [{'type': 'PROCEDURE', 'name': 'p', 'sql_mode': "ANSI_QUOTES", 'time_zone': None,
+                            'drop': 'DROP PROCEDURE IF EXISTS `p`', 'create': body}])
+
+    with gzip.open(path, 'rb') as f:
+        statements = [statement.text.decode('utf8') for statement in split_statements(f)]
+    assert statements[4:] == ["SET SESSION SQL_MODE = 'ANSI_QUOTES'", 'DROP PROCEDURE IF EXISTS `p`', body]
+
+
+def write_dump(directory, tables, views=(), post_data=None):
+    """Write a dump of the database acme with the tables, a dictionary of table names to lists of chunk sizes."""
+    directory = str(directory)
+    write_schema(os.path.join(directory, 'acme.schema.sql.gz'), ['CREATE DATABASE IF NOT EXISTS `acme`'])
+    entry = {'name': 'acme', 'schema': 'acme.schema.sql.gz', 'tables': [], 'views': [], 'post_data': None}
+    for table, sizes in tables.items():
+        schema = dump_file_name('acme', table, 'schema.sql.gz')
+        write_schema(os.path.join(directory, schema), ['CREATE TABLE `%s` (id INT)' % table])
+        chunks = []
+        for number, size in enumerate(sizes):
+            chunk = {'file': dump_file_name('acme', table, '%05d.sql.gz' % number), 'rows': 2, 'bytes': size}
+            write_schema(os.path.join(directory, chunk['file']), ['INSERT INTO `%s` (id) VALUES\n(1),\n(2)' % table])
+            chunks.append(chunk)
+        entry['tables'].append({'name': table, 'schema': schema, 'chunks': chunks})
+    for view in views:
+        schema = dump_file_name('acme', view, 'view.sql.gz')
+        write_schema(os.path.join(directory, schema), ['CREATE VIEW `%s` AS SELECT 1' % view])
+        entry['views'].append({'name': view, 'schema': schema})
+    if post_data:
+        write_post_data(os.path.join(directory, 'acme.post_data.sql.gz'), post_data)
+        entry['post_data'] = {'file': 'acme.post_data.sql.gz', 'triggers': len(post_data), 'routines': 0, 'events': 0}
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump({'format': 1, 'databases': [entry]}, f)
+
+
+def test_restore_databases(tmp_path):
+    """
+    Test that the schema comes first, then the rows, largest chunks first, then the views and triggers.
+    """
+    write_dump(tmp_path, {'small': [100], 'large': [300, 200, 50]}, ['report'],
+               [{'type': 'TRIGGER', 'name': 'audit', 'sql_mode': '', 'time_zone': None,
+                 'drop': 'DROP TRIGGER IF EXISTS `audit`', 'create': 'CREATE TRIGGER audit'}])
+    log = []
+    cursor = restore_cursor_class(log)
+    worker = restore_cursor_class([])
+
+    progress = restore_databases(cursor, [worker], str(tmp_path))
+
+    statements = [query for query in log if not query.startswith(('/*!', 'USE', 'SET', 'DROP'))]
+    assert statements == ['CREATE DATABASE IF NOT EXISTS `acme`', 'CREATE TABLE `small` (id INT)',
+                          'CREATE TABLE `large` (id INT)', 'CREATE VIEW `report` AS SELECT 1', 'CREATE TRIGGER audit']
+    inserts = [query.split()[2] for query in worker.log if query.startswith('INSERT')]
+    assert inserts == ['`large`', '`large`', '`small`', '`large`']
+    assert worker.connection.commits == 4
+    assert (progress['databases'], progress['tables'], progress['views'], progress['triggers']) == (1, 2, 1, 1)
+    assert (progress['chunks'], progress['rows'], progress['bytes']) == (4, 8, 650)
+    assert [(table['table'], table['chunks'], table['rows']) for table in progress['table_progress']] == [
+        ('small', 1, 2), ('large', 3, 6)]
+
+
+def test_restore_databases_view_order(tmp_path):
+    """
+    Test that a view failing because of a view created after it is created in another pass.
+    """
+    write_dump(tmp_path, {}, ['outer', 'inner'])
+    log = []
+
+    progress = restore_databases(restore_cursor_class(log, ['CREATE VIEW `outer`']), [], str(tmp_path))
+
+    assert [query for query in log if query.startswith('CREATE VIEW')] == [
+        'CREATE VIEW `inner` AS SELECT 1', 'CREATE VIEW `outer` AS SELECT 1']
+    assert progress['views'] == 2
+
+
+def test_restore_databases_failure(tmp_path):
+    """
+    Test that a failed chunk is raised with its file, and the progress tells what was restored.
+    """
+    write_dump(tmp_path, {'orders': [300, 200]})
+    progress = {}
+
+    with pytest.raises(DumpError) as e:
+        restore_databases(restore_cursor_class([]), [restore_cursor_class([], ['INSERT'])], str(tmp_path),
+                          progress=progress)
+
+    assert e.value.task == 'acme.orders.00000.sql.gz'
+    assert (progress['tables'], progress['chunks'], progress['rows']) == (1, 0, 0)
+
+
+@pytest.mark.parametrize('manifest,databases,message', [
+    ({'format': 2, 'databases': []}, None, 'manifest.json has dump format 2, only format 1 can be restored'),
+    ({'format': 1, 'databases': []}, ['acme'], 'The dump does not hold the database(s) acme'),
+])
+def test_restore_databases_invalid(tmp_path, manifest, databases, message):
+    """
+    Test that dumps of another format and missing databases are refused before anything is restored.
+    """
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps(manifest))
+    log = []
+
+    with pytest.raises(ValueError) as e:
+        restore_databases(restore_cursor_class(log), [], str(tmp_path), databases)
+
+    assert str(e.value) == message
+    assert log == []
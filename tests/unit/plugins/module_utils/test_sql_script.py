@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import bz2
+import gzip
+import io
+import lzma
+import time
+
+import pytest
+
+from ansible_collections.community.mysql.plugins.module_utils.sql_script import (
+    open_script,
+    split_statements,
+)
+
+
+def split(script):
+    return [(s.number, s.line, s.text) for s in split_statements(io.BytesIO(script))]
+
+
+@pytest.mark.parametrize('script,expected', [
+    (b"SELECT 1;SELECT 2;\nSELECT 3", [(1, 1, b'SELECT 1'), (2, 1, b'SELECT 2'), (3, 2, b'SELECT 3')]),
+    (b"INSERT INTO t VALUES ('a;b', 'it''s', 'x\\';');\n",
+     [(1, 1, b"INSERT INTO t VALUES ('a;b', 'it''s', 'x\\';')")]),
+    (b'SELECT "a;b", `c;d` FROM t;', [(1, 1, b'SELECT "a;b", `c;d` FROM t')]),
+    (b"INSERT INTO t VALUES ('multi\nline;\n');\nSELECT 1;",
+     [(1, 1, b"INSERT INTO t VALUES ('multi\nline;\n')"), (2, 4, b'SELECT 1')]),
+])
+def test_split_statements_quotes(script, expected):
+    """
+    Test that delimiters in quoted strings and identifiers do not end statements.
+    """
+    assert split(script) == expected
+
+
+def test_split_statements_comments():
+    """
+    Test that comments are dropped, except versioned comments and optimizer hints.
+    """
+    script = (b"-- a comment; with a delimiter\n"
+              b"/*!40101 SET NAMES utf8mb4 */;\n"
+              b"SELECT 1; # trailing;\n"
+              b"/* block;\ncomment */ SELECT /*+ MAX_EXECUTION_TIME(100) */ 2;\n"
+              b"SELECT 3--1;\n")
+
+    assert split(script) == [
+        (1, 2, b'/*!40101 SET NAMES utf8mb4 */'),
+        (2, 3, b'SELECT 1'),
+        (3, 5, b'SELECT /*+ MAX_EXECUTION_TIME(100) */ 2'),
+        (4, 6, b'SELECT 3--1'),
+    ]
+
+
+def test_split_statements_delimiter():
+    """
+    Test that DELIMITER commands change the delimiter.
+    """
+    script = (b"DELIMITER $$\n"
+              b"CREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 2;\nEND$$\n"
+              b"delimiter ;\n"
+              b"CALL p();\n")
+
+    assert split(script) == [
+        (1, 2, b'CREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 2;\nEND'),
+        (2, 8, b'CALL p()'),
+    ]
+
+
+@pytest.mark.parametrize('delimiter,text', [
+    (b'//', b'SELECT 4/2, 1-1'),
+    (b'--', b'SELECT 4/2, 1 - 1'),
+    (b'-', b'SELECT 4/2'),
+    (b'/', b'SELECT 1-1'),
+    (b'|', b'SELECT 4/2, 1-1'),
+])
+def test_split_statements_delimiter_characters(delimiter, text):
+    """
+    Test that delimiters starting with / or - and one-character delimiters end statements.
+    """
+    script = (b"DELIMITER " + delimiter + b"\n"
+              b"CREATE PROCEDURE p() BEGIN SELECT 1; END" + delimiter + b"\n"
+              + text + delimiter + b"\n"
+              b"DELIMITER ;\n"
+              b"SELECT 2;\n")
+
+    assert split(script) == [
+        (1, 2, b'CREATE PROCEDURE p() BEGIN SELECT 1; END'),
+        (2, 3, text),
+        (3, 5, b'SELECT 2'),
+    ]
+
+
+def test_statement_keyword():
+    """
+    Test that the keyword is found within versioned comments and session statements are recognized.
+    """
+    statements = list(split_statements(io.BytesIO(b"/*!40014 SET FOREIGN_KEY_CHECKS=0 */;\nuse acme;\ninsert into t values (1);")))
+
+    assert [s.keyword for s in statements] == ['SET', 'USE', 'INSERT']
+    assert [s.is_session_statement() for s in statements] == [True, True, False]
+
+
+@pytest.mark.parametrize('compress', [None, gzip.compress, bz2.compress, lzma.compress])
+def test_open_script(tmp_path, compress):
+    """
+    Test that compressed scripts are detected by their content.
+    """
+    script = b"SELECT 1;\nSELECT 2;\n"
+    path = tmp_path / 'script.sql'
+    path.write_bytes(compress(script) if compress else script)
+
+    with open_script(str(path)) as f:
+        assert [s.text for s in split_statements(f)] == [b'SELECT 1', b'SELECT 2']
+
+
+def test_split_statements_throughput():
+    """
+    Benchmark splitting 50 MB of extended INSERT statements like mysqldump writes.
+    """
+    row = b"(%d,'some text, with; a delimiter','it''s',\"x\",NULL)"
+    line = b"INSERT INTO `t` VALUES " + b",".join(row % i for i in range(1000)) + b";\n"
+    script = line * 1000
+
+    start = time.time()
+    count = sum(1 for dummy in split_statements(io.BytesIO(script)))
+    elapsed = time.time() - start
+
+    assert count == 1000
+    # About 1 s here, the limit leaves room for slow CI machines
+    assert elapsed < 10
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+COLLECTION = 'ansible_collections.community.mysql.plugins'
+
+MODULES = [
+    'mysql_db',
+    'mysql_info',
+    'mysql_query',
+    'mysql_replication',
+    'mysql_role',
+    'mysql_user',
+    'mysql_variables',
+]
+
+# Modules that need the user helpers in every run
+USER_HELPER_MODULES = ('mysql_role', 'mysql_user')
+
+# A module import may take at most this share of
+# the ansible.module_utils.basic import time
+IMPORT_TIME_BUDGET = 0.5
+
+# Runs of the import, the fastest one is compared against the budget
+IMPORT_TIME_RUNS = 3
+
+
+def import_module(name):
+    """Import a module in a fresh interpreter.
+
+    Returns: Tuple (dict of cumulative import times in microseconds, list of imported module names).
+    """
+    code = ('import sys; import ansible.module_utils.basic; import %s; '
+            'sys.stdout.write("\\n".join(sys.modules))' % name)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+
+    return times, proc.stdout.splitlines()
+
+
+@pytest.mark.parametrize('module_name', MODULES)
+def test_module_import_does_not_load_driver(module_name):
+    """
+    Test that importing a module does not import the DB driver,
+    and the user helpers are only imported by modules that always need them.
+    """
+    dummy, modules = import_module('%s.modules.%s' % (COLLECTION, module_name))
+
+    assert 'pymysql' not in modules
+    assert 'MySQLdb' not in modules
+
+    user_helpers_loaded = '%s.module_utils.user' % COLLECTION in modules
+    assert user_helpers_loaded == (module_name in USER_HELPER_MODULES)
+
+
+@pytest.mark.parametrize('module_name', MODULES)
+def test_module_import_time_budget(module_name):
+    """
+    Test that importing a module stays within the startup time budget.
+    """
+    name = '%s.modules.%s' % (COLLECTION, module_name)
+    # Warm up the bytecode cache
+    import_module(name)
+
+    ratios = []
+    for dummy in range(IMPORT_TIME_RUNS):
+        times, dummy_modules = import_module(name)
+        ratios.append(float(times[name]) / times['ansible.module_utils.basic'])
+
+    assert min(ratios) < IMPORT_TIME_BUDGET, (
+        '%s import takes %.0f%% of ansible.module_utils.basic import time, '
+        'the budget is %.0f%%' % (module_name, min(ratios) * 100, IMPORT_TIME_BUDGET * 100))
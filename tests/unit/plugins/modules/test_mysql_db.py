@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+
+from ansible_collections.community.mysql.plugins.modules.mysql_db import get_compressor
+
+
+class FailJson(Exception):
+    pass
+
+
+class bin_path_module_class():
+    """Module double finding the programs installed in /usr/bin."""
+    def __init__(self, installed):
+        self.installed = installed
+
+    def get_bin_path(self, arg, required=False):
+        if arg in self.installed:
+            return '/usr/bin/%s' % arg
+        if required:
+            raise FailJson('Failed to find required executable "%s"' % arg)
+        return None
+
+
+@pytest.mark.parametrize('target,installed,level,threads,expected', [
+    ('dump.sql', ['gzip'], None, None, None),
+    # Multi-threaded programs are preferred, using all CPUs by default
+    ('dump.sql.gz', ['gzip', 'pigz'], None, None, ['/usr/bin/pigz']),
+    ('dump.sql.gz', ['gzip', 'pigz'], 1, 4, ['/usr/bin/pigz', '-p', '4', '-1']),
+    ('dump.sql.bz2', ['bzip2', 'pbzip2', 'lbzip2'], 9, 2, ['/usr/bin/lbzip2', '-n', '2', '-9']),
+    ('dump.sql.bz2', ['bzip2', 'pbzip2'], None, 2, ['/usr/bin/pbzip2', '-p2']),
+    ('dump.sql.xz', ['xz'], 0, None, ['/usr/bin/xz', '-T0', '-0']),
+    ('dump.sql.zst', ['zstd'], 19, 8, ['/usr/bin/zstd', '-T8', '-19']),
+    # Single-threaded fallbacks ignore the threads
+    ('dump.sql.gz', ['gzip'], 6, 4, ['/usr/bin/gzip', '-6']),
+    ('dump.sql.bz2', ['bzip2'], None, None, ['/usr/bin/bzip2']),
+])
+def test_get_compressor(target, installed, level, threads, expected):
+    """
+    Test that the fastest program installed compresses the target.
+    """
+    assert get_compressor(bin_path_module_class(installed), target, level, threads) == expected
+
+
+def test_get_compressor_missing():
+    """
+    Test that the fallback program is required when no program is installed.
+    """
+    with pytest.raises(FailJson) as e:
+        get_compressor(bin_path_module_class([]), 'dump.sql.bz2')
+
+    assert str(e.value) == 'Failed to find required executable "bzip2"'
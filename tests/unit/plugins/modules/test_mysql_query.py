@@ -0,0 +1,954 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import re
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
+
+from ansible_collections.community.mysql.plugins.module_utils.mysql import RetryPolicy, mysql_driver
+from ansible_collections.community.mysql.plugins.module_utils.sql_script import split_statements
+from ansible_collections.community.mysql.plugins.modules import mysql_query
+from ansible_collections.community.mysql.plugins.modules.mysql_query import (
+    ChunkThrottle,
+    OutputFile,
+    QueryStats,
+    QueryWatchdog,
+    execute_batches,
+    execute_chunks,
+    execute_parallel,
+    execute_script,
+    get_query_timeout_vars,
+    get_server_time_limit,
+    iter_batches,
+    ScriptError,
+    choose_replica,
+    is_read_only_query,
+    probe_replicas,
+    read_batch_args_file,
+    run_query,
+)
+
+
+class ss_dict_cursor_class():
+    """Unbuffered dict cursor double handing out rows on fetchmany."""
+    def __init__(self, columns, rows):
+        self.description = [(column,) for column in columns] if columns else None
+        self.rows = [dict(zip(columns, row)) for row in rows]
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return tuple(batch)
+
+
+def output_module():
+    module = MagicMock()
+    module.atomic_move.side_effect = os.rename
+    module.sha1.side_effect = lambda path: hashlib.sha1(open(path, 'rb').read()).hexdigest()
+    return module
+
+
+def read_output(path, compression):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if compression == 'gzip':
+        data = gzip.decompress(data)
+    elif compression == 'xz':
+        data = lzma.decompress(data)
+    return data.decode('utf-8')
+
+
+@pytest.mark.parametrize('compression', ['none', 'gzip', 'xz'])
+def test_output_file_jsonl(tmp_path, compression):
+    """
+    Test that JSON Lines rows are converted like query_result and the file is described correctly.
+    """
+    path = str(tmp_path / 'out.jsonl')
+    module = output_module()
+    output = OutputFile(module, path, 'jsonl', compression)
+
+    rows = [(i, 'name %d' % i, Decimal('1.50'), None) for i in range(2500)]
+    assert output.write_result(ss_dict_cursor_class(['id', 'name', 'price', 'note'], rows)) == 2500
+    assert output.write_result(ss_dict_cursor_class(None, [])) == 0
+    info = output.close()
+
+    lines = read_output(path, compression).splitlines()
+    assert [json.loads(line) for line in lines] == json.loads(json.dumps(
+        [dict(zip(['id', 'name', 'price', 'note'], row)) for row in rows], default=str))
+    assert info == {
+        'path': path,
+        'rows': 2500,
+        'bytes': os.path.getsize(path),
+        'checksum': hashlib.sha1(open(path, 'rb').read()).hexdigest(),
+    }
+    assert os.listdir(str(tmp_path)) == ['out.jsonl']
+
+
+def test_output_file_csv(tmp_path):
+    """
+    Test that every result set gets a header and NULL becomes an empty field.
+    """
+    path = str(tmp_path / 'out.csv')
+    output = OutputFile(output_module(), path, 'csv', 'none')
+
+    output.write_result(ss_dict_cursor_class(['id', 'note'], [(1, 'a,b'), (2, None)]))
+    output.write_result(ss_dict_cursor_class(['total'], [(2,)]))
+    info = output.close()
+
+    assert list(csv.reader(io.StringIO(read_output(path, 'none')))) == [
+        ['id', 'note'], ['1', 'a,b'], ['2', ''], ['total'], ['2'],
+    ]
+    assert info['rows'] == 3
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'jsonl'])
+def test_output_file_bytes(tmp_path, output_format):
+    """
+    Test that bytes values are written in base64.
+    """
+    path = str(tmp_path / 'out')
+    output = OutputFile(output_module(), path, output_format, 'none')
+
+    output.write_result(ss_dict_cursor_class(['id', 'data'], [(1, b'\x00\xffab'), (2, bytearray(b'ok'))]))
+    output.close()
+
+    if output_format == 'csv':
+        assert list(csv.reader(io.StringIO(read_output(path, 'none')))) == [
+            ['id', 'data'], ['1', 'AP9hYg=='], ['2', 'b2s='],
+        ]
+    else:
+        assert [json.loads(line) for line in read_output(path, 'none').splitlines()] == [
+            {'id': 1, 'data': 'AP9hYg=='}, {'id': 2, 'data': 'b2s='},
+        ]
+
+
+@pytest.mark.parametrize(
+    'count,batch_size,expected',
+    [
+        (0, 2, []),
+        (4, 2, [[0, 1], [2, 3]]),
+        (5, 2, [[0, 1], [2, 3], [4]]),
+    ]
+)
+def test_iter_batches(count, batch_size, expected):
+    """
+    Test that parameter sets are split into batches of at most batch_size.
+    """
+    assert list(iter_batches(iter(range(count)), batch_size)) == expected
+
+
+def test_read_batch_args_file(tmp_path):
+    """
+    Test that CSV files give named parameter sets with \\N as NULL and JSON Lines files give one set per line.
+    """
+    csv_path = tmp_path / 'args.csv'
+    csv_path.write_text(u'id,story\n1,"a,b"\n2,\\N\n')
+    assert list(read_batch_args_file(str(csv_path))) == [{'id': '1', 'story': 'a,b'}, {'id': '2', 'story': None}]
+
+    jsonl_path = tmp_path / 'args.jsonl'
+    jsonl_path.write_text(u'[1, "a"]\n\n{"id": 2, "story": null}\n')
+    assert list(read_batch_args_file(str(jsonl_path))) == [[1, 'a'], {'id': 2, 'story': None}]
+
+
+@pytest.mark.parametrize(
+    'commit_interval,expected_commits',
+    [
+        (None, 0),
+        (1, 6),
+        (2, 3),
+        (5, 2),
+    ]
+)
+def test_execute_batches(commit_interval, expected_commits):
+    """
+    Test that every batch is run with executemany and committed every commit_interval batches and at the end.
+    """
+    cursor = MagicMock()
+    cursor.rowcount = 10
+    db_connection = MagicMock()
+    batches = [[(i,)] * 10 for i in range(5)] + [[(5,)] * 3]
+
+    results = execute_batches(cursor, db_connection, 'INSERT INTO t VALUES (%s)', iter(batches), commit_interval)
+
+    assert cursor.executemany.call_count == 6
+    assert [r['rowcount'] for r in results] == [10] * 6
+    assert all(r['time_ms'] >= 0 for r in results)
+    assert db_connection.commit.call_count == expected_commits
+
+
+class error_driver_class():
+    """Driver double providing the exception classes."""
+    __name__ = 'pymysql'
+
+    class Error(Exception):
+        pass
+
+
+class scripted_cursor_class():
+    """Buffered tuple cursor double answering statements by their prefix."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.executed = []
+        self.row = None
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+        for prefix, row in self.answers:
+            if query.startswith(prefix):
+                if isinstance(row, Exception):
+                    raise row
+                self.row = row
+                return
+        raise AssertionError('unexpected query %s' % query)
+
+    def fetchone(self):
+        return self.row
+
+
+def query_stats(monkeypatch, mode, answers):
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    cursor = scripted_cursor_class(answers)
+    db_connection = MagicMock()
+    db_connection.cursor.return_value = cursor
+    return QueryStats(MagicMock(), db_connection, mode), cursor
+
+
+STATEMENT_ROW = (10, 1, 0, 1, 0, 2, 10, 1, 0, 4000000, 1225100000)
+
+
+@pytest.mark.parametrize('mode', ['explain', 'analyze'])
+def test_query_stats_explain(monkeypatch, mode):
+    """
+    Test that DML gets the JSON plan in both modes and statements like SET get none.
+    """
+    stats, cursor = query_stats(monkeypatch, mode, [
+        ('SELECT THREAD_ID FROM performance_schema.threads', (42,)),
+        ('EXPLAIN FORMAT=JSON ', ('{"query_block": {"select_id": 1}}',)),
+    ])
+
+    assert stats.explain(' update t set a = 1', None) == {
+        'plan': {'query_block': {'select_id': 1}}, 'plan_format': 'json', 'analyzed': False}
+    assert stats.explain('SET @a = 1', None) == {'plan': None, 'plan_format': None, 'analyzed': False}
+    assert cursor.executed[1:] == ['EXPLAIN FORMAT=JSON  update t set a = 1']
+
+
+@pytest.mark.parametrize('version,statement,expected_plan', [
+    ('8.0.36', 'EXPLAIN ANALYZE SELECT 1', {
+        'plan': '-> Rows fetched before execution  (actual time=0..0 rows=1 loops=1)',
+        'plan_format': 'tree', 'analyzed': True}),
+    ('10.11.6-MariaDB', 'ANALYZE FORMAT=JSON SELECT 1', {
+        'plan': {'query_block': {'r_loops': 1}}, 'plan_format': 'json', 'analyzed': True}),
+    ('8.0.17', 'EXPLAIN FORMAT=JSON SELECT 1', {
+        'plan': {'query_block': {'select_id': 1}}, 'plan_format': 'json', 'analyzed': False}),
+])
+def test_query_stats_analyze(monkeypatch, version, statement, expected_plan):
+    """
+    Test that SELECT is analyzed with the statement the server supports.
+    """
+    stats, cursor = query_stats(monkeypatch, 'analyze', [
+        ('SELECT THREAD_ID FROM performance_schema.threads', (42,)),
+        ('SELECT VERSION()', (version, '')),
+        ('EXPLAIN ANALYZE ', ('-> Rows fetched before execution  (actual time=0..0 rows=1 loops=1)',)),
+        ('ANALYZE FORMAT=JSON ', ('{"query_block": {"r_loops": 1}}',)),
+        ('EXPLAIN FORMAT=JSON ', ('{"query_block": {"select_id": 1}}',)),
+    ])
+
+    assert stats.explain('SELECT 1', None) == expected_plan
+    assert stats.explain('SELECT 1', None) == expected_plan
+    # The server is probed once
+    assert cursor.executed[1:] == ['SELECT VERSION() AS version, @@sql_mode AS sql_mode', statement, statement]
+
+
+def test_query_stats_statement(monkeypatch):
+    """
+    Test that the counters of the last statement of the thread are converted.
+    """
+    stats, cursor = query_stats(monkeypatch, 'explain', [
+        ('SELECT THREAD_ID FROM performance_schema.threads', (42,)),
+        ('SELECT ROWS_EXAMINED', STATEMENT_ROW),
+    ])
+
+    expected = {
+        'rows_examined': 10, 'rows_sent': 1, 'rows_affected': 0, 'created_tmp_tables': 1,
+        'created_tmp_disk_tables': 0, 'sort_merge_passes': 2, 'sort_rows': 10,
+        'no_index_used': True, 'no_good_index_used': False,
+        'lock_time_ms': 0.004, 'timer_wait_ms': 1.2251,
+    }
+    stats.explain('SET @a = 1', None)
+    assert stats.statement() == expected
+    assert stats.statement() == expected
+    # The thread is looked up once
+    assert len(cursor.executed) == 3
+
+
+def test_query_stats_statement_unavailable(monkeypatch):
+    """
+    Test that missing access to performance_schema warns once and returns None.
+    """
+    stats, cursor = query_stats(monkeypatch, 'explain', [
+        ('SELECT THREAD_ID', error_driver_class.Error(1142, 'SELECT command denied')),
+    ])
+
+    stats.explain('SET @a = 1', None)
+    assert stats.statement() is None
+    stats.explain('SET @a = 1', None)
+    assert stats.statement() is None
+    assert len(cursor.executed) == 1
+    assert stats.module.warn.call_count == 1
+
+
+class history_cursor_class():
+    """Cursor double of a session recording its statements in events_statements_history.
+
+    Every statement but the history read examines as many rows as its length.
+    """
+    def __init__(self, history):
+        self.history = history
+        self.row = None
+
+    def execute(self, query, args=None):
+        if query.startswith('SELECT ROWS_EXAMINED'):
+            self.row = (len(self.history[-1]),) + STATEMENT_ROW[1:]
+        else:
+            self.row = (42,) if query.startswith('SELECT THREAD_ID') else None
+        # The history read itself is only recorded after it completes
+        self.history.append(query)
+
+    def fetchone(self):
+        return self.row
+
+
+def test_query_stats_statement_reads_query(monkeypatch):
+    """
+    Test that the counters read are those of the query, not of the thread lookup.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    history = []
+    db_connection = MagicMock()
+    db_connection.cursor.return_value = history_cursor_class(history)
+    stats = QueryStats(MagicMock(), db_connection, 'explain')
+    query = 'SET @a = 1'
+
+    stats.explain(query, None)
+    history.append(query)
+
+    assert stats.statement()['rows_examined'] == len(query)
+
+
+class dict_cursor_class():
+    """Buffered dict cursor double returning the same rows for every query."""
+    def __init__(self, columns, rows, error=None):
+        self.columns = columns
+        self.result = [dict(zip(columns, row)) for row in rows]
+        self.error = error
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, args=None):
+        if self.error is not None:
+            raise self.error
+        self._last_executed = query
+        # Type codes 3 (LONG) and 246 (NEWDECIMAL), the first column is the integer
+        self.description = [(column, 246 if i else 3) for i, column in enumerate(self.columns)]
+        self.rows = list(self.result)
+        self.rowcount = len(self.rows)
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return tuple(batch)
+
+
+@pytest.mark.parametrize('columnar,expected', [
+    (False, [{'id': 1, 'amount': '1.50'}, {'id': 2, 'amount': None}]),
+    (True, {'columns': ['id', 'amount'], 'rows': [[1, '1.50'], [2, None]]}),
+])
+def test_run_query(monkeypatch, columnar, expected):
+    """
+    Test that the rows, rowcount and executed query of a query are returned.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    cursor = dict_cursor_class(['id', 'amount'], [(1, Decimal('1.50')), (2, None)])
+
+    result = run_query(cursor, 'SELECT id, amount FROM t', None, columnar=columnar)
+
+    assert result['query_result'] == expected
+    assert result['rowcount'] == 2
+    assert result['executed_query'] == 'SELECT id, amount FROM t'
+    assert result['execution_time_ms'] >= 0
+    assert result['error'] is None
+
+
+def test_run_query_error(monkeypatch):
+    """
+    Test that a failing query returns the message the module fails with.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    cursor = dict_cursor_class([], [], error=error_driver_class.Error(1146, "Table 't' doesn't exist"))
+
+    result = run_query(cursor, 'SELECT * FROM t', [1])
+
+    assert result['error'] == "Cannot execute SQL 'SELECT * FROM t' args [[1]]: (1146, \"Table 't' doesn't exist\")"
+
+
+class blocking_cursor_class():
+    """Cursor double whose statement runs until it is cancelled by KILL QUERY on the kill cursor."""
+    def __init__(self, duration=5):
+        self.duration = duration
+        self.cancelled = threading.Event()
+        self.killed = []
+        self.description = None
+        self.rowcount = 0
+        self._last_executed = None
+
+    def execute(self, query, args=None):
+        if self.cancelled.wait(self.duration):
+            raise error_driver_class.Error(1317, 'Query execution was interrupted')
+        self._last_executed = query
+
+    def fetchmany(self, size):
+        return ()
+
+    def kill(self, query, args=None):
+        self.killed.append(query)
+        self.cancelled.set()
+
+
+def timeout_watchdog(cursor, timeout, session_vars=None):
+    kill_cursor = MagicMock()
+    kill_cursor.execute.side_effect = cursor.kill
+    db_connection = MagicMock()
+    db_connection.thread_id.return_value = 42
+    return QueryWatchdog(lambda: (kill_cursor, None), db_connection, timeout, session_vars)
+
+
+def test_run_query_timeout_watchdog(monkeypatch):
+    """
+    Test that the watchdog cancels a query running longer than the timeout.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    cursor = blocking_cursor_class()
+
+    result = run_query(cursor, 'SELECT SLEEP(60)', None, watchdog=timeout_watchdog(cursor, 0.2))
+
+    assert cursor.killed == ['KILL QUERY 42']
+    assert result['error'] is not None
+    assert result['timed_out']['query'] == 'SELECT SLEEP(60)'
+    assert result['timed_out']['cancelled_by'] == 'watchdog'
+    assert 200 <= result['timed_out']['execution_time_ms'] < 2000
+
+
+def test_run_query_timeout_not_reached(monkeypatch):
+    """
+    Test that the watchdog leaves queries finishing in time alone, also after them.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    cursor = blocking_cursor_class(duration=0.01)
+
+    result = run_query(cursor, 'SELECT 1', None, watchdog=timeout_watchdog(cursor, 0.2))
+    time.sleep(0.3)
+
+    assert result['error'] is None
+    assert result['timed_out'] is None
+    assert cursor.killed == []
+
+
+def test_run_query_timeout_server(monkeypatch):
+    """
+    Test that a query cancelled by the server's execution time limit is reported as timed out.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    error = error_driver_class.Error(3024, 'Query execution was interrupted, maximum statement execution time exceeded')
+    cursor = dict_cursor_class([], [], error=error)
+
+    result = run_query(cursor, 'SELECT * FROM t', None)
+
+    assert result['timed_out']['cancelled_by'] == 'server'
+
+
+def test_run_query_timeout_server_before_watchdog(monkeypatch):
+    """
+    Test that the watchdog does not race with the server's execution time limit.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+
+    class limited_cursor_class(blocking_cursor_class):
+        def execute(self, query, args=None):
+            if not self.cancelled.wait(0.3):
+                raise error_driver_class.Error(3024, 'Query execution was interrupted, maximum statement execution time exceeded')
+            raise error_driver_class.Error(1317, 'Query execution was interrupted')
+
+    cursor = limited_cursor_class()
+    watchdog = timeout_watchdog(cursor, 0.2, {'max_execution_time': 200})
+
+    result = run_query(cursor, 'select SLEEP(60)', None, watchdog=watchdog)
+
+    assert cursor.killed == []
+    assert result['timed_out']['cancelled_by'] == 'server'
+
+
+def test_run_query_timeout_watchdog_grace(monkeypatch):
+    """
+    Test that the watchdog cancels a query the server does not cancel after a grace period.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(error_driver_class, 'Warning', type('Warning', (Exception,), {}), raising=False)
+    monkeypatch.setattr(mysql_query, 'QUERY_WATCHDOG_GRACE', 0.2)
+    cursor = blocking_cursor_class()
+
+    result = run_query(cursor, 'SELECT SLEEP(60)', None, watchdog=timeout_watchdog(cursor, 0.2, {'max_statement_time': 0.2}))
+
+    assert cursor.killed == ['KILL QUERY 42']
+    assert result['timed_out']['cancelled_by'] == 'watchdog'
+    assert 400 <= result['timed_out']['execution_time_ms'] < 2000
+
+
+@pytest.mark.parametrize('session_vars,query,expected', [
+    ({}, 'SELECT 1', None),
+    ({'max_execution_time': 1500}, ' (select 1)', 1.5),
+    ({'max_execution_time': '1500'}, 'UPDATE t SET a = 1', None),
+    ({'max_execution_time': 0}, 'SELECT 1', None),
+    ({'max_statement_time': 2}, 'UPDATE t SET a = 1', 2.0),
+    ({'max_statement_time': 'DEFAULT'}, 'SELECT 1', None),
+])
+def test_get_server_time_limit(session_vars, query, expected):
+    """
+    Test that the limit is read from the session variables that apply to the query.
+    """
+    assert get_server_time_limit(session_vars, query) == expected
+
+
+@pytest.mark.parametrize('implementation,version,expected', [
+    ('mysql', '8.0.38', {'max_execution_time': 1500}),
+    ('mysql', '5.7.8-log', {'max_execution_time': 1500}),
+    ('mysql', '5.6.51', {}),
+    ('mariadb', '10.11.8-MariaDB', {'max_statement_time': 1.5}),
+    ('mariadb', '10.0.38-MariaDB', {}),
+])
+def test_get_query_timeout_vars(monkeypatch, implementation, version, expected):
+    """
+    Test that the execution time limit of the server is used.
+    """
+    profile = MagicMock(implementation=implementation, version=version)
+    monkeypatch.setattr(mysql_query, 'get_server_profile', lambda cursor: profile)
+
+    assert get_query_timeout_vars(None, 1.5) == expected
+
+
+def sleeping_worker(seconds, fail=(), threads=None):
+    """Return a worker sleeping like a query taking seconds, failing for the queries in fail."""
+    def run(query):
+        if threads is not None:
+            threads.add(threading.current_thread().name)
+        time.sleep(seconds)
+        return {'query': query, 'error': 'failed' if query in fail else None}
+    return run
+
+
+def test_execute_parallel_order():
+    """
+    Test that the results are returned in the order of the queries and every connection is used.
+    """
+    threads = set()
+    queries = ['q%d' % i for i in range(10)]
+
+    results = execute_parallel([sleeping_worker(0.01, threads=threads) for dummy in range(3)], queries)
+
+    assert [result['query'] for result in results] == queries
+    assert len(threads) == 3
+
+
+def test_execute_parallel_failure():
+    """
+    Test that no query starts after a failure and the earlier ones have results.
+    """
+    queries = ['q%d' % i for i in range(20)]
+
+    results = execute_parallel([sleeping_worker(0.01, fail=('q5',)) for dummy in range(2)], queries)
+
+    assert all(result is not None for result in results[:6])
+    assert results[5]['error'] == 'failed'
+    # Only the queries already running when q5 failed may have completed
+    assert results[-1] is None
+    assert sum(result is not None for result in results[6:]) <= 1
+
+
+def test_execute_parallel_benchmark():
+    """
+    Benchmark 32 queries of 0.5 s over 8 connections, which take 16 s one after another.
+    """
+    queries = ['SELECT SLEEP(0.5)'] * 32
+
+    start = time.time()
+    results = execute_parallel([sleeping_worker(0.5) for dummy in range(8)], queries)
+    elapsed = time.time() - start
+
+    assert len(results) == 32
+    # 4 rounds of 0.5 s
+    assert elapsed < 3
+
+
+SCRIPT = b"""USE acme;
+INSERT INTO t VALUES (1);
+INSERT INTO t VALUES (2);
+SET @a = 1;
+INSERT INTO t VALUES (3);
+SELECT * FROM t;
+"""
+
+
+class script_cursor_class():
+    """Cursor double recording statements, failing on the statement in fail."""
+    def __init__(self, fail=None):
+        self.executed = []
+        self.fail = fail
+        self.rowcount = 0
+
+    def execute(self, query, args=None):
+        if query == self.fail:
+            raise error_driver_class.Error(1062, 'Duplicate entry')
+        self.executed.append(query)
+        self.rowcount = 1 if query.startswith(b'INSERT') else -1
+
+
+def script_progress(resume_from=1):
+    return {'path': 's.sql', 'statements': 0, 'skipped': 0, 'rowcount': 0, 'commits': 0,
+            'execution_time_ms': 0.0, 'resume_from': resume_from}
+
+
+@pytest.mark.parametrize('autocommit,commit_interval,expected_commits', [
+    (True, None, 0),
+    (False, None, 1),
+    (False, 2, 3),
+    (False, 4, 2),
+])
+def test_execute_script(autocommit, commit_interval, expected_commits):
+    """
+    Test that all statements run and are committed as configured.
+    """
+    cursor = script_cursor_class()
+    db_connection = MagicMock()
+    progress = script_progress()
+
+    changed = execute_script(cursor, db_connection, split_statements(io.BytesIO(SCRIPT)), progress,
+                             autocommit=autocommit, commit_interval=commit_interval)
+
+    assert changed
+    assert len(cursor.executed) == 6
+    assert db_connection.commit.call_count == expected_commits
+    assert progress['statements'] == 6
+    assert progress['rowcount'] == 3
+    assert progress['commits'] == expected_commits
+    assert progress['resume_from'] == 7
+
+
+def test_execute_script_resume():
+    """
+    Test that resuming skips the statements before it except SET and USE.
+    """
+    cursor = script_cursor_class()
+    progress = script_progress(5)
+
+    execute_script(cursor, MagicMock(), split_statements(io.BytesIO(SCRIPT)), progress, resume_from=5)
+
+    assert cursor.executed == [b'USE acme', b'SET @a = 1', b'INSERT INTO t VALUES (3)', b'SELECT * FROM t']
+    assert (progress['statements'], progress['skipped'], progress['rowcount']) == (4, 2, 1)
+
+
+@pytest.mark.parametrize('autocommit,commit_interval,expected_resume_from', [
+    # Every completed statement is committed
+    (True, None, 5),
+    # Statements 1 to 4 were committed in two transactions
+    (False, 2, 5),
+    (False, 3, 4),
+    # Nothing was committed
+    (False, None, 1),
+])
+def test_execute_script_failure(monkeypatch, autocommit, commit_interval, expected_resume_from):
+    """
+    Test that a failed statement raises ScriptError and the progress tells where to resume.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    cursor = script_cursor_class(fail=b'INSERT INTO t VALUES (3)')
+    progress = script_progress()
+
+    with pytest.raises(ScriptError) as e:
+        execute_script(cursor, MagicMock(), split_statements(io.BytesIO(SCRIPT)), progress,
+                       autocommit=autocommit, commit_interval=commit_interval)
+
+    assert (e.value.statement.number, e.value.statement.line) == (5, 5)
+    assert progress['resume_from'] == expected_resume_from
+
+
+class table_cursor_class():
+    """Dict cursor double answering the chunk queries from the sorted values of a column.
+
+    The chunk statements delete the rows of their range.
+    """
+    def __init__(self, values):
+        self.values = sorted(values)
+        self.connection = None
+        self.chunks = []
+        self.rows = []
+        self.rowcount = -1
+
+    def execute(self, query, args=None):
+        if query.startswith('DELETE'):
+            start, end = args['chunk_start'], args['chunk_end']
+            self.chunks.append((start, end))
+            remaining = [v for v in self.values if not start <= v <= end]
+            self.rowcount = len(self.values) - len(remaining)
+            self.values = remaining
+            return
+
+        if 'MAX(' in query:
+            values = [v for v in self.values if v >= args[0]]
+            self.rows = [{'chunk_value': max(values) if values else None}]
+        elif 'OFFSET' in query:
+            offset = int(re.search(r'OFFSET (\d+)', query).group(1))
+            self.rows = [{'chunk_value': v} for v in self.values if v >= args[0]][offset:offset + 2]
+        elif '>' in query:
+            self.rows = [{'chunk_value': v} for v in self.values if v > args[0]][:1]
+        else:
+            self.rows = [{'chunk_value': v} for v in self.values][:1]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+def chunk_progress():
+    return {'count': 0, 'rowcount': 0, 'throttled': 0, 'throttle_time_ms': 0.0,
+            'execution_time_ms': 0.0, 'last_chunk_end': None}
+
+
+CHUNK_QUERY = 'DELETE FROM t WHERE id BETWEEN %(chunk_start)s AND %(chunk_end)s'
+
+
+@pytest.mark.parametrize('values,chunk_size,expected_chunks', [
+    ([1, 2, 3, 5, 8, 13, 21], 3, [(1, 3), (5, 13), (21, 21)]),
+    ([1, 2, 3, 5, 8, 13, 21], 10, [(1, 21)]),
+    ([1, 2, 3], 1, [(1, 1), (2, 2), (3, 3)]),
+    # A value never spans two chunks
+    ([1, 1, 1, 2, 2, 3], 2, [(1, 1), (2, 2), (3, 3)]),
+    ([], 1000, []),
+])
+def test_execute_chunks(values, chunk_size, expected_chunks):
+    """
+    Test that the query runs once for every range of chunk_size rows.
+    """
+    cursor = table_cursor_class(values)
+    progress = chunk_progress()
+
+    execute_chunks(cursor, CHUNK_QUERY, {'created': '2020-01-01'}, '`t`', '`id`', chunk_size, progress)
+
+    assert cursor.chunks == expected_chunks
+    assert cursor.values == []
+    assert progress['count'] == len(expected_chunks)
+    assert progress['rowcount'] == len(values)
+    assert progress['last_chunk_end'] == (expected_chunks[-1][1] if expected_chunks else None)
+
+
+def test_execute_chunks_throttle():
+    """
+    Test that the throttle is asked before every chunk and its pauses are added up.
+    """
+    cursor = table_cursor_class([1, 2, 3, 4])
+    throttle = MagicMock()
+    throttle.wait.return_value = 0.5
+    throttle.throttled = 1
+    progress = chunk_progress()
+
+    execute_chunks(cursor, CHUNK_QUERY, None, '`t`', '`id`', 2, progress, throttle)
+
+    assert throttle.wait.call_count == 2
+    assert (progress['throttled'], progress['throttle_time_ms']) == (1, 1000.0)
+
+
+def test_execute_chunks_lost_connection(monkeypatch):
+    """
+    Test that a connection lost between chunks is not reopened, even with a retry policy.
+    """
+    monkeypatch.setattr(mysql_driver, '_module', error_driver_class())
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    cursor = table_cursor_class([1, 2, 3, 4])
+    cursor.connection = MagicMock(_ansible_retry_policy=RetryPolicy(3))
+    execute = cursor.execute
+
+    def lose_connection(query, args=None):
+        if cursor.chunks and 'OFFSET' in query:
+            raise error_driver_class.Error(2013, 'Lost connection to MySQL server during query')
+        execute(query, args)
+
+    cursor.execute = lose_connection
+    progress = chunk_progress()
+
+    with pytest.raises(error_driver_class.Error):
+        execute_chunks(cursor, CHUNK_QUERY, None, '`t`', '`id`', 2, progress)
+
+    cursor.connection.ping.assert_not_called()
+    assert (progress['count'], progress['last_chunk_end']) == (1, 2)
+
+
+def test_chunk_throttle_lag(monkeypatch):
+    """
+    Test that the throttle pauses until the replicas catch up, at least as long as the backoff delay.
+    """
+    lags = [5.0, 1.5, 0.5]
+    sleeps = []
+    monkeypatch.setattr(mysql_query, 'get_replica_lag', lambda cursor, heartbeat_table: lags.pop(0))
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    throttle = ChunkThrottle(MagicMock(), None, [('db2:3306', None)], max_lag=1.0)
+
+    assert throttle.wait() == 4.5
+    assert sleeps == [4.0, 0.5]
+    assert throttle.throttled == 2
+    # The conditions were just checked
+    assert throttle.wait() == 0
+
+
+def test_chunk_throttle_threads_running(monkeypatch):
+    """
+    Test that the throttle backs off exponentially while the server is busy.
+    """
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    cursor = table_cursor_class([])
+    statuses = [{'Value': '100'}, {'Value': '100'}, {'Value': '100'}, {'Value': '10'}]
+    cursor.execute = lambda query, args=None: setattr(cursor, 'rows', [statuses.pop(0)])
+    throttle = ChunkThrottle(MagicMock(), cursor, max_threads_running=50)
+
+    assert throttle.wait() == 1.75
+    assert sleeps == [0.25, 0.5, 1.0]
+
+
+def test_chunk_throttle_not_replicating(monkeypatch):
+    """
+    Test that the module fails when replication is not running on a replica.
+    """
+    monkeypatch.setattr(mysql_query, 'get_replica_lag', lambda cursor, heartbeat_table: None)
+    module = MagicMock()
+    module.fail_json.side_effect = SystemExit
+    throttle = ChunkThrottle(module, None, [('db2:3306', None)], max_lag=1.0)
+
+    with pytest.raises(SystemExit):
+        throttle.wait()
+
+    assert 'db2:3306' in module.fail_json.call_args[1]['msg']
+
+
+@pytest.mark.parametrize('query,expected', [
+    ('SELECT 1', True),
+    ('  select * FROM t', True),
+    ('(SELECT 1) UNION (SELECT 2)', True),
+    ('SHOW TABLES', True),
+    ('EXPLAIN SELECT 1', True),
+    ('UPDATE t SET a = 1', False),
+    ('WITH d AS (SELECT 1) DELETE FROM t', False),
+    ('', False),
+])
+def test_is_read_only_query(query, expected):
+    """
+    Test that only queries starting with a read-only keyword may run on a replica.
+    """
+    assert is_read_only_query(query) == expected
+
+
+def test_probe_replicas(monkeypatch):
+    """
+    Test that the replicas are probed at the same time on a buffered cursor, and unreachable ones report their error.
+    """
+    lags = {'db2': 3.0, 'db3': None, 'db4': 0.0}
+    probe_cursors = []
+
+    class Connection():
+        def __init__(self, host):
+            self.host = host
+
+        def cursor(self, **kwargs):
+            probe_cursor = MagicMock(host=self.host, kwargs=kwargs)
+            probe_cursors.append(probe_cursor)
+            return probe_cursor
+
+    def connect(endpoint):
+        if endpoint[0] == 'db5':
+            raise error_driver_class.Error(2003, "Can't connect to MySQL server on 'db5'")
+        return 'streaming cursor', Connection(endpoint[0])
+
+    def get_replica_lag(cursor, heartbeat_table):
+        time.sleep(0.5)
+        return lags[cursor.host]
+
+    driver = error_driver_class()
+    driver.cursors = MagicMock()
+    monkeypatch.setattr(mysql_driver, '_module', driver)
+    monkeypatch.setattr(mysql_driver, '_loaded', True)
+    monkeypatch.setattr(mysql_driver, '_cursor_param', 'cursor')
+    monkeypatch.setattr(mysql_query, 'get_replica_lag', get_replica_lag)
+    start = time.time()
+
+    probes = probe_replicas(connect, [('db2', 3306), ('db3', 3306), ('db4', 3307), ('db5', 3306)])
+
+    assert time.time() - start < 1.5
+    assert len(probe_cursors) == 3
+    for probe_cursor in probe_cursors:
+        assert probe_cursor.kwargs == {'cursor': driver.cursors.DictCursor}
+        probe_cursor.close.assert_called_once_with()
+    assert [p['cursor'] for p in probes] == ['streaming cursor'] * 3 + [None]
+    assert [(p['server'], p['lag'], p['error']) for p in probes] == [
+        ('db2:3306', 3.0, None),
+        ('db3:3306', None, 'replication is not running'),
+        ('db4:3307', 0.0, None),
+        ('db5:3306', None, "(2003, \"Can't connect to MySQL server on 'db5'\")"),
+    ]
+
+
+@pytest.mark.parametrize('lags,max_lag,expected', [
+    ([3.0, None, 0.0], None, 2),
+    ([3.0, 1.0, 1.0], None, 1),
+    ([3.0, 1.0, 2.0], 0.5, None),
+    ([3.0, None, 0.0], 3.0, 2),
+    ([None, None], None, None),
+])
+def test_choose_replica(lags, max_lag, expected):
+    """
+    Test that the first replica with the least lag within max_lag is chosen.
+    """
+    probes = [{'lag': lag} for lag in lags]
+
+    chosen = choose_replica(probes, max_lag)
+
+    assert chosen is (probes[expected] if expected is not None else None)
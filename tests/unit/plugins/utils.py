@@ -3,7 +3,7 @@ __metaclass__ = type
 
 
 class dummy_cursor_class():
-    """Dummy class for returning an answer for SELECT VERSION()."""
+    """Dummy class for returning an answer for SELECT VERSION(), @@sql_mode."""
     def __init__(self, output, ret_val_type='dict'):
         self.output = output
         self.ret_val_type = ret_val_type
@@ -13,7 +13,7 @@ class dummy_cursor_class():
 
     def fetchone(self):
         if self.ret_val_type == 'dict':
-            return {'version': self.output}
+            return {'version': self.output, 'sql_mode': ''}
 
         elif self.ret_val_type == 'list':
-            return [self.output]
+            return [self.output, '']